@@ -1,101 +1,207 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from data_processing import frame_totals, channel_totals, metrics_from_totals, filter_by_channel, derived_column, month_periods
+from figure_cache import use_dashboard_template
+from instrumentation import instrument_module
+
+# plotly se importa dentro de cada función de gráfico: cargarlo al importar el módulo
+# retrasaba el arranque de la app antes de que hubiera datos que dibujar
+
+# A partir de este número de videos los gráficos de dispersión usan WebGL y muestreo
+SCATTER_WEBGL_THRESHOLD = 5000
+# Puntos máximos de la competencia enviados al navegador (los del cliente se envían todos)
+SCATTER_MAX_POINTS = 20000
+# Resolución de la rejilla (log vistas x log métrica) usada para muestrear por densidad
+SCATTER_GRID_SIZE = 200
 
 def analyze_channel_performance(df_cliente, df_competencia):
     """
     Analiza el rendimiento del canal del cliente comparado con la competencia
     """
-    # Métricas básicas del cliente
-    metricas_cliente = {
-        \"total_videos\": len(df_cliente),
-        \"total_vistas\": df_cliente[\"vistas\"].sum(),
-        \"avg_vph\": df_cliente[\"vph\"].mean(),
-        \"avg_duration\": df_cliente[\"duracion_segundos\"].mean(),
-        \"avg_likes\": df_cliente[\"likes\"].mean(),
-        \"avg_comments\": df_cliente[\"comentarios\"].mean(),
-        \"avg_connection_index\": df_cliente[\"indice_conexion\"].mean()
-    }
-    
-    # Métricas de la competencia
-    metricas_competencia = {
-        \"total_videos\": len(df_competencia),
-        \"total_vistas\": df_competencia[\"vistas\"].sum(),
-        \"avg_vph\": df_competencia[\"vph\"].mean(),
-        \"avg_duration\": df_competencia[\"duracion_segundos\"].mean(),
-        \"avg_likes\": df_competencia[\"likes\"].mean(),
-        \"avg_comments\": df_competencia[\"comentarios\"].mean(),
-        \"avg_connection_index\": df_competencia[\"indice_conexion\"].mean()
-    }
+    metricas_cliente = metrics_from_totals(frame_totals(df_cliente))
+    metricas_competencia = metrics_from_totals(frame_totals(df_competencia))
     
     return metricas_cliente, metricas_competencia
 
+def analyze_channel_performance_aggregated(channel_aggregates, channel_name=None):
+    """
+    Igual que analyze_channel_performance, pero a partir de los agregados por canal
+    precalculados (build_channel_aggregates): no recorre los datos de nuevo
+    """
+    client_totals, competition_totals = channel_totals(channel_aggregates, channel_name)
+    
+    return metrics_from_totals(client_totals), metrics_from_totals(competition_totals)
+
 def create_performance_comparison_chart(metricas_cliente, metricas_competencia):
     """
     Crea un gráfico de comparación de rendimiento
     """
-    metrics = [\"VPH Promedio\", \"Índice de Conexión\", \"Duración Promedio (min)\"]
+    import plotly.graph_objects as go
+    use_dashboard_template()
+    metrics = ["VPH Promedio", "Índice de Conexión", "Duración Promedio (min)"]
     cliente_values = [
-        metricas_cliente[\"avg_vph\"],
-        metricas_cliente[\"avg_connection_index\"],
-        metricas_cliente[\"avg_duration\"] / 60
+        metricas_cliente["avg_vph"],
+        metricas_cliente["avg_connection_index"],
+        metricas_cliente["avg_duration"] / 60
     ]
     competencia_values = [
-        metricas_competencia[\"avg_vph\"],
-        metricas_competencia[\"avg_connection_index\"],
-        metricas_competencia[\"avg_duration\"] / 60
+        metricas_competencia["avg_vph"],
+        metricas_competencia["avg_connection_index"],
+        metricas_competencia["avg_duration"] / 60
     ]
     
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        name=\'Tu Canal\',
+        name='Tu Canal',
         x=metrics,
         y=cliente_values,
-        marker_color=\'#FF0000\'
+        marker_color='#FF0000'
     ))
     
     fig.add_trace(go.Bar(
-        name=\'Competencia (Promedio)\',
+        name='Competencia (Promedio)',
         x=metrics,
         y=competencia_values,
-        marker_color=\'#666666\'
+        marker_color='#666666'
     ))
     
     fig.update_layout(
-        title=\'📊 Comparación de Rendimiento: Tu Canal vs Competencia\',
-        xaxis_title=\'Métricas\',
-        yaxis_title=\'Valores\',
-        barmode=\'group\',
-        height=500
+        title='📊 Comparación de Rendimiento: Tu Canal vs Competencia',
+        xaxis_title='Métricas',
+        yaxis_title='Valores',
+        barmode='group'
     )
     
     return fig
 
+def create_positioning_scatter(df, y, canal_cliente, title, channel_index=None,
+                               webgl_threshold=SCATTER_WEBGL_THRESHOLD, max_points=SCATTER_MAX_POINTS):
+    """
+    Crea el gráfico de dispersión vistas vs métrica del posicionamiento en el nicho
+
+    Con pocos videos se usa el gráfico original coloreado por canal. Por encima de
+    webgl_threshold se usan trazas WebGL: todos los videos del cliente y una muestra
+    de la competencia limitada a max_points, tomada por celdas de una rejilla
+    logarítmica para conservar la forma de la nube y los valores atípicos.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+    use_dashboard_template()
+    if len(df) <= webgl_threshold:
+        fig = px.scatter(
+            df,
+            x="vistas",
+            y=y,
+            color="nombre_canal",
+            hover_name="titulo",
+            log_x=True,
+            size="duracion_segundos",
+            color_discrete_map={canal_cliente: "#FF0000"},
+            title=title
+        )
+        fig.update_layout(height=600)
+        return fig
+
+    # Separar cliente y competencia
+    client_rows = filter_by_channel(df, canal_cliente, channel_index)
+    is_client = df.index.isin(client_rows.index)
+    competition_pos = np.flatnonzero(~is_client)
+    sample_pos = competition_pos[_density_sample(df[["vistas", y]].to_numpy(dtype=np.float64)[competition_pos], max_points)]
+
+    fig = go.Figure()
+    fig.add_trace(_scatter_trace(
+        df.iloc[sample_pos], y,
+        name=f'Competencia ({len(sample_pos):,} de {len(competition_pos):,} videos)',
+        color='#999999', opacity=0.5
+    ))
+    if is_client.any():
+        fig.add_trace(_scatter_trace(df[is_client], y, name=f'Tu Canal ({int(is_client.sum()):,} videos)', color='#FF0000', opacity=0.9))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="vistas",
+        yaxis_title=y,
+        height=600
+    )
+    fig.update_xaxes(type='log')
+    return fig
+
+def _scatter_trace(df_points, y, name, color, opacity):
+    # Tamaño proporcional a la raíz de la duración (como size= en plotly express)
+    duracion = df_points["duracion_segundos"].to_numpy(dtype=np.float64)
+    sizes = 4 + 16 * np.sqrt(duracion / max(duracion.max(), 1)) if len(duracion) else []
+    import plotly.graph_objects as go
+    return go.Scattergl(
+        x=df_points["vistas"].to_numpy(),
+        y=df_points[y].to_numpy(),
+        mode='markers',
+        name=name,
+        text=df_points["titulo"].astype(str).to_numpy(),
+        customdata=df_points["nombre_canal"].astype(str).to_numpy(),
+        hovertemplate='<b>%{text}</b><br>%{customdata}<br>vistas=%{x:,}<br>' + y + '=%{y:.2f}<extra></extra>',
+        marker=dict(color=color, size=sizes, opacity=opacity, line=dict(width=0))
+    )
+
+def _density_sample(points, max_points, grid_size=SCATTER_GRID_SIZE, seed=0):
+    """
+    Devuelve las posiciones de una muestra de como mucho max_points puntos
+
+    Los puntos se agrupan en una rejilla log10(x) x log10(y) y se conserva el mismo
+    número máximo k de puntos por celda: las zonas densas se aclaran y las celdas
+    con pocos puntos (atípicos) se conservan completas.
+    """
+    n = len(points)
+    if n <= max_points:
+        return np.arange(n)
+
+    logs = np.log10(np.clip(np.nan_to_num(points, nan=0.0), 0, None) + 1)
+    lo, hi = logs.min(axis=0), logs.max(axis=0)
+    bins = ((logs - lo) / np.where(hi > lo, hi - lo, 1) * (grid_size - 1)).astype(np.int64)
+    cells = bins[:, 0] * grid_size + bins[:, 1]
+
+    # Orden aleatorio reproducible dentro de cada celda
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(n), cells))
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, counts)
+
+    # Mayor k tal que sum(min(count, k)) <= max_points
+    k_lo, k_hi = 1, int(counts.max())
+    while k_lo < k_hi:
+        k = (k_lo + k_hi + 1) // 2
+        if np.minimum(counts, k).sum() <= max_points:
+            k_lo = k
+        else:
+            k_hi = k - 1
+    keep = order[rank < k_lo]
+    # Más celdas ocupadas que puntos permitidos: un punto al azar de cada celda
+    if len(keep) > max_points:
+        keep = rng.choice(keep, size=max_points, replace=False)
+    return np.sort(keep)
+
 def analyze_content_strategy(df_cliente):
     """
     Analiza la estrategia de contenido del canal (Shorts vs Largos)
     """
-    # Separar por formato
-    shorts = df_cliente[df_cliente[\"formato\"] == \'Short\']
-    largos = df_cliente[df_cliente[\"formato\"] == \'Largo\']
-    
+    # Una sola agrupación por formato en lugar de un filtro por cada formato
+    grouped = df_cliente.groupby('formato', observed=False)
+    formats = ['Short', 'Largo']
+    counts = grouped.size().reindex(formats, fill_value=0)
+    means = grouped[["vph", "vistas"]].mean().reindex(formats).fillna(0)
+    totals = grouped["vistas"].sum().reindex(formats, fill_value=0)
+
     strategy_analysis = {
-        \"shorts\": {
-            \"count\": len(shorts),
-            \"avg_vph\": shorts[\"vph\"].mean() if len(shorts) > 0 else 0,
-            \"avg_views\": shorts[\"vistas\"].mean() if len(shorts) > 0 else 0,
-            \"total_views\": shorts[\"vistas\"].sum() if len(shorts) > 0 else 0
-        },
-        \"largos\": {
-            \"count\": len(largos),
-            \"avg_vph\": largos[\"vph\"].mean() if len(largos) > 0 else 0,
-            \"avg_views\": largos[\"vistas\"].mean() if len(largos) > 0 else 0,
-            \"total_views\": largos[\"vistas\"].sum() if len(largos) > 0 else 0
+        key: {
+            "count": int(counts[formato]),
+            "avg_vph": means.loc[formato, "vph"],
+            "avg_views": means.loc[formato, "vistas"],
+            "total_views": totals[formato]
         }
+        for key, formato in [("shorts", "Short"), ("largos", "Largo")]
     }
     
     return strategy_analysis
@@ -104,18 +210,20 @@ def create_format_distribution_chart(strategy_analysis):
     """
     Crea un gráfico de distribución de formatos
     """
-    labels = [\'Shorts\', \'Videos Largos\']
-    values = [strategy_analysis[\"shorts\"][\"count\"], strategy_analysis[\"largos\"][\"count\"]]
+    import plotly.graph_objects as go
+    use_dashboard_template()
+    labels = ['Shorts', 'Videos Largos']
+    values = [strategy_analysis["shorts"]["count"], strategy_analysis["largos"]["count"]]
     
     fig = go.Figure(data=[go.Pie(
         labels=labels,
         values=values,
         hole=0.3,
-        marker_colors=[\'#FF6B6B\', \'#4ECDC4\']
+        marker_colors=['#FF6B6B', '#4ECDC4']
     )])
     
     fig.update_layout(
-        title=\'📱 Distribución de Formatos de Contenido\',
+        title='📱 Distribución de Formatos de Contenido',
         height=400
     )
     
@@ -125,16 +233,14 @@ def analyze_temporal_trends(df_cliente):
     """
     Analiza tendencias temporales del canal
     """
-    # Convertir fecha a datetime si no lo está
-    df_cliente[\"fecha_publicacion\"] = pd.to_datetime(df_cliente[\"fecha_publicacion\"])
-    
-    # Agrupar por mes
-    df_cliente[\"mes\"] = df_cliente[\"fecha_publicacion\"].dt.to_period(\'M\')
-    monthly_stats = df_cliente.groupby(\'mes\').agg({
-        \"vistas\": \'sum\',
-        \"vph\": \'mean\',
-        \"video_id\": \'count\'
-    }).rename(columns={\"video_id\": \"videos_publicados\"})
+    # Agrupar por mes (columna precalculada en la carga; df_cliente no se modifica)
+    monthly_stats = df_cliente.groupby(derived_column(df_cliente, 'mes')).agg({
+        "vistas": 'sum',
+        "vph": 'mean',
+        "video_id": 'count'
+    }).rename(columns={"video_id": "videos_publicados"})
+    # Códigos int16 -> períodos mensuales solo para las filas del resultado
+    monthly_stats.index = month_periods(monthly_stats.index).rename('mes')
     
     return monthly_stats
 
@@ -142,9 +248,12 @@ def create_temporal_trends_chart(monthly_stats):
     """
     Crea un gráfico de tendencias temporales
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    use_dashboard_template()
     fig = make_subplots(
         rows=2, cols=1,
-        subplot_titles=(\'📈 Vistas Totales por Mes\', \'🚀 VPH Promedio por Mes\'),
+        subplot_titles=('📈 Vistas Totales por Mes', '🚀 VPH Promedio por Mes'),
         vertical_spacing=0.1
     )
     
@@ -152,10 +261,10 @@ def create_temporal_trends_chart(monthly_stats):
     fig.add_trace(
         go.Scatter(
             x=monthly_stats.index.astype(str),
-            y=monthly_stats[\"vistas\"],
-            mode=\'lines+markers\',
-            name=\'Vistas Totales\',
-            line=dict(color=\'#FF0000\', width=3)
+            y=monthly_stats["vistas"],
+            mode='lines+markers',
+            name='Vistas Totales',
+            line=dict(color='#FF0000', width=3)
         ),
         row=1, col=1
     )
@@ -164,18 +273,18 @@ def create_temporal_trends_chart(monthly_stats):
     fig.add_trace(
         go.Scatter(
             x=monthly_stats.index.astype(str),
-            y=monthly_stats[\"vph\"],
-            mode=\'lines+markers\',
-            name=\'VPH Promedio\',
-            line=dict(color=\'#4ECDC4\', width=3)
+            y=monthly_stats["vph"],
+            mode='lines+markers',
+            name='VPH Promedio',
+            line=dict(color='#4ECDC4', width=3)
         ),
         row=2, col=1
     )
     
     fig.update_layout(height=600, showlegend=False)
-    fig.update_xaxes(title_text=\"Mes\", row=2, col=1)
-    fig.update_yaxes(title_text=\"Vistas\", row=1, col=1)
-    fig.update_yaxes(title_text=\"VPH\", row=2, col=1)
+    fig.update_xaxes(title_text="Mes", row=2, col=1)
+    fig.update_yaxes(title_text="Vistas", row=1, col=1)
+    fig.update_yaxes(title_text="VPH", row=2, col=1)
     
     return fig
 
@@ -183,14 +292,14 @@ def analyze_bucket_performance(df_cliente):
     """
     Analiza el rendimiento por bucket temático
     """
-    bucket_stats = df_cliente.groupby(\'bucket_tematico\').agg({
-        \"vph\": \'mean\',
-        \"vistas\": \'mean\',
-        \"indice_conexion\": \'mean\',
-        \"video_id\": \'count\'
-    }).rename(columns={\"video_id\": \"num_videos\"})
+    bucket_stats = df_cliente.groupby('bucket_tematico', observed=True).agg({
+        "vph": 'mean',
+        "vistas": 'mean',
+        "indice_conexion": 'mean',
+        "video_id": 'count'
+    }).rename(columns={"video_id": "num_videos"})
     
-    bucket_stats = bucket_stats.sort_values(\'vph\', ascending=False)
+    bucket_stats = bucket_stats.sort_values('vph', ascending=False)
     
     return bucket_stats
 
@@ -198,37 +307,42 @@ def create_bucket_performance_chart(bucket_stats):
     """
     Crea un gráfico de rendimiento por bucket temático
     """
+    import plotly.graph_objects as go
+    use_dashboard_template()
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
         x=bucket_stats.index,
-        y=bucket_stats[\"vph\"],
-        marker_color=\'#FF6B6B\',
-        text=bucket_stats[\"num_videos\"],
-        texttemplate=\'%{text} videos\',
-        textposition=\'outside\'
+        y=bucket_stats["vph"],
+        marker_color='#FF6B6B',
+        text=bucket_stats["num_videos"],
+        texttemplate='%{text} videos',
+        textposition='outside'
     ))
     
     fig.update_layout(
-        title=\'🎯 Rendimiento por Tema de Contenido (VPH)\',
-        xaxis_title=\'Bucket Temático\',
-        yaxis_title=\'VPH Promedio\',
-        height=500
+        title='🎯 Rendimiento por Tema de Contenido (VPH)',
+        xaxis_title='Bucket Temático',
+        yaxis_title='VPH Promedio'
     )
     
     return fig
 
-def get_top_performing_videos(df_cliente, n=10):
+def get_top_performing_videos(df_cliente, n=10, sort_by='vph'):
     """
     Obtiene los videos con mejor rendimiento del canal
+
+    sort_by permite ordenar por otra métrica, p. ej. las velocidades por ventana
+    (vph_24h, vph_7d) de time_series.add_velocity_columns
     """
-    top_videos = df_cliente.nlargest(n, \'vph\')[
-        [\"titulo\", \"vph\", \"vistas\", \"duracion_segundos\", \"fecha_publicacion\", \"url_miniatura\"]
-    ].copy()
+    columns = ["titulo", "vph", "vistas", "duracion_segundos", "fecha_publicacion", "url_miniatura"]
+    if sort_by not in columns:
+        columns.append(sort_by)
+    top_videos = df_cliente.nlargest(n, sort_by)[columns].copy()
     
     # Formatear duración
-    top_videos[\"duracion_formateada\"] = top_videos[\"duracion_segundos\"].apply(
-        lambda x: f\"{int(x//60)}:{int(x%60):02d}\" if x >= 60 else f\"{int(x)}s\"
+    top_videos["duracion_formateada"] = top_videos["duracion_segundos"].apply(
+        lambda x: f"{int(x//60)}:{int(x%60):02d}" if x >= 60 else f"{int(x)}s"
     )
     
     return top_videos
@@ -237,20 +351,17 @@ def calculate_optimal_duration(df_cliente):
     """
     Calcula la duración óptima basada en VPH
     """
-    # Agrupar por rangos de duración
-    df_cliente[\"duracion_rango\"] = pd.cut(
-        df_cliente[\"duracion_segundos\"],
-        bins=[0, 60, 180, 300, 600, 1200, float(\'inf\')],
-        labels=[\'<1min\', \'1-3min\', \'3-5min\', \'5-10min\', \'10-20min\', \'>20min\']
-    )
-    
-    duration_stats = df_cliente.groupby(\'duracion_rango\').agg({
-        \"vph\": \'mean\',
-        \"vistas\": \'mean\',
-        \"video_id\": \'count\'
-    }).rename(columns={\"video_id\": \"num_videos\"})
+    # Agrupar por rangos de duración (se incluyen los rangos sin videos)
+    duration_stats = df_cliente.groupby(derived_column(df_cliente, 'duracion_rango'), observed=False).agg({
+        "vph": 'mean',
+        "vistas": 'mean',
+        "video_id": 'count'
+    }).rename(columns={"video_id": "num_videos"})
     
     # Encontrar la duración óptima
-    optimal_range = duration_stats[\"vph\"].idxmax()
+    optimal_range = duration_stats["vph"].idxmax()
     
     return duration_stats, optimal_range
+
+# Registro de tiempos de todas las funciones públicas del módulo (ver instrumentation.py)
+instrument_module(globals())
@@ -1,11 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from data_processing import load_and_preprocess_data, get_top_videos, filter_by_channel
+import numpy as np
+import io
+import os
+import threading
+from data_processing import (
+    load_dataset_cached,
+    load_dataset_sketches,
+    ingest_snapshot,
+    load_snapshot_deltas,
+    load_snapshot_times,
+    get_top_videos,
+    filter_by_channel,
+    build_channel_index,
+    build_rank_index,
+    get_leaderboard_page,
+    rank_videos,
+    RANK_COLUMNS,
+    build_channel_aggregates,
+    frame_totals,
+    metrics_from_totals,
+    compute_content_hash
+)
 from analytics_functions import (
-    analyze_channel_performance,
+    analyze_channel_performance_aggregated,
     create_performance_comparison_chart,
+    create_positioning_scatter,
     analyze_content_strategy,
     create_format_distribution_chart,
     analyze_temporal_trends,
@@ -15,7 +35,37 @@ from analytics_functions import (
     get_top_performing_videos,
     calculate_optimal_duration
 )
+from thumbnails import fetch_thumbnails
+from figure_cache import cached_figure
+from clara_scoring import (
+    CLARA_COMPONENTS,
+    CLARA_NORMALIZATION,
+    CLARA_WEIGHTS,
+    build_clara_state,
+    clara_scores,
+    clara_config_key,
+    clara_rank_error
+)
+from approximate import (
+    APPROX_DEFAULT_ROWS,
+    merge_chunk_sketches,
+    approximate_niche_summary,
+    approximate_vph_percentile,
+    approximate_bucket_performance,
+    approximate_keyword_frequencies
+)
+from instrumentation import (
+    timed,
+    call_sequence,
+    recent_calls,
+    timing_summary,
+    export_json,
+    export_prometheus,
+    profile_call
+)
+from time_series import build_snapshot_history, add_velocity_columns
 from title_analysis import (
+    build_title_index,
     analyze_title_patterns,
     create_wordcloud_from_titles,
     analyze_publishing_schedule,
@@ -31,6 +81,114 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Llamadas registradas antes de esta ejecución del script (el panel de rendimiento muestra las posteriores)
+inicio_ejecucion = call_sequence()
+
+# --- Caché de datos preprocesados --- #
+# Política de desalojo configurable: número máximo de archivos en memoria y tiempo de vida (segundos)
+CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", 4))
+CACHE_TTL_SECONDS = int(os.environ.get("DASHBOARD_CACHE_TTL", 3600))
+# Filas por bloque al leer el CSV (acota la memoria pico durante la carga)
+CSV_CHUNK_ROWS = int(os.environ.get("DASHBOARD_CSV_CHUNK_ROWS", 250_000))
+# El dataset y sus índices, agregados y sketches se guardan con st.cache_resource: todas las
+# sesiones comparten el mismo objeto (el DataFrame sigue mapeado en memoria desde la caché
+# Arrow) en lugar de recibir una copia deserializada en cada rerun. Son de solo lectura:
+# nada de lo que los recibe los modifica. st.cache_data queda para resultados pequeños.
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner="⏳ Procesando datos...")
+def cargar_datos(file_hash, _file_bytes, _sketches=False):
+    # La clave de caché es solo el hash del contenido (_file_bytes no se hashea en cada rerun)
+    # Si otra sesión ya procesó el mismo CSV se reutiliza su copia columnar en disco; en modo
+    # aproximado los sketches se construyen en la misma lectura y se guardan con ella
+    return load_dataset_cached(_file_bytes, content_hash=file_hash, chunksize=CSV_CHUNK_ROWS, sketches=_sketches)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def contar_filas(file_hash, _file_bytes):
+    # Filas del CSV sin parsearlo (para activar el modo aproximado antes de cargarlo)
+    return max(0, _file_bytes.count(b"\n") - 1)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner="⏳ Construyendo sketches del nicho...")
+def cargar_sketches(file_hash, _df):
+    # Modo aproximado: sketches por bloque guardados con el dataset (se unen al consultarlos);
+    # solo se construyen aquí si el dataset se cargó sin ellos
+    return load_dataset_sketches(_df, file_hash, chunk_rows=CSV_CHUNK_ROWS)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner="⏳ Incorporando snapshot...")
+def cargar_snapshot(file_hash, _file_bytes):
+    # Modo incremental: el CSV es el snapshot del día y se cruza por video_id con el anterior
+    # (solo se reprocesan los videos nuevos o cambiados); el resultado incluye el archivo histórico
+    df, deltas = ingest_snapshot(io.BytesIO(_file_bytes))
+    # Con varios snapshots se puede medir la velocidad real (vistas ganadas en 24h / 7d)
+    history = build_snapshot_history(load_snapshot_deltas(), load_snapshot_times())
+    return add_velocity_columns(df, history), deltas
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def construir_indice_canales(file_hash, _df):
+    # Posiciones por canal y formato, calculadas una sola vez por dataset
+    return build_channel_index(_df)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def construir_estado_clara(file_hash, _df):
+    # Mínimos, máximos y sketches de cuantiles de las métricas de CLARA, una vez por dataset
+    return build_clara_state(_df)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner="⏳ Recalculando el índice CLARA...")
+def recalcular_clara(file_hash, normalizacion, pesos, _df, _estado_clara):
+    # Índice CLARA con otros pesos o normalización: se reutiliza el estado del dataset y
+    # solo se reasignan dos columnas (el resto del DataFrame no se copia)
+    clara_index, vistas_normalizadas = clara_scores(_df, _estado_clara, dict(pesos), normalizacion)
+    df_clara = _df.copy(deep=False)
+    df_clara["vistas_normalizadas"] = np.asarray(vistas_normalizadas, dtype=np.float32)
+    df_clara["clara_index"] = np.asarray(clara_index, dtype=np.float32)
+    return df_clara
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def construir_indice_rankings(file_hash, clave_clara, columnas, _df):
+    # Orden de cada métrica de ranking por formato: el top N es un corte de este índice
+    return build_rank_index(_df, columnas)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def construir_agregados_canales(file_hash, _df):
+    # Sumas y conteos por canal en una sola pasada; las métricas se derivan de aquí
+    return build_channel_aggregates(_df)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def construir_indice_titulos(file_hash, _df):
+    # Títulos tokenizados una sola vez; las palabras clave de cualquier subconjunto salen de aquí
+    return build_title_index(_df["titulo"])
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES * 64, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def calcular_seccion(seccion, file_hash, clave_clara, canal, params, _fn, _args):
+    # Clave: (cálculo, dataset, configuración de CLARA, canal, parámetros); la función y sus
+    # datos no se hashean
+    return _fn(*_args)
+
+def estado_clara():
+    # Estado de normalización de CLARA del dataset: en modo aproximado sale de los sketches
+    # por bloque (no se recorre el dataset)
+    if sketches_nicho is not None:
+        return merge_chunk_sketches(sketches_nicho, ("clara",))["clara"]
+    return construir_estado_clara(file_hash, df)
+
+def memo_seccion(seccion, fn, *args, canal=None, params=()):
+    # Memoiza resultados costosos (nubes de palabras, agregados) de una sección
+    # para que volver a ella sea casi gratis; canal=None para resultados de todo el nicho.
+    # Con otros pesos o normalización de CLARA el DataFrame cambia y no se reutilizan
+    return calcular_seccion(seccion, file_hash, clave_clara, canal, params, fn, args)
+
+def obtener_hash_archivo(uploaded_file):
+    # Guardar el hash por archivo subido para no recalcularlo en cada interacción
+    hashes = st.session_state.setdefault("file_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = compute_content_hash(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+def obtener_miniaturas(urls):
+    # Descarga en paralelo las miniaturas que falten y devuelve {url: fuente para st.image};
+    # si una no se pudo descargar se deja la URL original para que la cargue el navegador
+    rutas = fetch_thumbnails(urls)
+    return {url: rutas.get(url) or url for url in urls}
+
 # --- Estilos CSS personalizados --- #
 st.markdown("""
 <style>
@@ -100,40 +258,105 @@ uploaded_file = st.sidebar.file_uploader("📁 Sube tu archivo CSV de YouTube",
 
 df = None
 if uploaded_file is not None:
-    df = load_and_preprocess_data(uploaded_file)
+    file_hash = obtener_hash_archivo(uploaded_file)
+    if st.sidebar.checkbox("🔄 Ingesta incremental (snapshot diario)",
+                           help="Actualiza el histórico guardado con este CSV: solo se reprocesan los videos nuevos o con cambios"):
+        df, deltas = cargar_snapshot(file_hash, uploaded_file.getvalue())
+        # El dataset resultante depende del histórico, no solo de este archivo
+        file_hash = f"snapshot-{file_hash}"
+        st.sidebar.caption(f"🆕 {int((deltas['estado'] == 'nuevo').sum())} nuevos · "
+                           f"✏️ {int((deltas['estado'] == 'actualizado').sum())} actualizados")
+        n_filas = len(df)
+    else:
+        n_filas = contar_filas(file_hash, uploaded_file.getvalue())
+
+    # Modo aproximado: conteos, distribuciones y frecuencias del nicho a partir de sketches por
+    # bloque; los índices y agregados exactos del dataset completo no se construyen
+    modo_aproximado = st.sidebar.checkbox("≈ Modo aproximado (sketches)", value=n_filas >= APPROX_DEFAULT_ROWS,
+                                          help="Para archivos muy grandes: videos y canales distintos, distribución del VPH y frecuencia de palabras del nicho estimados con sketches, con su margen de error")
+    if df is None:
+        df = cargar_datos(file_hash, uploaded_file.getvalue(), modo_aproximado)
+    sketches_nicho = cargar_sketches(file_hash, df) if modo_aproximado else None
+
+    # Pesos y normalización del índice CLARA (por defecto, los de la carga)
+    with st.sidebar.expander("⚖️ Índice CLARA"):
+        normalizaciones = {"Fórmula original": "original", "Percentiles (robusta a videos virales)": "percentile"}
+        normalizacion = normalizaciones[st.selectbox(
+            "Normalización", list(normalizaciones),
+            index=list(normalizaciones.values()).index(CLARA_NORMALIZATION),
+            help="Con percentiles cada métrica se puntúa por su posición en el nicho (0-100), así un video viral no cambia la escala del resto"
+        )]
+        nombres_metricas = {"vph": "VPH", "indice_conexion": "Índice de Conexión", "vistas": "Vistas"}
+        pesos = tuple((col, st.number_input(f"Peso: {nombres_metricas[col]}", min_value=0.0, max_value=10.0,
+                                            value=float(CLARA_WEIGHTS[col]), step=0.05))
+                      for col in CLARA_COMPONENTS)
+        configuracion_clara = (normalizacion, pesos)
+        clave_clara = clara_config_key(dict(pesos), normalizacion)
+        if configuracion_clara != (CLARA_NORMALIZATION, tuple((col, CLARA_WEIGHTS[col]) for col in CLARA_COMPONENTS)):
+            df = recalcular_clara(file_hash, normalizacion, pesos, df, estado_clara())
+        if normalizacion == "percentile":
+            errores = clara_rank_error(estado_clara())
+            st.caption("Error máximo de los percentiles (puntos): " + " · ".join(
+                f"{nombres_metricas[col]} ±{error:.2f}" for col, error in errores.items()))
+
     st.sidebar.success(f"✅ Datos cargados: {len(df)} videos analizados.")
 
-    all_channels = ["Todos los Canales"] + sorted(df["nombre_canal"].unique().tolist())
+    if sketches_nicho is None:
+        channel_index = construir_indice_canales(file_hash, df)
+        canales = channel_index["channels"]
+    else:
+        channel_index = None
+        canales = list(df["nombre_canal"].astype("category").cat.categories)
+        resumen_aproximado = approximate_niche_summary(sketches_nicho)
+        st.sidebar.caption(f"≈ {resumen_aproximado['videos']:,.0f} videos distintos · ≈ {resumen_aproximado['channels']:,.0f} canales "
+                           f"(error típico ±{resumen_aproximado['distinct_error']:.1%})")
+
+    all_channels = ["Todos los Canales"] + canales
     selected_channel = st.sidebar.selectbox(
         "👤 Selecciona el canal del cliente",
         all_channels
     )
 
+    # Criterio de los rankings de videos (las velocidades solo existen en modo incremental)
+    criterios_ranking = {"VPH (promedio desde la publicación)": "vph"}
+    if "vph_24h" in df.columns:
+        criterios_ranking.update({"Vistas/hora últimas 24h": "vph_24h", "Vistas/hora últimos 7 días": "vph_7d"})
+    criterio_ranking = criterios_ranking[st.sidebar.selectbox("📈 Ordenar rankings por", list(criterios_ranking))]
+    # Además del criterio de los rankings, conexión e índice CLARA para puestos y percentiles
+    columnas_ranking = tuple(dict.fromkeys(list(criterios_ranking.values()) + list(RANK_COLUMNS)))
+    # Sin índice de rankings (modo aproximado) los tops se seleccionan con argpartition
+    rank_index = construir_indice_rankings(file_hash, clave_clara, columnas_ranking, df) if sketches_nicho is None else None
+
     if selected_channel != "Todos los Canales":
-        df_cliente = filter_by_channel(df, selected_channel)
-        df_competencia = df[df["nombre_canal"] != selected_channel]
+        df_cliente = filter_by_channel(df, selected_channel, channel_index)
         canal_cliente = selected_channel
     else:
         df_cliente = df
-        df_competencia = df # En este caso, la competencia es el mismo dataset
         canal_cliente = "Todos los Canales"
 
-    # Calcular métricas promedio de la competencia (si aplica)
-    if not df_competencia.empty:
-        avg_vph_competencia = df_competencia["vph"].mean()
-        avg_connection_index_competencia = df_competencia["indice_conexion"].mean()
-        avg_duration_competencia = df_competencia["duracion_segundos"].mean()
+    if sketches_nicho is None:
+        channel_aggregates = construir_agregados_canales(file_hash, df)
+        # Competencia = total del nicho - canal, sin volver a filtrar los datos; con todos los
+        # canales la competencia es el mismo dataset
+        metricas_cliente, metricas_competencia = analyze_channel_performance_aggregated(
+            channel_aggregates, None if canal_cliente == "Todos los Canales" else canal_cliente)
     else:
-        avg_vph_competencia = 0
-        avg_connection_index_competencia = 0
-        avg_duration_competencia = 0
+        # Modo aproximado: el total del nicho sale de las sumas por bloque y solo se suman las
+        # filas del canal
+        totales_nicho = merge_chunk_sketches(sketches_nicho, ("totals",))["totals"]
+        totales_cliente = totales_nicho if canal_cliente == "Todos los Canales" else frame_totals(df_cliente)
+        totales_competencia = totales_nicho if canal_cliente == "Todos los Canales" else totales_nicho - totales_cliente
+        metricas_cliente, metricas_competencia = metrics_from_totals(totales_cliente), metrics_from_totals(totales_competencia)
 
     # Crear un diccionario de métricas de competencia para pasar a las funciones
-    metricas_competencia_dict = {
-        "avg_vph": avg_vph_competencia,
-        "avg_connection_index": avg_connection_index_competencia,
-        "avg_duration": avg_duration_competencia
-    }
+    if metricas_competencia["total_videos"] > 0:
+        metricas_competencia_dict = metricas_competencia
+    else:
+        metricas_competencia_dict = {
+            "avg_vph": 0,
+            "avg_connection_index": 0,
+            "avg_duration": 0
+        }
 
 else:
     st.info("Sube un archivo CSV para comenzar el análisis.")
@@ -162,15 +385,14 @@ else:
 
 # --- Funciones para mostrar cada sección --- #
 
-def mostrar_resumen_ejecutivo(df_cliente, metricas_competencia_dict, canal_cliente):
+@timed
+def mostrar_resumen_ejecutivo(df_cliente, metricas_cliente, metricas_competencia_dict, canal_cliente):
     st.markdown("<h2 class=\"section-header\">🏠 Resumen Ejecutivo</h2>", unsafe_allow_html=True)
 
     if len(df_cliente) == 0:
         st.warning("No hay datos disponibles para este canal.")
         return
 
-    metricas_cliente, _ = analyze_channel_performance(df_cliente, df_competencia)
-
     st.markdown(f"### 📈 Rendimiento General de {canal_cliente}")
 
     col1, col2, col3 = st.columns(3)
@@ -178,22 +400,22 @@ def mostrar_resumen_ejecutivo(df_cliente, metricas_competencia_dict, canal_clien
     with col1:
         st.metric(
             label="VPH Promedio",
-            value=f"{metricas_cliente["avg_vph"]:.1f}",
-            delta=f"{(metricas_cliente["avg_vph"] - metricas_competencia_dict["avg_vph"]):.1f} vs Competencia",
+            value=f"{metricas_cliente['avg_vph']:.1f}",
+            delta=f"{(metricas_cliente['avg_vph'] - metricas_competencia_dict['avg_vph']):.1f} vs Competencia",
             delta_color="inverse"
         )
     with col2:
         st.metric(
             label="Índice de Conexión Promedio",
-            value=f"{metricas_cliente["avg_connection_index"]:.1f}%",
-            delta=f"{(metricas_cliente["avg_connection_index"] - metricas_competencia_dict["avg_connection_index"]):.1f}% vs Competencia",
+            value=f"{metricas_cliente['avg_connection_index']:.1f}%",
+            delta=f"{(metricas_cliente['avg_connection_index'] - metricas_competencia_dict['avg_connection_index']):.1f}% vs Competencia",
             delta_color="inverse"
         )
     with col3:
         st.metric(
             label="Duración Promedio",
-            value=f"{metricas_cliente["avg_duration"] / 60:.1f} min",
-            delta=f"{(metricas_cliente["avg_duration"] / 60 - metricas_competencia_dict["avg_duration"] / 60):.1f} min vs Competencia",
+            value=f"{metricas_cliente['avg_duration'] / 60:.1f} min",
+            delta=f"{(metricas_cliente['avg_duration'] / 60 - metricas_competencia_dict['avg_duration'] / 60):.1f} min vs Competencia",
             delta_color="inverse"
         )
 
@@ -207,10 +429,31 @@ def mostrar_resumen_ejecutivo(df_cliente, metricas_competencia_dict, canal_clien
     </div>
     """, unsafe_allow_html=True)
 
-    fig_comparison = create_performance_comparison_chart(metricas_cliente, metricas_competencia_dict)
+    fig_comparison = cached_figure("resumen_comparacion", create_performance_comparison_chart,
+                                   metricas_cliente, metricas_competencia_dict)
     st.plotly_chart(fig_comparison, use_container_width=True)
 
-def mostrar_posicionamiento_general(df_cliente, df_competencia, canal_cliente):
+    if sketches_nicho is not None:
+        mostrar_distribucion_aproximada(metricas_cliente)
+
+@timed
+def mostrar_distribucion_aproximada(metricas_cliente):
+    # Modo aproximado: cuantiles del VPH del nicho y percentil del VPH promedio del canal
+    resumen = approximate_niche_summary(sketches_nicho)
+    percentil, error_percentil = approximate_vph_percentile(sketches_nicho, metricas_cliente["avg_vph"])
+    st.markdown("### ≈ Tu Canal en la Distribución del Nicho")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("VPH Mediano del Nicho", f"≈ {resumen['vph_quantiles'][0.5]:.1f}", help=f"Error relativo máximo ±{resumen['vph_error']:.0%}")
+    with col2:
+        st.metric("VPH Percentil 90", f"≈ {resumen['vph_quantiles'][0.9]:.1f}", help=f"Error relativo máximo ±{resumen['vph_error']:.0%}")
+    with col3:
+        st.metric("VPH Percentil 99", f"≈ {resumen['vph_quantiles'][0.99]:.1f}", help=f"Error relativo máximo ±{resumen['vph_error']:.0%}")
+    with col4:
+        st.metric("Percentil de tu VPH Promedio", f"≈ {float(percentil):.1f}", help=f"Error máximo ±{error_percentil:.1f} puntos")
+
+@timed
+def mostrar_posicionamiento_general(df_cliente, canal_cliente):
     st.markdown("<h2 class=\"section-header\">📊 Posicionamiento General</h2>", unsafe_allow_html=True)
 
     if len(df_cliente) == 0:
@@ -225,18 +468,11 @@ def mostrar_posicionamiento_general(df_cliente, df_competencia, canal_cliente):
     """)
 
     # Gráfico de dispersión VPH vs Vistas
-    fig_vph_views = px.scatter(
-        df,
-        x="vistas",
-        y="vph",
-        color="nombre_canal",
-        hover_name="titulo",
-        log_x=True,
-        size="duracion_segundos",
-        color_discrete_map={canal_cliente: "#FF0000"},
-        title="📈 VPH vs Vistas: ¿Quién crece más rápido y llega más lejos?"
+    # Entrada = dataset completo: la clave es (archivo, canal) en lugar del hash de los datos
+    fig_vph_views = cached_figure(
+        "posicionamiento_vph", create_positioning_scatter, df, "vph", canal_cliente,
+        "📈 VPH vs Vistas: ¿Quién crece más rápido y llega más lejos?", channel_index, key=(file_hash, canal_cliente)
     )
-    fig_vph_views.update_layout(height=600)
     st.plotly_chart(fig_vph_views, use_container_width=True)
 
     st.markdown("""
@@ -249,18 +485,10 @@ def mostrar_posicionamiento_general(df_cliente, df_competencia, canal_cliente):
     """, unsafe_allow_html=True)
 
     # Gráfico de dispersión Índice de Conexión vs Vistas
-    fig_connection_views = px.scatter(
-        df,
-        x="vistas",
-        y="indice_conexion",
-        color="nombre_canal",
-        hover_name="titulo",
-        log_x=True,
-        size="duracion_segundos",
-        color_discrete_map={canal_cliente: "#FF0000"},
-        title="❤️ Índice de Conexión vs Vistas: ¿Quién conecta más con su audiencia?"
+    fig_connection_views = cached_figure(
+        "posicionamiento_conexion", create_positioning_scatter, df, "indice_conexion", canal_cliente,
+        "❤️ Índice de Conexión vs Vistas: ¿Quién conecta más con su audiencia?", channel_index, key=(file_hash, canal_cliente)
     )
-    fig_connection_views.update_layout(height=600)
     st.plotly_chart(fig_connection_views, use_container_width=True)
 
     st.markdown("""
@@ -271,6 +499,7 @@ def mostrar_posicionamiento_general(df_cliente, df_competencia, canal_cliente):
     </div>
     """, unsafe_allow_html=True)
 
+@timed
 def mostrar_estrategia_contenido(df_cliente, canal_cliente):
     st.markdown("<h2 class=\"section-header\">🚀 Estrategia de Contenido</h2>", unsafe_allow_html=True)
 
@@ -285,19 +514,19 @@ def mostrar_estrategia_contenido(df_cliente, canal_cliente):
     y qué temas son los más populares en tu canal.
     """)
 
-    strategy_analysis = analyze_content_strategy(df_cliente)
+    strategy_analysis = memo_seccion("estrategia_formatos", analyze_content_strategy, df_cliente, canal=canal_cliente)
 
     col1, col2 = st.columns(2)
     with col1:
         st.metric("Total Shorts", strategy_analysis["shorts"]["count"])
-        st.metric("VPH Promedio Shorts", f"{strategy_analysis["shorts"]["avg_vph"]:.1f}")
-        st.metric("Vistas Promedio Shorts", f"{strategy_analysis["shorts"]["avg_views"]:.0f}")
+        st.metric("VPH Promedio Shorts", f"{strategy_analysis['shorts']['avg_vph']:.1f}")
+        st.metric("Vistas Promedio Shorts", f"{strategy_analysis['shorts']['avg_views']:.0f}")
     with col2:
         st.metric("Total Videos Largos", strategy_analysis["largos"]["count"])
-        st.metric("VPH Promedio Largos", f"{strategy_analysis["largos"]["avg_vph"]:.1f}")
-        st.metric("Vistas Promedio Largos", f"{strategy_analysis["largos"]["avg_views"]:.0f}")
+        st.metric("VPH Promedio Largos", f"{strategy_analysis['largos']['avg_vph']:.1f}")
+        st.metric("Vistas Promedio Largos", f"{strategy_analysis['largos']['avg_views']:.0f}")
 
-    fig_format_dist = create_format_distribution_chart(strategy_analysis)
+    fig_format_dist = cached_figure("estrategia_formatos", create_format_distribution_chart, strategy_analysis)
     st.plotly_chart(fig_format_dist, use_container_width=True)
 
     st.markdown("""
@@ -309,9 +538,9 @@ def mostrar_estrategia_contenido(df_cliente, canal_cliente):
     """, unsafe_allow_html=True)
 
     st.markdown("### 🎯 Temas que Conectan con Tu Audiencia")
-    bucket_stats = analyze_bucket_performance(df_cliente)
+    bucket_stats = memo_seccion("estrategia_buckets", analyze_bucket_performance, df_cliente, canal=canal_cliente)
     if not bucket_stats.empty:
-        fig_bucket_perf = create_bucket_performance_chart(bucket_stats)
+        fig_bucket_perf = cached_figure("estrategia_buckets", create_bucket_performance_chart, bucket_stats)
         st.plotly_chart(fig_bucket_perf, use_container_width=True)
 
         st.markdown("""
@@ -324,8 +553,22 @@ def mostrar_estrategia_contenido(df_cliente, canal_cliente):
     else:
         st.info("No hay suficientes datos para analizar los buckets temáticos. Asegúrate de que los títulos de tus videos contengan palabras clave relevantes.")
 
+    if sketches_nicho is not None:
+        st.markdown("#### ≈ Temas en Todo el Nicho")
+        buckets_nicho = approximate_bucket_performance(sketches_nicho)
+        st.dataframe(
+            buckets_nicho.drop(columns="error_relativo"),
+            column_config={
+                "num_videos": st.column_config.NumberColumn("Videos", format="localized"),
+                "vph_mediana": st.column_config.NumberColumn("VPH mediano ≈", format="%.2f"),
+                "vph_p90": st.column_config.NumberColumn("VPH percentil 90 ≈", format="%.2f"),
+            },
+            use_container_width=True
+        )
+        st.caption(f"Estimado con sketches de cuantiles: error relativo máximo ±{buckets_nicho['error_relativo'].max():.0%} en el VPH.")
+
     st.markdown("### ⏱️ Duración Óptima de Tus Videos")
-    duration_stats, optimal_range = calculate_optimal_duration(df_cliente)
+    duration_stats, optimal_range = memo_seccion("estrategia_duracion", calculate_optimal_duration, df_cliente, canal=canal_cliente)
     if not duration_stats.empty:
         st.dataframe(duration_stats.sort_values("vph", ascending=False), use_container_width=True)
         st.markdown(f"""
@@ -337,6 +580,7 @@ def mostrar_estrategia_contenido(df_cliente, canal_cliente):
     else:
         st.info("No hay suficientes datos para calcular la duración óptima.")
 
+@timed
 def mostrar_videos_estrella(df_cliente, canal_cliente):
     st.markdown("<h2 class=\"section-header\">🏆 Videos Estrella</h2>", unsafe_allow_html=True)
 
@@ -351,12 +595,14 @@ def mostrar_videos_estrella(df_cliente, canal_cliente):
     ¡Aprende de ellos para crear tu próximo éxito!
     """)
 
-    top_videos = get_top_performing_videos(df_cliente, n=20)
+    top_videos = memo_seccion("videos_estrella", get_top_performing_videos, df_cliente, 20, criterio_ranking,
+                              canal=canal_cliente, params=(criterio_ranking,))
 
     if not top_videos.empty:
         # Mostrar videos en una grilla
         cols_per_row = 4
         videos_list = list(top_videos.iterrows())
+        miniaturas = obtener_miniaturas(top_videos["url_miniatura"].tolist())
 
         for i in range(0, len(videos_list), cols_per_row):
             cols = st.columns(cols_per_row)
@@ -366,17 +612,14 @@ def mostrar_videos_estrella(df_cliente, canal_cliente):
                     with cols[j]:
                         try:
                             st.image(
-                                video["url_miniatura"],
+                                miniaturas[video["url_miniatura"]],
                                 width=150,
-                                caption=f"VPH: {video["vph"]:.1f}"
+                                caption=f"VPH: {video['vph']:.1f}"
                             )
-                            st.markdown(f"**{video["titulo"]}**  
-👀 {video["vistas"]:,} vistas  
-⏱️ {video["duracion_formateada"]}", unsafe_allow_html=True)
+                            st.markdown(f"**{video['titulo']}**  \n👀 {video['vistas']:,} vistas  \n⏱️ {video['duracion_formateada']}", unsafe_allow_html=True)
                         except Exception as e:
-                            st.error(f"Error cargando miniatura para {video["titulo"]}")
-                            st.markdown(f"**{video["titulo"]}**  
-VPH: {video["vph"]:.1f}")
+                            st.error(f"Error cargando miniatura para {video['titulo']}")
+                            st.markdown(f"**{video['titulo']}**  \nVPH: {video['vph']:.1f}")
     else:
         st.info("No hay videos para mostrar en esta sección.")
 
@@ -390,36 +633,40 @@ VPH: {video["vph"]:.1f}")
     </div>
     """, unsafe_allow_html=True)
 
-def mostrar_optimizacion_titulos(df_cliente, df_competencia, canal_cliente):
+@timed
+def mostrar_optimizacion_titulos(df_cliente, canal_cliente):
     st.markdown("<h2 class=\"section-header\">✍️ Optimización de Títulos</h2>", unsafe_allow_html=True)
     
     if len(df_cliente) == 0:
         st.warning("No hay datos disponibles para este canal.")
         return
     
+    # En modo aproximado no se tokeniza el dataset completo: solo los títulos que se analizan
+    title_index = construir_indice_titulos(file_hash, df) if sketches_nicho is None else None
+
     # Análisis de patrones de títulos
-    patterns, top_videos = analyze_title_patterns(df_cliente)
+    patterns, top_videos = memo_seccion("titulos_patrones", analyze_title_patterns, df_cliente, canal=canal_cliente)
     
     # Mostrar estadísticas de patrones
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("❓ Títulos con Preguntas", f"{patterns["preguntas"]}/20")
+        st.metric("❓ Títulos con Preguntas", f"{patterns['preguntas']}/20")
     
     with col2:
-        st.metric("🔢 Títulos con Números", f"{patterns["numeros"]}/20")
+        st.metric("🔢 Títulos con Números", f"{patterns['numeros']}/20")
     
     with col3:
         st.metric("💪 Palabras de Poder", patterns["palabras_poder"])
     
     with col4:
-        st.metric("📏 Longitud Promedio", f"{patterns["longitud_promedio"]:.0f} chars")
+        st.metric("📏 Longitud Promedio", f"{patterns['longitud_promedio']:.0f} chars")
     
     # Nube de palabras
     st.markdown("### ☁️ Palabras Clave Más Exitosas")
     
     try:
-        wordcloud_img = create_wordcloud_from_titles(df_cliente)
+        wordcloud_img = memo_seccion("titulos_nube", create_wordcloud_from_titles, df_cliente, 50, title_index, canal=canal_cliente)
         if wordcloud_img:
             st.image(wordcloud_img, caption="Nube de palabras de tus videos más exitosos")
         else:
@@ -430,14 +677,21 @@ def mostrar_optimizacion_titulos(df_cliente, df_competencia, canal_cliente):
     
     # Recomendaciones SEO
     st.markdown("### 🎯 Recomendaciones SEO")
-    seo_recs = generate_seo_recommendations(df_cliente)
+    seo_recs = memo_seccion("titulos_seo", generate_seo_recommendations, df_cliente, title_index, patterns, canal=canal_cliente)
     
     # Mostrar top keywords
     if seo_recs["top_keywords"]:
         st.markdown("#### 🔑 Palabras Clave Más Exitosas:")
         keywords_df = pd.DataFrame(list(seo_recs["top_keywords"].items()), 
                                  columns=["Palabra Clave", "Frecuencia"])
+        if sketches_nicho is not None:
+            frecuencias_nicho = approximate_keyword_frequencies(sketches_nicho, keywords_df["Palabra Clave"])
+            keywords_df["Frecuencia en el Nicho (≈)"] = frecuencias_nicho["frecuencia"].to_numpy()
         st.dataframe(keywords_df, use_container_width=True)
+        if sketches_nicho is not None:
+            st.caption(f"Frecuencia en el nicho estimada con un sketch count-min: como mucho "
+                       f"{frecuencias_nicho['error'].iloc[0]:,.0f} apariciones de más, con probabilidad "
+                       f"{frecuencias_nicho['confianza'].iloc[0]:.0%}.")
     
     # Plantillas de títulos
     if seo_recs["title_template"]:
@@ -447,7 +701,7 @@ def mostrar_optimizacion_titulos(df_cliente, df_competencia, canal_cliente):
             st.markdown(f"{i}. `{template}`")
     
     # Longitud óptima
-    st.markdown(f"#### 📏 Longitud Óptima de Título: **{seo_recs["optimal_title_length"]:.0f} caracteres**")
+    st.markdown(f"#### 📏 Longitud Óptima de Título: **{seo_recs['optimal_title_length']:.0f} caracteres**")
     
     # Explicación para niños
     st.markdown("""
@@ -460,6 +714,7 @@ def mostrar_optimizacion_titulos(df_cliente, df_competencia, canal_cliente):
     </div>
     """, unsafe_allow_html=True)
 
+@timed
 def mostrar_calendario_seo(df_cliente, canal_cliente):
     st.markdown("<h2 class=\"section-header\">🗓️ Calendario y SEO</h2>", unsafe_allow_html=True)
     
@@ -468,11 +723,11 @@ def mostrar_calendario_seo(df_cliente, canal_cliente):
         return
     
     # Análisis de horarios de publicación
-    day_performance, hour_performance = analyze_publishing_schedule(df_cliente)
+    day_performance, hour_performance = memo_seccion("calendario", analyze_publishing_schedule, df_cliente, canal=canal_cliente)
     
     if len(day_performance) > 0 and len(hour_performance) > 0:
         # Crear gráficos de horarios
-        fig_days, fig_hours = create_publishing_heatmap(day_performance, hour_performance)
+        fig_days, fig_hours = cached_figure("calendario", create_publishing_heatmap, day_performance, hour_performance)
         
         # Mostrar gráficos
         col1, col2 = st.columns(2)
@@ -557,7 +812,69 @@ def mostrar_calendario_seo(df_cliente, canal_cliente):
     </div>
     """, unsafe_allow_html=True)
 
-def mostrar_top_videos_nicho(df):
+# Tamaños del top del nicho y filas por página de sus tablas
+TOP_NICHO_OPCIONES = [200, 500, 1000, 2000, 5000]
+FILAS_POR_PAGINA = 50
+COLUMNAS_TABLA_TOP = ["titulo", "nombre_canal", "vph", "vistas", "duracion_segundos", "fecha_publicacion"]
+# Nombre corto de cada criterio de ranking para los encabezados
+NOMBRES_CRITERIOS = {"vph": "VPH", "vph_24h": "vistas/hora de las últimas 24h", "vph_7d": "vistas/hora de los últimos 7 días"}
+
+def configuracion_tabla_videos(formato=None):
+    # Formato de las columnas en el navegador (sin convertir cada celda a texto en Python)
+    return {
+        "puesto": st.column_config.NumberColumn("Puesto", format="#%d", width="small"),
+        "titulo": st.column_config.TextColumn("Título", width="large"),
+        "nombre_canal": st.column_config.TextColumn("Canal"),
+        "formato": st.column_config.TextColumn("Formato", width="small"),
+        "vph": st.column_config.NumberColumn("VPH", format="%.1f"),
+        "vph_24h": st.column_config.NumberColumn("Vistas/hora 24h", format="%.1f"),
+        "vph_7d": st.column_config.NumberColumn("Vistas/hora 7d", format="%.1f"),
+        "indice_conexion": st.column_config.NumberColumn("Índice de Conexión", format="%.2f"),
+        "clara_index": st.column_config.NumberColumn("Índice CLARA", format="%.1f"),
+        "vistas": st.column_config.NumberColumn("Vistas", format="localized"),
+        "duracion_segundos": st.column_config.NumberColumn("Duración", format="%ds") if formato == "Short"
+            else st.column_config.TextColumn("Duración", width="small"),
+        "fecha_publicacion": st.column_config.DatetimeColumn("Fecha", format="DD/MM/YYYY"),
+    }
+
+@timed
+def mostrar_tabla_top(df, rank_index, formato, top_n):
+    # Tabla paginada del top top_n de un formato; devuelve el top (métricas) o None si está vacío
+    top = get_top_videos(df, top_n, criterio_ranking, rank_index=rank_index, formato=formato)
+    if len(top) == 0:
+        return None
+    # Solo videos con puesto (sin NaN en el criterio): las páginas y las estadísticas salen
+    # de los mismos videos que muestra la tabla
+    paginas = -(-len(top) // FILAS_POR_PAGINA)
+    nombre = "Shorts" if formato == "Short" else "Videos Largos"
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown(f"**{'📱' if formato == 'Short' else '🎬'} Top {len(top):,} {nombre} por "
+                    f"{NOMBRES_CRITERIOS[criterio_ranking]} en el nicho:**")
+    with col2:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, step=1, key=f"top_pagina_{formato}")
+    
+    # La columna del criterio, junto al VPH, si se ordena por otra velocidad
+    columnas = list(dict.fromkeys(COLUMNAS_TABLA_TOP[:3] + [criterio_ranking] + COLUMNAS_TABLA_TOP[3:]))
+    if rank_index is not None:
+        videos, _ = get_leaderboard_page(df, rank_index, criterio_ranking, pagina, FILAS_POR_PAGINA, formato,
+                                         limit=top_n, columns=columnas)
+    else:
+        # Modo aproximado: la página es un corte del top ya seleccionado, con el mismo puesto
+        # que get_leaderboard_page (empates con el mejor puesto)
+        filas = slice((pagina - 1) * FILAS_POR_PAGINA, pagina * FILAS_POR_PAGINA)
+        videos = top[columnas].iloc[filas].copy()
+        videos.insert(0, "puesto", top[criterio_ranking].rank(method="min", ascending=False).iloc[filas].astype(np.int64))
+    if formato != "Short":
+        # m:ss solo para las filas de la página
+        duracion = videos["duracion_segundos"].astype(np.int64)
+        videos["duracion_segundos"] = (duracion // 60).astype(str) + ":" + (duracion % 60).astype(str).str.zfill(2)
+    st.dataframe(videos, column_config=configuracion_tabla_videos(formato), hide_index=True,
+                 use_container_width=True, height=600)
+    return top[["vph", "duracion_segundos"]]
+
+@timed
+def mostrar_top_videos_nicho(df, rank_index=None, df_cliente=None, canal_cliente=None):
     st.markdown("<h2 class=\"section-header\">🔍 Top Videos del Nicho</h2>", unsafe_allow_html=True)
     
     st.markdown("""
@@ -567,78 +884,42 @@ def mostrar_top_videos_nicho(df):
     Analízalos para entender qué funciona en tu nicho y replica sus estrategias.
     """)
     
-    # Separar por formato
-    df_shorts = df[df["formato"] == "Short"]
-    df_largos = df[df["formato"] == "Largo"]
+    top_n = st.select_slider("Videos en el top de cada formato", options=TOP_NICHO_OPCIONES, value=TOP_NICHO_OPCIONES[0])
     
     # Tabs para separar shorts y largos
-    tab1, tab2 = st.tabs(["📱 Top 200 Shorts", "🎬 Top 200 Videos Largos"])
+    tab1, tab2 = st.tabs([f"📱 Top {top_n:,} Shorts", f"🎬 Top {top_n:,} Videos Largos"])
     
     with tab1:
-        if len(df_shorts) > 0:
-            top_shorts = get_top_videos(df_shorts, num_videos=min(200, len(df_shorts)))
-            
-            st.markdown(f"**📱 Top {len(top_shorts)} Shorts por VPH en el nicho:**")
-            
-            # Preparar datos para mostrar
-            display_shorts = top_shorts.copy()
-            display_shorts["VPH"] = display_shorts["vph"].round(1)
-            display_shorts["Vistas"] = display_shorts["vistas"].apply(lambda x: f"{x:,}")
-            display_shorts["Duración"] = display_shorts["duracion_segundos"].apply(lambda x: f"{int(x)}s")
-            display_shorts["Fecha"] = pd.to_datetime(display_shorts["fecha_publicacion"]).dt.strftime("%d/%m/%Y")
-            display_shorts["Canal"] = display_shorts["nombre_canal"]
-            display_shorts["Título"] = display_shorts["titulo"].str[:60] + "..."
-            
-            st.dataframe(
-                display_shorts[["Título", "Canal", "VPH", "Vistas", "Duración", "Fecha"]],
-                use_container_width=True,
-                height=600
-            )
-            
+        # Solo la página visible sale del índice de rankings; las estadísticas usan el top completo
+        top_shorts = mostrar_tabla_top(df, rank_index, "Short", top_n)
+        if top_shorts is not None:
             # Estadísticas de shorts
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("🏆 VPH Máximo", f"{top_shorts["vph"].max():.1f}")
+                st.metric("🏆 VPH Máximo", f"{top_shorts['vph'].max():.1f}")
             with col2:
-                st.metric("📊 VPH Promedio", f"{top_shorts["vph"].mean():.1f}")
+                st.metric("📊 VPH Promedio", f"{top_shorts['vph'].mean():.1f}")
             with col3:
-                st.metric("⏱️ Duración Promedio", f"{top_shorts["duracion_segundos"].mean():.0f}s")
+                st.metric("⏱️ Duración Promedio", f"{top_shorts['duracion_segundos'].mean():.0f}s")
         else:
-            st.warning("No se encontraron videos cortos en los datos.")
+            st.warning(f"No se encontraron videos cortos con {NOMBRES_CRITERIOS[criterio_ranking]} en los datos.")
     
     with tab2:
-        if len(df_largos) > 0:
-            top_largos = get_top_videos(df_largos, num_videos=min(200, len(df_largos)))
-            
-            st.markdown(f"**🎬 Top {len(top_largos)} Videos Largos por VPH en el nicho:**")
-            
-            # Preparar datos para mostrar
-            display_largos = top_largos.copy()
-            display_largos["VPH"] = display_largos["vph"].round(1)
-            display_largos["Vistas"] = display_largos["vistas"].apply(lambda x: f"{x:,}")
-            display_largos["Duración"] = display_largos["duracion_segundos"].apply(
-                lambda x: f"{int(x//60)}:{int(x%60):02d}"
-            )
-            display_largos["Fecha"] = pd.to_datetime(display_largos["fecha_publicacion"]).dt.strftime("%d/%m/%Y")
-            display_largos["Canal"] = display_largos["nombre_canal"]
-            display_largos["Título"] = display_largos["titulo"].str[:60] + "..."
-            
-            st.dataframe(
-                display_largos[["Título", "Canal", "VPH", "Vistas", "Duración", "Fecha"]],
-                use_container_width=True,
-                height=600
-            )
-            
+        top_largos = mostrar_tabla_top(df, rank_index, "Largo", top_n)
+        if top_largos is not None:
             # Estadísticas de videos largos
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("🏆 VPH Máximo", f"{top_largos["vph"].max():.1f}")
+                st.metric("🏆 VPH Máximo", f"{top_largos['vph'].max():.1f}")
             with col2:
-                st.metric("📊 VPH Promedio", f"{top_largos["vph"].mean():.1f}")
+                st.metric("📊 VPH Promedio", f"{top_largos['vph'].mean():.1f}")
             with col3:
-                st.metric("⏱️ Duración Promedio", f"{top_largos["duracion_segundos"].mean()/60:.1f} min")
+                st.metric("⏱️ Duración Promedio", f"{top_largos['duracion_segundos'].mean()/60:.1f} min")
         else:
-            st.warning("No se encontraron videos largos en los datos.")
+            st.warning(f"No se encontraron videos largos con {NOMBRES_CRITERIOS[criterio_ranking]} en los datos.")
+    
+    if rank_index is not None:
+        mostrar_ranking_completo(df, rank_index, df_cliente, canal_cliente)
     
     # Explicación para niños
     st.markdown("""
@@ -651,7 +932,66 @@ def mostrar_top_videos_nicho(df):
     </div>
     """, unsafe_allow_html=True)
 
-def mostrar_galeria_miniaturas(df):
+@timed
+def mostrar_ranking_completo(df, rank_index, df_cliente=None, canal_cliente=None):
+    st.markdown("### 📋 Ranking Completo del Nicho")
+    st.markdown("Recorre el ranking entero página a página y consulta en qué puesto y percentil está cualquier video.")
+    
+    metricas = {"VPH": "vph", "Índice de Conexión": "indice_conexion", "Índice CLARA": "clara_index"}
+    metricas = {nombre: col for nombre, col in metricas.items() if col in rank_index}
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metrica = metricas[st.selectbox("Métrica", list(metricas), key="ranking_metrica")]
+    with col2:
+        formato = st.selectbox("Formato", ["Todos", "Short", "Largo"], key="ranking_formato")
+    formato = None if formato == "Todos" else formato
+    # Páginas del ranking ya ordenado: cada página es un corte del índice
+    _, paginas = get_leaderboard_page(df, rank_index, metrica, 1, FILAS_POR_PAGINA, formato, columns=[metrica])
+    with col3:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, step=1, key="ranking_pagina")
+    
+    videos, _ = get_leaderboard_page(df, rank_index, metrica, pagina, FILAS_POR_PAGINA, formato,
+                                     columns=["titulo", "nombre_canal", "formato", metrica, "vistas"])
+    if len(videos) > 0:
+        st.dataframe(videos, column_config=configuracion_tabla_videos(), hide_index=True,
+                     use_container_width=True, height=400)
+    else:
+        st.info("No hay videos de ese formato en el ranking.")
+    
+    # Puesto de un video concreto: búsqueda binaria en el índice, sin reordenar
+    video_id = st.text_input("🔎 ¿En qué puesto está mi video? (ID del video)", key="ranking_video_id").strip()
+    if video_id:
+        posiciones = np.flatnonzero(df["video_id"].to_numpy() == video_id)
+        if len(posiciones) == 0:
+            st.warning(f"No se encontró el video '{video_id}' en el dataset.")
+        else:
+            puestos = rank_videos(df, rank_index, posiciones[:1], [metrica]).iloc[0]
+            video = df.iloc[posiciones[0]]
+            st.markdown(f"**{video['titulo']}** ({video['nombre_canal']})")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Puesto en el nicho", f"#{puestos[f'puesto_{metrica}']:,.0f}",
+                          help=f"Percentil {puestos[f'percentil_{metrica}']:.1f}")
+            with col2:
+                st.metric(f"Puesto entre los {video['formato']}", f"#{puestos[f'puesto_formato_{metrica}']:,.0f}",
+                          help=f"Percentil {puestos[f'percentil_formato_{metrica}']:.1f}")
+    
+    if df_cliente is not None and canal_cliente not in (None, "Todos los Canales") and len(df_cliente) > 0:
+        st.markdown(f"**📍 Videos de {canal_cliente} en el ranking del nicho**")
+        posiciones = df.index.get_indexer(df_cliente.index)
+        puestos = rank_videos(df, rank_index, posiciones, [metrica])
+        display = pd.DataFrame({
+            "Título": df_cliente["titulo"].to_numpy(),
+            "Formato": df_cliente["formato"].to_numpy(),
+            "Puesto en el nicho": puestos[f"puesto_{metrica}"].to_numpy(),
+            "Percentil en el nicho": puestos[f"percentil_{metrica}"].round(1).to_numpy(),
+            "Puesto en su formato": puestos[f"puesto_formato_{metrica}"].to_numpy(),
+            "Percentil en su formato": puestos[f"percentil_formato_{metrica}"].round(1).to_numpy(),
+        }).sort_values("Puesto en el nicho")
+        st.dataframe(display, hide_index=True, use_container_width=True, height=400)
+
+@timed
+def mostrar_galeria_miniaturas(df, rank_index=None):
     st.markdown("<h2 class=\"section-header\">🖼️ Galería de Miniaturas</h2>", unsafe_allow_html=True)
     
     st.markdown("""
@@ -661,9 +1001,6 @@ def mostrar_galeria_miniaturas(df):
     Observa colores, composición, texto y elementos que llaman la atención.
     """)
     
-    # Obtener top videos por VPH
-    top_videos = get_top_videos(df, num_videos=min(200, len(df)))
-    
     # Filtros para la galería
     col1, col2, col3 = st.columns(3)
     
@@ -678,8 +1015,8 @@ def mostrar_galeria_miniaturas(df):
         num_miniaturas = st.slider(
             "🖼️ Número de miniaturas:",
             min_value=20,
-            max_value=min(200, len(top_videos)),
-            value=min(100, len(top_videos)),
+            max_value=min(200, len(df)),
+            value=min(100, len(df)),
             step=20
         )
     
@@ -691,23 +1028,18 @@ def mostrar_galeria_miniaturas(df):
             help="Número de miniaturas por fila"
         )
     
-    # Aplicar filtros
-    if formato_filter != "Todos":
-        top_videos_filtered = top_videos[top_videos["formato"] == formato_filter]
-    else:
-        top_videos_filtered = top_videos
-    
-    # Limitar número de miniaturas
-    top_videos_display = top_videos_filtered.head(num_miniaturas)
+    # Filtrar por formato antes de cortar el top N (corte del índice de rankings)
+    formato = None if formato_filter == "Todos" else formato_filter
+    top_videos_display = get_top_videos(df, num_miniaturas, criterio_ranking, rank_index=rank_index, formato=formato)
     
     st.markdown(f"**🏆 Mostrando las {len(top_videos_display)} miniaturas con mejor VPH:**")
     
     # Mostrar estadísticas
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("🎯 VPH Promedio", f"{top_videos_display["vph"].mean():.1f}")
+        st.metric("🎯 VPH Promedio", f"{top_videos_display['vph'].mean():.1f}")
     with col2:
-        st.metric("👀 Vistas Promedio", f"{top_videos_display["vistas"].mean():,.0f}")
+        st.metric("👀 Vistas Promedio", f"{top_videos_display['vistas'].mean():,.0f}")
     with col3:
         shorts_count = len(top_videos_display[top_videos_display["formato"] == "Short"])
         st.metric("📱 Shorts", shorts_count)
@@ -719,6 +1051,7 @@ def mostrar_galeria_miniaturas(df):
     
     # Crear filas de miniaturas
     videos_list = list(top_videos_display.iterrows())
+    miniaturas = obtener_miniaturas(top_videos_display["url_miniatura"].tolist())
     
     for i in range(0, len(videos_list), columnas):
         cols = st.columns(columnas)
@@ -731,22 +1064,17 @@ def mostrar_galeria_miniaturas(df):
                     try:
                         # Mostrar miniatura
                         st.image(
-                            video["url_miniatura"], 
+                            miniaturas[video["url_miniatura"]],
                             width=200,
-                            caption=f"VPH: {video["vph"]:.1f}"
+                            caption=f"VPH: {video['vph']:.1f}"
                         )
                         
                         # Información del video
-                        st.markdown(f"**{video["formato"]}** | {video["nombre_canal"][:15]}...  
-**{video["titulo"]}**  
-👀 {video["vistas"]:,} vistas  
-", unsafe_allow_html=True)
+                        st.markdown(f"**{video['formato']}** | {video['nombre_canal'][:15]}...  \n**{video['titulo']}**  \n👀 {video['vistas']:,} vistas  \n", unsafe_allow_html=True)
                         
                     except Exception as e:
                         st.error(f"Error cargando miniatura")
-                        st.markdown(f"**{video["formato"]}** | {video["nombre_canal"][:15]}...  
-VPH: {video["vph"]:.1f} | 👀 {video["vistas"]:,}  
-{video["titulo"][:50]}...", unsafe_allow_html=True)
+                        st.markdown(f"**{video['formato']}** | {video['nombre_canal'][:15]}...  \nVPH: {video['vph']:.1f} | 👀 {video['vistas']:,}  \n{video['titulo'][:50]}...", unsafe_allow_html=True)
     
     # Análisis de patrones visuales
     st.markdown("""---""")
@@ -764,7 +1092,7 @@ VPH: {video["vph"]:.1f} | 👀 {video["vistas"]:,}
             **📱 Patrones en Shorts ({len(shorts_miniaturas)} miniaturas):**
             - VPH promedio: {shorts_miniaturas["vph"].mean():.1f}
             - Vistas promedio: {shorts_miniaturas["vistas"].mean():,.0f}
-            - Canales más exitosos: {", ".join(shorts_miniaturas["nombre_canal"].value_counts().head(3).index)}
+            - Canales más exitosos: {", ".join(shorts_miniaturas["nombre_canal"].astype(str).value_counts().head(3).index)}
             """)
     
     with col2:
@@ -773,7 +1101,7 @@ VPH: {video["vph"]:.1f} | 👀 {video["vistas"]:,}
             **🎬 Patrones en Videos Largos ({len(largos_miniaturas)} miniaturas):**
             - VPH promedio: {largos_miniaturas["vph"].mean():.1f}
             - Vistas promedio: {largos_miniaturas["vistas"].mean():,.0f}
-            - Canales más exitosos: {", ".join(largos_miniaturas["nombre_canal"].value_counts().head(3).index)}
+            - Canales más exitosos: {", ".join(largos_miniaturas["nombre_canal"].astype(str).value_counts().head(3).index)}
             """)
     
     # Explicación para niños
@@ -788,6 +1116,7 @@ VPH: {video["vph"]:.1f} | 👀 {video["vistas"]:,}
     </div>
     """, unsafe_allow_html=True)
 
+@timed
 def mostrar_glosario():
     st.markdown("<h2 class=\"section-header\">❓ Glosario</h2>", unsafe_allow_html=True)
     st.markdown("""
@@ -800,6 +1129,7 @@ def mostrar_glosario():
     
     <h4>Índice CLARA™</h4>
     <p>CLARA es una métrica especial que combina varias cosas importantes de un video (como el VPH, el Índice de Conexión y las vistas) para darte una idea general de su éxito. Es como una puntuación total de lo bien que lo está haciendo un video.</p>
+    <p>Puedes cambiar cuánto pesa cada métrica en "⚖️ Índice CLARA" (barra lateral). Con la normalización por percentiles cada métrica se puntúa de 0 a 100 según su posición en el nicho, así un solo video viral no cambia la puntuación de todos los demás.</p>
     
     <h4>Shorts vs. Videos Largos</h4>
     <p>YouTube tiene dos tipos principales de videos: los \'Shorts\' que son videos muy cortitos (menos de 1 minuto) y los \'Videos Largos\' que duran más. Analizamos cuál de los dos funciona mejor para tu canal y para tu nicho.</p>
@@ -815,41 +1145,62 @@ def mostrar_glosario():
     
     <h4>Vistas Normalizadas</h4>
     <p>Es una forma de comparar las vistas de tus videos de manera justa, sin importar si un video tiene muchas más vistas que otro solo porque lleva mucho tiempo publicado. Ayuda a ver el rendimiento real.</p>
+    
+    <h4>Modo Aproximado (≈)</h4>
+    <p>Con archivos enormes, contar todo exactamente es lento. En modo aproximado algunos números del nicho (videos y canales distintos, VPH mediano, frecuencia de palabras) se estiman con resúmenes compactos de los datos llamados 'sketches'. Junto a cada estimación verás su margen de error.</p>
     </div>
     """, unsafe_allow_html=True)
 
+def mostrar_panel_rendimiento(desde, informe_perfil=None):
+    # Tiempos de esta ejecución (solo las llamadas del hilo de esta sesión) y acumulados del proceso
+    with st.sidebar.expander("⏱️ Rendimiento"):
+        llamadas = recent_calls(desde, threading.get_ident())
+        if llamadas:
+            st.caption(f"Esta ejecución: {len(llamadas)} llamadas medidas")
+            st.dataframe(
+                pd.DataFrame(llamadas)[["name", "seconds", "rows", "memory_delta_bytes"]]
+                .assign(seconds=lambda d: d["seconds"] * 1000, memory_delta_bytes=lambda d: d["memory_delta_bytes"] / 1024 ** 2)
+                .rename(columns={"name": "Función", "seconds": "ms", "rows": "Filas", "memory_delta_bytes": "Δ MB"}),
+                hide_index=True, use_container_width=True
+            )
+        resumen = timing_summary()
+        if resumen:
+            st.caption("Acumulado del servidor")
+            st.dataframe(
+                pd.DataFrame(resumen)[["name", "calls", "total_s", "mean_s", "max_s"]]
+                .rename(columns={"name": "Función", "calls": "Llamadas", "total_s": "Total (s)", "mean_s": "Media (s)", "max_s": "Máx (s)"}),
+                hide_index=True, use_container_width=True
+            )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", export_json(desde, threading.get_ident()), file_name="tiempos.json", mime="application/json")
+        with col2:
+            st.download_button("Prometheus", export_prometheus(), file_name="tiempos.prom", mime="text/plain")
+        if informe_perfil:
+            st.caption("Perfil de la sección")
+            st.code(informe_perfil, language=None)
+
 # --- Lógica principal de la aplicación --- #
 if df is not None:
-    # Pestañas de navegación
-    tab_names = [
-        "🏠 Resumen Ejecutivo",
-        "📊 Posicionamiento General",
-        "🚀 Estrategia de Contenido",
-        "🏆 Videos Estrella",
-        "✍️ Optimización de Títulos",
-        "🗓️ Calendario y SEO",
-        "🔍 Top Videos del Nicho",
-        "🖼️ Galería de Miniaturas",
-        "❓ Glosario"
-    ]
-    
-    tabs = st.tabs(tab_names)
-
-    with tabs[0]:
-        mostrar_resumen_ejecutivo(df_cliente, metricas_competencia_dict, canal_cliente)
-    with tabs[1]:
-        mostrar_posicionamiento_general(df_cliente, df_competencia, canal_cliente)
-    with tabs[2]:
-        mostrar_estrategia_contenido(df_cliente, canal_cliente)
-    with tabs[3]:
-        mostrar_videos_estrella(df_cliente, canal_cliente)
-    with tabs[4]:
-        mostrar_optimizacion_titulos(df_cliente, df_competencia, canal_cliente)
-    with tabs[5]:
-        mostrar_calendario_seo(df_cliente, canal_cliente)
-    with tabs[6]:
-        mostrar_top_videos_nicho(df)
-    with tabs[7]:
-        mostrar_galeria_miniaturas(df)
-    with tabs[8]:
-        mostrar_glosario()
+    # Navegación por secciones: solo se calcula y dibuja la sección activa
+    # (st.tabs ejecuta todas las pestañas en cada rerun)
+    secciones = {
+        "🏠 Resumen Ejecutivo": lambda: mostrar_resumen_ejecutivo(df_cliente, metricas_cliente, metricas_competencia_dict, canal_cliente),
+        "📊 Posicionamiento General": lambda: mostrar_posicionamiento_general(df_cliente, canal_cliente),
+        "🚀 Estrategia de Contenido": lambda: mostrar_estrategia_contenido(df_cliente, canal_cliente),
+        "🏆 Videos Estrella": lambda: mostrar_videos_estrella(df_cliente, canal_cliente),
+        "✍️ Optimización de Títulos": lambda: mostrar_optimizacion_titulos(df_cliente, canal_cliente),
+        "🗓️ Calendario y SEO": lambda: mostrar_calendario_seo(df_cliente, canal_cliente),
+        "🔍 Top Videos del Nicho": lambda: mostrar_top_videos_nicho(df, rank_index, df_cliente, canal_cliente),
+        "🖼️ Galería de Miniaturas": lambda: mostrar_galeria_miniaturas(df, rank_index),
+        "❓ Glosario": lambda: mostrar_glosario()
+    }
+
+    seccion_activa = st.sidebar.radio("📑 Sección", list(secciones.keys()))
+    # Captura de perfil de una sola ejecución: el botón solo vale True en el rerun que provoca
+    informe_perfil = None
+    if st.sidebar.button("🔬 Perfilar esta sección", help="Vuelve a dibujar la sección bajo un perfilador (pyinstrument si está instalado, si no cProfile)"):
+        _, informe_perfil = profile_call(secciones[seccion_activa], engine="pyinstrument")
+    else:
+        secciones[seccion_activa]()
+    mostrar_panel_rendimiento(inicio_ejecucion, informe_perfil)
@@ -0,0 +1,173 @@
+import os
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from clara_scoring import build_clara_state, merge_clara_states
+from data_processing import frame_totals
+from instrumentation import instrument_module
+from sketches import (
+    quantile_sketch,
+    merge_quantile_sketches,
+    sketch_percentiles,
+    sketch_quantiles,
+    sketch_rank_error,
+    hash_values,
+    hll_sketch,
+    merge_hll,
+    hll_count,
+    hll_relative_error,
+    count_min_sketch,
+    merge_count_min,
+    count_min_query,
+    count_min_error
+)
+from title_analysis import build_title_index
+
+# --- Modo aproximado --- #
+# Para archivos muy grandes (varios nichos, decenas de millones de filas) los conteos de
+# valores distintos, las distribuciones de VPH y las frecuencias de palabras del nicho salen
+# de sketches combinables: uno por bloque de filas (se construyen al leer el CSV, ver
+# load_and_preprocess_data, y se guardan con el dataset en caché), que se unen al consultarlos.
+# Filas por bloque al construir los sketches a partir de un DataFrame ya cargado
+APPROX_CHUNK_ROWS = int(os.environ.get('DASHBOARD_APPROX_CHUNK_ROWS', 500_000))
+# A partir de este número de filas el dashboard activa el modo aproximado por defecto
+APPROX_DEFAULT_ROWS = int(os.environ.get('DASHBOARD_APPROX_DEFAULT_ROWS', 5_000_000))
+# Longitud mínima de las palabras clave (la misma que keyword_counts)
+APPROX_KEYWORD_MIN_LENGTH = 3
+
+def _grouped_quantile_sketches(values, groups):
+    # Un sketch de cuantiles por valor de la columna categórica groups
+    codes = groups.cat.codes.to_numpy()
+    return {name: quantile_sketch(values[codes == code])
+            for code, name in enumerate(groups.cat.categories) if np.any(codes == code)}
+
+def sketch_chunk(df, title_index=None, start=0, clara_state=None):
+    """
+    Sketches de un bloque de filas: videos y canales distintos (HyperLogLog), distribución
+    del VPH en total, por formato y por bucket (cuantiles), frecuencia de las palabras de
+    los títulos (count-min), estado de normalización de CLARA y sumas y conteos de las
+    métricas del nicho (exactas, como frame_totals)
+
+    Con title_index (build_title_index del dataset completo) las palabras de las filas
+    start..start + len(df) se toman de él en lugar de volver a tokenizar los títulos;
+    clara_state, si ya se calculó el del bloque, se reutiliza.
+    """
+    vph = df['vph'].to_numpy(dtype=np.float64)
+    if title_index is None:
+        title_index, start = build_title_index(df['titulo']), 0
+    # Solo se hashea el vocabulario del bloque, con el número de apariciones de cada palabra
+    offsets = title_index['offsets']
+    token_ids = title_index['token_ids'][offsets[start]:offsets[start + len(df)]]
+    occurrences = np.bincount(token_ids, minlength=len(title_index['vocabulary']))
+    keep = (occurrences > 0) & (title_index['token_lengths'] >= APPROX_KEYWORD_MIN_LENGTH)
+    return {
+        'rows': len(df),
+        'videos': hll_sketch(hash_values(df['video_id'])),
+        'channels': hll_sketch(hash_values(df['nombre_canal'])),
+        'vph': quantile_sketch(vph),
+        'vph_by_format': _grouped_quantile_sketches(vph, df['formato'].astype('category')),
+        'vph_by_bucket': _grouped_quantile_sketches(vph, df['bucket_tematico'].astype('category')),
+        'keywords': count_min_sketch(hash_values(title_index['vocabulary'][keep]), occurrences[keep]),
+        'clara': build_clara_state(df) if clara_state is None else clara_state,
+        'totals': frame_totals(df),
+    }
+
+def build_chunk_sketches(df, chunk_rows=APPROX_CHUNK_ROWS, title_index=None):
+    """
+    Sketches de df por bloques de chunk_rows filas (para un DataFrame que se cargó sin ellos)
+
+    title_index, si ya se tiene el de df, evita tokenizar los títulos de nuevo.
+    """
+    return [sketch_chunk(df.iloc[start:start + chunk_rows], title_index, start)
+            for start in range(0, len(df), chunk_rows)]
+
+def _merge_grouped(a, b):
+    merged = dict(a)
+    for name, sketch in b.items():
+        merged[name] = merge_quantile_sketches(merged[name], sketch) if name in merged else sketch
+    return merged
+
+# Cómo se combina cada sketch de dos bloques
+_MERGERS = {
+    'rows': lambda a, b: a + b,
+    'videos': merge_hll,
+    'channels': merge_hll,
+    'vph': merge_quantile_sketches,
+    'vph_by_format': _merge_grouped,
+    'vph_by_bucket': _merge_grouped,
+    'keywords': merge_count_min,
+    'clara': merge_clara_states,
+    'totals': lambda a, b: a + b,
+}
+
+def merge_chunk_sketches(chunk_sketches, parts=None):
+    """
+    Une los sketches de varios bloques en los del conjunto (None si no hay bloques)
+
+    Con parts solo se combinan esos sketches (p. ej. ('keywords',)): cada consulta une
+    únicamente lo que necesita.
+    """
+    if not chunk_sketches:
+        return None
+    parts = _MERGERS if parts is None else parts
+    return {part: reduce(_MERGERS[part], (chunk[part] for chunk in chunk_sketches)) for part in parts}
+
+def approximate_niche_summary(chunk_sketches, quantiles=(0.5, 0.9, 0.99)):
+    """
+    Resumen aproximado del nicho (a partir de los sketches por bloque) con sus márgenes de error
+
+    videos y canales son conteos de valores distintos (error relativo típico en
+    distinct_error); vph_quantiles son los cuantiles del VPH (error relativo máximo en
+    vph_error).
+    """
+    sketches = merge_chunk_sketches(chunk_sketches, ('rows', 'videos', 'channels', 'vph'))
+    return {
+        'rows': sketches['rows'],
+        'videos': hll_count(sketches['videos']),
+        'channels': hll_count(sketches['channels']),
+        'distinct_error': hll_relative_error(sketches['videos']),
+        'vph_quantiles': dict(zip(quantiles, sketch_quantiles(sketches['vph'], quantiles))),
+        'vph_error': sketches['vph']['relative_accuracy'],
+    }
+
+def approximate_vph_percentile(chunk_sketches, values, formato=None):
+    """
+    Percentil aproximado de values en la distribución del VPH del nicho (o de un formato)
+    y error máximo en puntos de percentil
+    """
+    if formato is None:
+        sketch = merge_chunk_sketches(chunk_sketches, ('vph',))['vph']
+    else:
+        sketch = merge_chunk_sketches(chunk_sketches, ('vph_by_format',))['vph_by_format'][formato]
+    return sketch_percentiles(sketch, values), sketch_rank_error(sketch)
+
+def approximate_bucket_performance(chunk_sketches):
+    """
+    VPH mediano y percentil 90 de cada bucket temático en todo el nicho, con su error
+    relativo máximo
+    """
+    sketches = merge_chunk_sketches(chunk_sketches, ('vph', 'vph_by_bucket'))
+    rows = []
+    for name, sketch in sketches['vph_by_bucket'].items():
+        median, p90 = sketch_quantiles(sketch, [0.5, 0.9])
+        rows.append({'bucket_tematico': name, 'num_videos': sketch['count'], 'vph_mediana': median, 'vph_p90': p90})
+    stats = pd.DataFrame(rows, columns=['bucket_tematico', 'num_videos', 'vph_mediana', 'vph_p90'])
+    stats['error_relativo'] = sketches['vph']['relative_accuracy']
+    return stats.set_index('bucket_tematico').sort_values('vph_mediana', ascending=False)
+
+def approximate_keyword_frequencies(chunk_sketches, keywords):
+    """
+    Apariciones estimadas de cada palabra en los títulos de todo el nicho
+
+    La estimación nunca es menor que el valor real; 'error' es el exceso máximo con
+    probabilidad 'confianza'.
+    """
+    keywords = list(keywords)
+    sketches = merge_chunk_sketches(chunk_sketches, ('keywords',))
+    error, confidence = count_min_error(sketches['keywords'])
+    estimates = count_min_query(sketches['keywords'], hash_values(pd.Series(keywords, dtype=object))) if keywords else []
+    return pd.DataFrame({'palabra': keywords, 'frecuencia': estimates, 'error': error, 'confianza': confidence})
+
+instrument_module(globals())
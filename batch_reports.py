@@ -0,0 +1,182 @@
+"""
+Genera los informes de varios canales sin pasar por la interfaz de Streamlit
+
+El CSV se procesa una sola vez y queda en la caché columnar en disco (Arrow IPC). Cada
+proceso del pool abre ese archivo mapeado en memoria al arrancar, así que a las tareas
+solo se les envía el nombre del canal: los datos no se serializan por tarea.
+
+Uso:
+    python batch_reports.py datos.csv --output-dir informes
+    python batch_reports.py datos.csv --channels "Canal 1" "Canal 2" --format html --workers 4
+"""
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_processing import (
+    compute_content_hash,
+    load_dataset_cached,
+    open_cached_dataset,
+    filter_by_channel,
+    build_channel_index,
+    build_channel_aggregates
+)
+from analytics_functions import (
+    analyze_channel_performance_aggregated,
+    analyze_content_strategy,
+    analyze_bucket_performance,
+    calculate_optimal_duration
+)
+from title_analysis import analyze_publishing_schedule, generate_seo_recommendations
+
+# Estado de cada proceso del pool (se inicializa una vez por proceso, no por tarea)
+_worker = {}
+
+def _init_worker(content_hash, cache_dir):
+    df = open_cached_dataset(content_hash, cache_dir)
+    _worker['df'] = df
+    _worker['channel_index'] = build_channel_index(df)
+    _worker['channel_aggregates'] = build_channel_aggregates(df)
+
+def build_channel_report(df, canal, channel_index=None, channel_aggregates=None):
+    """
+    Ejecuta los análisis del dashboard para un canal y devuelve el informe como dict
+    """
+    df_cliente = filter_by_channel(df, canal, channel_index)
+    if channel_aggregates is None:
+        channel_aggregates = build_channel_aggregates(df)
+    metricas_cliente, metricas_competencia = analyze_channel_performance_aggregated(channel_aggregates, canal)
+
+    report = {
+        'canal': canal,
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'rendimiento': {'cliente': metricas_cliente, 'competencia': metricas_competencia},
+        'estrategia_contenido': analyze_content_strategy(df_cliente),
+        'buckets': analyze_bucket_performance(df_cliente),
+    }
+    if len(df_cliente) > 0:
+        duration_stats, optimal_range = calculate_optimal_duration(df_cliente)
+        day_performance, hour_performance = analyze_publishing_schedule(df_cliente)
+        report['duracion_optima'] = {'rango': optimal_range, 'por_rango': duration_stats}
+        report['calendario'] = {'por_dia': day_performance, 'por_hora': hour_performance}
+        report['seo'] = generate_seo_recommendations(df_cliente)
+    return report
+
+def _run_channel(task):
+    canal, output_dir, formats = task
+    report = build_channel_report(_worker['df'], canal, _worker['channel_index'], _worker['channel_aggregates'])
+    return write_report(report, output_dir, formats)
+
+def to_jsonable(value):
+    """
+    Convierte los resultados de los análisis (DataFrames, tipos numpy, NaN) a tipos JSON
+    """
+    if isinstance(value, pd.DataFrame):
+        return [to_jsonable(row) for row in value.reset_index().to_dict(orient='records')]
+    if isinstance(value, pd.Series):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, (int, str, bool)) or value is None:
+        return value
+    return str(value)
+
+def report_to_html(report):
+    """
+    Informe en una página HTML autocontenida (tablas, sin gráficos)
+    """
+    def section(title, value):
+        if isinstance(value, pd.DataFrame):
+            body = value.to_html(float_format=lambda x: f"{x:,.2f}", na_rep='-', border=0)
+        elif isinstance(value, dict) and all(isinstance(item, dict) for item in value.values()):
+            body = pd.DataFrame(value).to_html(float_format=lambda x: f"{x:,.2f}", na_rep='-', border=0)
+        elif isinstance(value, dict):
+            body = ''.join(section(key, item) for key, item in value.items())
+        else:
+            body = f"<p>{html.escape(json.dumps(to_jsonable(value), ensure_ascii=False))}</p>"
+        return f"<section><h3>{html.escape(str(title))}</h3>{body}</section>"
+
+    parts = [section(key, value) for key, value in report.items() if key not in ('canal', 'generado')]
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>Informe {html.escape(report['canal'])}</title>
+<style>body{{font-family:sans-serif;margin:2em}} table{{border-collapse:collapse}} td,th{{padding:4px 8px;border-bottom:1px solid #ddd}} h3{{color:#FF4B4B}}</style>
+</head><body><h1>📊 {html.escape(report['canal'])}</h1><p>Generado: {report['generado']}</p>{''.join(parts)}</body></html>
+"""
+
+def write_report(report, output_dir, formats=('json', 'html')):
+    """
+    Escribe el informe de un canal en output_dir y devuelve las rutas escritas
+
+    El nombre del archivo lleva un hash corto del nombre del canal: canales distintos
+    pueden dar el mismo nombre legible ('Canal 1' y 'Canal_1', o solo mayúsculas en un
+    sistema de archivos que no las distingue) y un informe pisaría al otro.
+    """
+    slug = re.sub(r'[^\w.-]+', '_', report['canal']).strip('_') or 'canal'
+    slug = f"{slug}-{hashlib.sha256(report['canal'].encode('utf-8')).hexdigest()[:8]}"
+    paths = []
+    if 'json' in formats:
+        paths.append(os.path.join(output_dir, f"{slug}.json"))
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            json.dump(to_jsonable(report), f, ensure_ascii=False, indent=2)
+    if 'html' in formats:
+        paths.append(os.path.join(output_dir, f"{slug}.html"))
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            f.write(report_to_html(report))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv')
+    parser.add_argument('--output-dir', default='informes')
+    parser.add_argument('--channels', nargs='*', help='Canales a procesar (por defecto, todos)')
+    parser.add_argument('--format', choices=['json', 'html', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache-dir', default=None, help='Directorio de la caché columnar (por defecto el del dashboard)')
+    args = parser.parse_args()
+
+    formats = ('json', 'html') if args.format == 'both' else (args.format,)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Procesar el CSV una sola vez; los procesos leen el archivo columnar resultante
+    start = time.perf_counter()
+    with open(args.csv, 'rb') as f:
+        file_bytes = f.read()
+    content_hash = compute_content_hash(file_bytes)
+    df = load_dataset_cached(file_bytes, content_hash=content_hash, cache_dir=args.cache_dir)
+    del file_bytes
+    if open_cached_dataset(content_hash, args.cache_dir) is None:
+        sys.exit("batch_reports necesita pyarrow para compartir el dataset entre procesos")
+    channel_index = build_channel_index(df)
+    channels = args.channels or channel_index['channels']
+    print(f"Datos: {len(df):,} videos, {len(channels)} canales ({time.perf_counter() - start:.1f}s)")
+    del df
+
+    start = time.perf_counter()
+    tasks = [(canal, args.output_dir, formats) for canal in channels]
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(content_hash, args.cache_dir)) as pool:
+        written = list(pool.map(_run_channel, tasks, chunksize=max(1, len(tasks) // (args.workers * 4))))
+    elapsed = time.perf_counter() - start
+
+    print(f"{sum(len(paths) for paths in written)} archivos en {args.output_dir}: "
+          f"{len(channels)} canales en {elapsed:.1f}s ({len(channels) / elapsed:.1f} canales/s, {args.workers} procesos)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Coste de importación de los módulos del dashboard (arranque en frío)
+
+Ejecuta `python -X importtime` en un proceso nuevo por módulo y repetición, y resume el
+tiempo acumulado de cada módulo y de las dependencias más pesadas que arrastra.
+
+Uso:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --modules app_imports analytics_functions --repeat 5 --top 15
+    python benchmarks/bench_import.py --json resultados.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_MODULES = ['data_processing', 'analytics_functions', 'title_analysis', 'thumbnails', 'time_series']
+# Dependencias que solo deben cargarse al abrir la sección que las usa
+HEAVY_PACKAGES = ['plotly.express', 'plotly.subplots', 'plotly.graph_objects', 'wordcloud', 'matplotlib', 'matplotlib.pyplot']
+# Lo que importa app.py antes de que el usuario suba un archivo (sin ejecutar la interfaz)
+APP_IMPORTS = ('import streamlit, data_processing, analytics_functions, thumbnails, time_series, title_analysis, '
+               'figure_cache, clara_scoring, approximate, instrumentation')
+
+def parse_importtime(stderr):
+    """
+    Convierte la salida de -X importtime en {módulo: (propio_us, acumulado_us, nivel)}
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), level)
+    return modules
+
+def measure(statement):
+    """
+    Ejecuta statement en un intérprete nuevo con -X importtime y devuelve los módulos cargados
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+def total_ms(modules):
+    # Suma de los módulos de primer nivel: lo que cuesta la sentencia completa
+    return sum(cumulative for _, cumulative, level in modules.values() if level == 0) / 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='*', default=['app_imports'] + DEFAULT_MODULES,
+                        help="Módulos a medir; 'app_imports' mide las importaciones de app.py")
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por módulo (se toma la mediana)')
+    parser.add_argument('--top', type=int, default=10, help='Dependencias más pesadas que se listan por módulo')
+    parser.add_argument('--json', default=None, help='Guarda los resultados en este archivo JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        statement = APP_IMPORTS if module == 'app_imports' else f'import {module}'
+        runs = [measure(statement) for _ in range(args.repeat)]
+        last = runs[-1]
+        heaviest = sorted(((name, cumulative) for name, (_, cumulative, level) in last.items() if level == 1),
+                          key=lambda item: -item[1])[:args.top]
+        results[module] = {
+            'total_ms': round(statistics.median(total_ms(run) for run in runs), 1),
+            'heavy_loaded': [name for name in HEAVY_PACKAGES if name in last],
+            'top_dependencies_ms': {name: round(cumulative / 1000, 1) for name, cumulative in heaviest},
+        }
+
+        print(f"{module:<22} {results[module]['total_ms']:>8.1f} ms  "
+              f"pesadas: {', '.join(results[module]['heavy_loaded']) or '-'}")
+        for name, ms in results[module]['top_dependencies_ms'].items():
+            print(f"    {name:<40} {ms:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
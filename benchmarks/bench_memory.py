@@ -0,0 +1,30 @@
+"""
+Memoria por columna del dataset preprocesado, antes y después del esquema compacto
+
+Uso:
+    python benchmarks/bench_memory.py ruta/al/archivo.csv
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data_processing import load_and_preprocess_data, memory_usage_report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv')
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    df_before = load_and_preprocess_data(args.csv, chunksize=args.chunksize, optimize=False)
+    df_after = load_and_preprocess_data(args.csv, chunksize=args.chunksize, optimize=True)
+
+    with pd.option_context('display.width', 120, 'display.max_columns', None):
+        print(memory_usage_report(df_before, df_after).round(2))
+
+if __name__ == '__main__':
+    main()
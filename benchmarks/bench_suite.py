@@ -0,0 +1,351 @@
+"""
+Suite de benchmarks del dashboard sobre datasets sintéticos de distintos tamaños
+
+Para cada tamaño genera (o reutiliza) un CSV sintético, carga el dataset y mide cada función
+pública de data_processing, analytics_functions, title_analysis, clara_scoring y approximate: tiempo (mejor de
+--repeat), filas por segundo y memoria pico (tracemalloc, en una ejecución aparte para no
+distorsionar el tiempo; no incluye los buffers que reserva pyarrow).
+
+Los resultados se guardan en JSON; con --compare se comparan con una ejecución anterior (por
+defecto benchmarks/baseline.json, la línea base del repositorio) y el proceso termina con
+código 1 si alguna función es más lenta que la línea base en más de --threshold.
+
+La línea base guarda los tamaños medidos (los de DEFAULT_SIZES: 10k, 100k y 1M) y la máquina
+en que se midió (arquitectura, modelo y número de CPUs); --compare avisa si la ejecución no
+mide los mismos tamaños o no se hace en el mismo hardware, porque entonces los tiempos no son
+comparables. Para comparar en otra máquina, regenerar antes la línea base en ella con:
+    python benchmarks/bench_suite.py --output benchmarks/baseline.json
+
+Uso:
+    python benchmarks/bench_suite.py --compare
+    python benchmarks/bench_suite.py --sizes 100k --compare otra_ejecucion.json --threshold 0.1
+    python benchmarks/bench_suite.py --sizes 100k --only get_top_videos build_title_index
+"""
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Sin el registro de tiempos del dashboard, que añadiría su propio coste a cada llamada
+os.environ.setdefault('DASHBOARD_INSTRUMENTATION', '0')
+
+import data_processing as dp
+import analytics_functions as af
+import title_analysis as ta
+import clara_scoring as cs
+import approximate as ap
+from synthetic_data import parse_rows, write_dataset
+
+MODULES = [dp, af, ta, cs, ap]
+DEFAULT_SIZES = ['10k', '100k', '1M']
+# Línea base versionada con la que compara --compare sin argumento
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+def _setup(path, rows):
+    # Estado compartido por los casos: dataset cargado, índices y el canal más grande como cliente
+    ctx = {'csv': path, 'tmp': tempfile.mkdtemp(prefix='bench-')}
+    with open(path, 'rb') as f:
+        ctx['file_bytes'] = f.read()
+    ctx['hash'] = dp.compute_content_hash(ctx['file_bytes'])
+    df = dp.load_and_preprocess_data(path)
+    ctx['df'] = df
+    ctx['raw'] = pd.read_csv(path)
+    ctx['channel_index'] = dp.build_channel_index(df)
+    ctx['aggregates'] = dp.build_channel_aggregates(df)
+    ctx['rank_index'] = dp.build_rank_index(df)
+    ctx['clara_state'] = cs.build_clara_state(df)
+    ctx['canal'] = df['nombre_canal'].value_counts().index[0]
+    ctx['cliente'] = dp.filter_by_channel(df, ctx['canal'], ctx['channel_index'])
+    ctx['positions'] = np.flatnonzero((df['nombre_canal'] == ctx['canal']).to_numpy())
+    ctx['title_index'] = ta.build_title_index(df['titulo'])
+    ctx['sin_derivadas'] = df.drop(columns=dp.DERIVED_COLUMNS)
+    ctx['chunk_sketches'] = ap.build_chunk_sketches(df, title_index=ctx['title_index'])
+    ctx['metricas'] = af.analyze_channel_performance_aggregated(ctx['aggregates'], ctx['canal'])
+    ctx['estrategia'] = af.analyze_content_strategy(ctx['cliente'])
+    ctx['buckets'] = af.analyze_bucket_performance(ctx['cliente'])
+    ctx['mensual'] = af.analyze_temporal_trends(ctx['cliente'])
+    ctx['calendario'] = ta.analyze_publishing_schedule(ctx['cliente'])
+    ctx['patrones'], _ = ta.analyze_title_patterns(ctx['cliente'])
+    ctx['frecuencias'] = ta.extract_keywords_from_titles(ctx['cliente'], title_index=ctx['title_index'])
+    dp.load_dataset_cached(ctx['file_bytes'], content_hash=ctx['hash'], cache_dir=os.path.join(ctx['tmp'], 'datasets'))
+    dp.load_dataset_sketches(df, ctx['hash'], cache_dir=os.path.join(ctx['tmp'], 'datasets'))
+    dp.ingest_snapshot(path, store_dir=os.path.join(ctx['tmp'], 'snapshots'))
+    return ctx
+
+def _fresh_dir(ctx, name):
+    # Directorio vacío para las funciones que escriben en disco (cada repetición parte de cero)
+    path = os.path.join(ctx['tmp'], name)
+    shutil.rmtree(path, ignore_errors=True)
+    return path
+
+def _clear_wordcloud_cache(ctx):
+    ta._wordcloud_cache.clear()
+
+# Casos: nombre de la función -> (filas procesadas, preparación opcional por repetición, llamada)
+# 'dataset' = todas las filas, 'cliente' = filas del canal cliente
+CASES = {
+    # data_processing
+    'compute_content_hash': ('dataset', None, lambda c: dp.compute_content_hash(c['file_bytes'])),
+    'dataset_cache_path': ('dataset', None, lambda c: dp.dataset_cache_path(c['hash'], c['tmp'])),
+    'dataset_sketches_path': ('dataset', None, lambda c: dp.dataset_sketches_path(c['hash'], c['tmp'])),
+    'load_dataset_cached': ('dataset', None, lambda c: dp.load_dataset_cached(
+        c['file_bytes'], content_hash=c['hash'], cache_dir=_fresh_dir(c, 'datasets-miss'))),
+    'load_dataset_sketches': ('dataset', None, lambda c: dp.load_dataset_sketches(
+        c['df'], c['hash'], cache_dir=os.path.join(c['tmp'], 'datasets'))),
+    'open_cached_dataset': ('dataset', None, lambda c: dp.open_cached_dataset(c['hash'], os.path.join(c['tmp'], 'datasets'))),
+    'snapshot_store_paths': ('dataset', None, lambda c: dp.snapshot_store_paths(os.path.join(c['tmp'], 'snapshots'))),
+    'load_snapshot_store': ('dataset', None, lambda c: dp.load_snapshot_store(os.path.join(c['tmp'], 'snapshots'))),
+    'load_snapshot_deltas': ('dataset', None, lambda c: dp.load_snapshot_deltas(os.path.join(c['tmp'], 'snapshots'))),
+    'load_snapshot_times': ('dataset', None, lambda c: dp.load_snapshot_times(os.path.join(c['tmp'], 'snapshots'))),
+    'ingest_snapshot': ('dataset', None, lambda c: dp.ingest_snapshot(c['csv'], store_dir=_fresh_dir(c, 'snapshots-full'))),
+    'load_and_preprocess_data': ('dataset', None, lambda c: dp.load_and_preprocess_data(c['csv'])),
+    'derived_column': ('dataset', None, lambda c: dp.derived_column(c['sin_derivadas'], 'dia_semana')),
+    'add_derived_columns': ('dataset', None, lambda c: dp.add_derived_columns(c['sin_derivadas'].copy(deep=False))),
+    'month_periods': ('dataset', None, lambda c: dp.month_periods(c['df']['mes'])),
+    'csv_read_options': ('dataset', None, lambda c: dp.csv_read_options()),
+    'optimize_dtypes': ('dataset', None, lambda c: dp.optimize_dtypes(c['raw'].copy())),
+    'memory_usage_report': ('dataset', None, lambda c: dp.memory_usage_report(c['raw'], c['df'])),
+    'classify_format': ('dataset', None, lambda c: dp.classify_format(c['df']['duracion_segundos'])),
+    'classify_buckets': ('dataset', None, lambda c: dp.classify_buckets(c['df']['titulo'])),
+    'get_top_videos': ('dataset', None, lambda c: dp.get_top_videos(c['df'], 20)),
+    'top_k_positions': ('dataset', None, lambda c: dp.top_k_positions(c['df']['vph'].to_numpy(), 20)),
+    'build_rank_index': ('dataset', None, lambda c: dp.build_rank_index(c['df'])),
+    'rank_values': ('dataset', None, lambda c: dp.rank_values(c['rank_index'], 'vph', c['df']['vph'].to_numpy())),
+    'rank_videos': ('cliente', None, lambda c: dp.rank_videos(c['df'], c['rank_index'], c['positions'])),
+    'get_leaderboard_page': ('dataset', None, lambda c: dp.get_leaderboard_page(c['df'], c['rank_index'], 'vph', 50, 100)),
+    'filter_by_channel': ('dataset', None, lambda c: dp.filter_by_channel(c['df'], c['canal'], c['channel_index'])),
+    'filter_competition': ('dataset', None, lambda c: dp.filter_competition(c['df'], c['canal'], c['channel_index'])),
+    'filter_by_format': ('dataset', None, lambda c: dp.filter_by_format(c['df'], 'Short', c['channel_index'])),
+    'build_channel_index': ('dataset', None, lambda c: dp.build_channel_index(c['df'])),
+    'get_channel_metrics': ('cliente', None, lambda c: dp.get_channel_metrics(c['cliente'])),
+    'build_channel_aggregates': ('dataset', None, lambda c: dp.build_channel_aggregates(c['df'])),
+    'frame_totals': ('dataset', None, lambda c: dp.frame_totals(c['df'])),
+    'channel_totals': ('dataset', None, lambda c: dp.channel_totals(c['aggregates'], c['canal'])),
+    'metrics_from_totals': ('dataset', None, lambda c: dp.metrics_from_totals(dp.frame_totals(c['cliente']))),
+    # analytics_functions
+    'analyze_channel_performance': ('dataset', None, lambda c: af.analyze_channel_performance(
+        c['cliente'], dp.filter_competition(c['df'], c['canal'], c['channel_index']))),
+    'analyze_channel_performance_aggregated': ('dataset', None, lambda c: af.analyze_channel_performance_aggregated(c['aggregates'], c['canal'])),
+    'create_performance_comparison_chart': ('cliente', None, lambda c: af.create_performance_comparison_chart(*c['metricas'])),
+    'create_positioning_scatter': ('dataset', None, lambda c: af.create_positioning_scatter(
+        c['df'], 'vph', c['canal'], 'VPH vs Vistas', c['channel_index'])),
+    'analyze_content_strategy': ('cliente', None, lambda c: af.analyze_content_strategy(c['cliente'])),
+    'create_format_distribution_chart': ('cliente', None, lambda c: af.create_format_distribution_chart(c['estrategia'])),
+    'analyze_temporal_trends': ('cliente', None, lambda c: af.analyze_temporal_trends(c['cliente'])),
+    'create_temporal_trends_chart': ('cliente', None, lambda c: af.create_temporal_trends_chart(c['mensual'])),
+    'analyze_bucket_performance': ('cliente', None, lambda c: af.analyze_bucket_performance(c['cliente'])),
+    'create_bucket_performance_chart': ('cliente', None, lambda c: af.create_bucket_performance_chart(c['buckets'])),
+    'get_top_performing_videos': ('cliente', None, lambda c: af.get_top_performing_videos(c['cliente'], 20)),
+    'calculate_optimal_duration': ('cliente', None, lambda c: af.calculate_optimal_duration(c['cliente'])),
+    # title_analysis
+    'build_title_index': ('dataset', None, lambda c: ta.build_title_index(c['df']['titulo'])),
+    'keyword_counts': ('cliente', None, lambda c: ta.keyword_counts(c['title_index'], c['positions'])),
+    'extract_keywords_from_titles': ('cliente', None, lambda c: ta.extract_keywords_from_titles(c['cliente'])),
+    'analyze_title_patterns': ('cliente', None, lambda c: ta.analyze_title_patterns(c['cliente'])),
+    'create_wordcloud_from_titles': ('cliente', _clear_wordcloud_cache, lambda c: ta.create_wordcloud_from_titles(
+        c['cliente'], 50, c['title_index'])),
+    'wordcloud_cache_key': ('cliente', None, lambda c: ta.wordcloud_cache_key(c['frecuencias'], 50)),
+    'render_wordcloud': ('cliente', _clear_wordcloud_cache, lambda c: ta.render_wordcloud(c['frecuencias'], 50)),
+    'analyze_publishing_schedule': ('cliente', None, lambda c: ta.analyze_publishing_schedule(c['cliente'])),
+    'create_publishing_heatmap': ('cliente', None, lambda c: ta.create_publishing_heatmap(*c['calendario'])),
+    'generate_seo_recommendations': ('cliente', None, lambda c: ta.generate_seo_recommendations(c['cliente'], c['title_index'])),
+    'generate_title_template': ('cliente', None, lambda c: ta.generate_title_template(
+        dict(list(c['frecuencias'].items())[:10]), c['patrones'])),
+    # clara_scoring
+    'parse_clara_weights': ('dataset', None, lambda c: cs.parse_clara_weights('vph=0.4,vistas=0.3')),
+    'clara_config_key': ('dataset', None, lambda c: cs.clara_config_key()),
+    'build_clara_state': ('dataset', None, lambda c: cs.build_clara_state(c['df'])),
+    'merge_clara_states': ('dataset', None, lambda c: cs.merge_clara_states(c['clara_state'], c['clara_state'])),
+    'subtract_clara_states': ('dataset', None, lambda c: cs.subtract_clara_states(
+        cs.merge_clara_states(c['clara_state'], c['clara_state']), c['clara_state'])),
+    'normalize_clara_component': ('dataset', None, lambda c: cs.normalize_clara_component(
+        c['df'], c['clara_state'], 'vph', 'percentile')),
+    'clara_scores': ('dataset', None, lambda c: cs.clara_scores(c['df'], c['clara_state'], normalization='percentile')),
+    'clara_rank_error': ('dataset', None, lambda c: cs.clara_rank_error(c['clara_state'])),
+    # approximate
+    'sketch_chunk': ('dataset', None, lambda c: ap.sketch_chunk(c['df'], c['title_index'])),
+    'build_chunk_sketches': ('dataset', None, lambda c: ap.build_chunk_sketches(c['df'], title_index=c['title_index'])),
+    'merge_chunk_sketches': ('dataset', None, lambda c: ap.merge_chunk_sketches(c['chunk_sketches'])),
+    'approximate_niche_summary': ('dataset', None, lambda c: ap.approximate_niche_summary(c['chunk_sketches'])),
+    'approximate_vph_percentile': ('cliente', None, lambda c: ap.approximate_vph_percentile(
+        c['chunk_sketches'], c['cliente']['vph'].to_numpy())),
+    'approximate_bucket_performance': ('dataset', None, lambda c: ap.approximate_bucket_performance(c['chunk_sketches'])),
+    'approximate_keyword_frequencies': ('dataset', None, lambda c: ap.approximate_keyword_frequencies(
+        c['chunk_sketches'], list(c['frecuencias'])[:50])),
+}
+
+def public_functions():
+    """
+    Funciones públicas de los módulos medidos (para detectar las que no tienen caso)
+    """
+    names = []
+    for module in MODULES:
+        for name, obj in inspect.getmembers(module, inspect.isfunction):
+            if not name.startswith('_') and obj.__module__ == module.__name__:
+                names.append(name)
+    return names
+
+def machine_info():
+    """
+    Hardware en que se mide (se guarda con los resultados para saber si son comparables)
+    """
+    cpu_model = platform.processor() or None
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            cpu_model = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), cpu_model)
+    except OSError:
+        pass
+    return {'machine': platform.machine(), 'cpu_model': cpu_model, 'cpus': os.cpu_count()}
+
+def comparison_warnings(results, baseline):
+    """
+    Diferencias de tamaños o de hardware entre una ejecución y su línea base
+    """
+    warnings = []
+    measured, recorded = list(results['sizes']), list(baseline.get('sizes', {}))
+    if measured != recorded:
+        warnings.append(f"la línea base mide {', '.join(recorded) or 'ningún tamaño'} y esta ejecución "
+                        f"{', '.join(measured)}; solo se comparan los tamaños comunes")
+    for key, name in (('cpus', 'CPUs'), ('cpu_model', 'modelo de CPU'), ('machine', 'arquitectura')):
+        if baseline.get(key) != results.get(key):
+            warnings.append(f"{name} distinto: {baseline.get(key)} en la línea base, {results.get(key)} aquí")
+    return warnings
+
+def run_case(ctx, rows_kind, prepare, call, repeat, measure_memory=True):
+    """
+    Mejor tiempo de repeat ejecuciones y memoria pico de una ejecución adicional
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        if prepare:
+            prepare(ctx)
+        gc.collect()
+        start = time.perf_counter()
+        call(ctx)
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if measure_memory:
+        if prepare:
+            prepare(ctx)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            call(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    rows = len(ctx['df']) if rows_kind == 'dataset' else len(ctx['cliente'])
+    return {
+        'seconds': best,
+        'rows': rows,
+        'rows_per_second': rows / best if best > 0 else None,
+        'peak_mb': None if peak is None else peak / 1024 ** 2,
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Casos más lentos que la línea base en más de tolerance (fracción); ignora los de < 1 ms
+    """
+    regressions = []
+    for size, cases in results['sizes'].items():
+        for name, result in cases.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if before is None or max(before['seconds'], result['seconds']) < 1e-3:
+                continue
+            ratio = result['seconds'] / before['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append((size, name, before['seconds'], result['seconds'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='*', default=DEFAULT_SIZES, help="Tamaños del dataset: 10k, 100k, 1M, 10M...")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'dashboard-bench'),
+                        help='Dónde se guardan los CSV sintéticos (se reutilizan entre ejecuciones)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', default=None, help='Medir solo estas funciones')
+    parser.add_argument('--no-memory', action='store_true', help='No medir la memoria pico (más rápido)')
+    parser.add_argument('--output', default=None, help='Guarda los resultados en este archivo JSON')
+    parser.add_argument('--compare', '--baseline', nargs='?', const=BASELINE_PATH, default=None, metavar='JSON',
+                        help=f'Compara con el JSON de una ejecución anterior (sin argumento: {os.path.relpath(BASELINE_PATH)})')
+    parser.add_argument('--threshold', '--tolerance', type=float, default=0.25,
+                        help='Fracción de empeoramiento admitida frente a la línea base (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    missing = [name for name in public_functions() if name not in CASES]
+    if missing:
+        print(f"Funciones públicas sin caso de benchmark: {', '.join(missing)}", file=sys.stderr)
+    names = [name for name in CASES if args.only is None or name in args.only]
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        **machine_info(),
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+    os.makedirs(args.data_dir, exist_ok=True)
+    for size in args.sizes:
+        rows = parse_rows(size)
+        path = os.path.join(args.data_dir, f"videos_{rows}_s{args.seed}.csv")
+        if not os.path.exists(path):
+            print(f"Generando {rows:,} videos sintéticos en {path}...", file=sys.stderr)
+            write_dataset(path, rows, seed=args.seed)
+
+        ctx = _setup(path, rows)
+        print(f"\n== {size}: {len(ctx['df']):,} videos, {len(ctx['channel_index']['channels'])} canales, "
+              f"cliente '{ctx['canal']}' con {len(ctx['cliente']):,} ==")
+        results['sizes'][size] = {}
+        try:
+            for name in names:
+                rows_kind, prepare, call = CASES[name]
+                result = run_case(ctx, rows_kind, prepare, call, args.repeat, not args.no_memory)
+                results['sizes'][size][name] = result
+                peak = '-' if result['peak_mb'] is None else f"{result['peak_mb']:.1f}"
+                throughput = '-' if result['rows_per_second'] is None else f"{result['rows_per_second']:,.0f}"
+                print(f"{name:<40} {result['seconds'] * 1000:>10.2f} ms {throughput:>16} filas/s {peak:>9} MB")
+        finally:
+            shutil.rmtree(ctx['tmp'], ignore_errors=True)
+        del ctx
+        gc.collect()
+    # Pico de memoria residente de todo el proceso (Linux: KB)
+    results['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados en {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        # Los tiempos solo son comparables con los mismos tamaños y en el mismo hardware
+        for warning in comparison_warnings(results, baseline):
+            print(f"Aviso: {warning}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for size, name, before, after, ratio in regressions:
+            print(f"REGRESIÓN {size} {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"Sin regresiones frente a {args.compare} (umbral {args.threshold:.0%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Generador de datasets sintéticos de videos de YouTube con el esquema del dashboard
+
+Distribuciones aproximadas a las de un nicho real: el tamaño de los canales sigue una ley
+de potencias (pocos canales con muchos videos), las vistas son log-normales con un efecto
+por canal, likes y comentarios salen de tasas de interacción por video, ~30% son Shorts y
+los títulos combinan plantillas habituales con un vocabulario temático por canal.
+
+Uso:
+    python benchmarks/synthetic_data.py --rows 1M --output datos_1M.csv
+    python benchmarks/synthetic_data.py --rows 10M --channels 2000 --output datos_10M.csv
+"""
+import argparse
+import os
+import string
+import sys
+
+import numpy as np
+import pandas as pd
+
+CSV_SCHEMA = ['video_id', 'titulo', 'nombre_canal', 'fecha_publicacion', 'vistas', 'likes',
+              'comentarios', 'duracion_segundos', 'url_miniatura']
+# Filas generadas por bloque (acota la memoria al escribir datasets grandes)
+GENERATE_CHUNK_ROWS = 1_000_000
+
+TOPICS = {
+    'productividad': ['productividad', 'habitos', 'rutina', 'enfoque', 'tiempo', 'mañana', 'notion', 'agenda'],
+    'finanzas': ['finanzas', 'ahorro', 'inversion', 'dinero', 'bolsa', 'presupuesto', 'deudas', 'cripto'],
+    'negocios': ['negocios', 'emprender', 'ventas', 'marketing', 'clientes', 'startup', 'marca', 'online'],
+    'tutorial': ['tutorial', 'excel', 'python', 'photoshop', 'principiantes', 'paso', 'curso', 'trucos'],
+    'general': ['vida', 'viaje', 'cocina', 'casa', 'vlog', 'historia', 'reto', 'reaccion'],
+}
+TEMPLATES = [
+    'Cómo {a} {b} en {n} días',
+    '{n} trucos de {a} que nadie te cuenta',
+    '¿Por qué tu {a} no funciona?',
+    'La guía definitiva de {a} y {b}',
+    '{a}: el error que cometen todos',
+    'Mi {a} {b} de {n} minutos',
+    'Así conseguí {b} con {a}',
+    '{a} vs {b} | ¿Cuál es mejor?',
+    'NUNCA hagas esto con tu {a}',
+    '{a} {b} para principiantes ({n})',
+]
+_ID_ALPHABET = np.array(list(string.ascii_letters + string.digits + '-_'))
+
+def parse_rows(value):
+    """
+    Convierte '10k', '1M', '2.5M' o '100000' en un número de filas
+    """
+    value = str(value).strip().lower().replace('_', '')
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+def channel_profiles(n_channels, seed=0):
+    """
+    Canales del nicho: nombre, peso (ley de potencias), tema principal y popularidad
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, n_channels + 1) ** 1.1
+    topics = list(TOPICS)
+    return pd.DataFrame({
+        'nombre_canal': [f'Canal {i}' for i in range(n_channels)],
+        'peso': weights / weights.sum(),
+        'tema': rng.choice(topics, n_channels, p=[0.2, 0.2, 0.15, 0.15, 0.3]),
+        # Media de log(vistas): los canales grandes tienden a tener más vistas por video
+        'log_vistas': 7.5 + 2 * (weights / weights.max()) ** 0.3 + rng.normal(0, 0.5, n_channels),
+    })
+
+def _titles(rng, channel_topics):
+    n = len(channel_topics)
+    topics = list(TOPICS)
+    # 80% del tema del canal, el resto de cualquier tema
+    topic = np.where(rng.random(n) < 0.8, channel_topics, rng.choice(topics, n))
+    words_a = np.empty(n, dtype=object)
+    words_b = np.empty(n, dtype=object)
+    for name, words in TOPICS.items():
+        mask = topic == name
+        # Dentro de cada tema, pocas palabras concentran la mayoría de títulos (Zipf)
+        p = 1 / np.arange(1, len(words) + 1)
+        words_a[mask] = rng.choice(words, mask.sum(), p=p / p.sum())
+        words_b[mask] = rng.choice(words, mask.sum(), p=p / p.sum())
+    template = rng.integers(0, len(TEMPLATES), n)
+    numbers = rng.choice([3, 5, 7, 10, 30, 2024], n)
+
+    titles = np.empty(n, dtype=object)
+    for i, fmt in enumerate(TEMPLATES):
+        mask = template == i
+        titles[mask] = [fmt.format(a=a, b=b, n=k) for a, b, k in zip(words_a[mask], words_b[mask], numbers[mask])]
+    return titles
+
+def generate_videos(rows, channels=None, seed=0, start_id=0, now=None):
+    """
+    DataFrame sintético de rows videos con las columnas de CSV_SCHEMA
+    """
+    rng = np.random.default_rng(seed)
+    channels = channel_profiles(max(10, rows // 2000) if channels is None else channels) \
+        if not isinstance(channels, pd.DataFrame) else channels
+    now = pd.Timestamp('2025-01-01') if now is None else pd.Timestamp(now)
+
+    channel = rng.choice(len(channels), rows, p=channels['peso'].to_numpy())
+    is_short = rng.random(rows) < 0.3
+    duracion = np.where(is_short, rng.integers(10, 180, rows),
+                        np.clip(rng.lognormal(np.log(600), 0.7, rows), 180, 4 * 3600)).astype(np.int64)
+
+    # Más videos recientes que antiguos (dos años de historia)
+    hours_ago = (rng.power(0.6, rows) * 2 * 365 * 24).astype(np.int64)
+    fecha = now - pd.to_timedelta(hours_ago, unit='h') + pd.to_timedelta(rng.integers(0, 3600, rows), unit='s')
+
+    vistas = rng.lognormal(channels['log_vistas'].to_numpy()[channel], 1.8).astype(np.int64)
+    like_rate = rng.beta(2, 60, rows)
+    likes = rng.binomial(vistas, like_rate)
+    comentarios = rng.binomial(likes, rng.beta(2, 40, rows))
+
+    # Ids de 11 caracteres como los de YouTube: 6 aleatorios y el número de fila en base 64
+    # (5 caracteres, hasta ~10^9 filas), así son únicos aunque se generen por bloques
+    row_number = np.arange(start_id, start_id + rows)
+    symbols = np.column_stack([rng.integers(0, 64, (rows, 6))] + [(row_number // 64 ** k) % 64 for k in range(4, -1, -1)])
+    video_id = pd.Series(_ID_ALPHABET[symbols].view('<U11').ravel())
+
+    return pd.DataFrame({
+        'video_id': video_id,
+        'titulo': _titles(rng, channels['tema'].to_numpy()[channel]),
+        'nombre_canal': channels['nombre_canal'].to_numpy()[channel],
+        'fecha_publicacion': fecha.strftime('%Y-%m-%d %H:%M:%S'),
+        'vistas': vistas,
+        'likes': likes,
+        'comentarios': comentarios,
+        'duracion_segundos': duracion,
+        'url_miniatura': 'https://i.ytimg.com/vi/' + video_id + '/hqdefault.jpg',
+    })[CSV_SCHEMA]
+
+def write_dataset(path, rows, channels=None, seed=0, chunk_rows=GENERATE_CHUNK_ROWS):
+    """
+    Escribe un CSV sintético de rows filas por bloques de chunk_rows y devuelve su ruta
+    """
+    profiles = channel_profiles(max(10, rows // 2000) if channels is None else channels, seed)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_videos(min(chunk_rows, rows - start), profiles, seed=seed + start // chunk_rows + 1, start_id=start)
+            chunk.to_csv(f, index=False, header=start == 0)
+    os.replace(tmp_path, path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='100k')
+    parser.add_argument('--channels', type=int, default=None, help='Número de canales (por defecto, 1 por cada 2000 videos)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+    write_dataset(args.output, rows, args.channels, args.seed)
+    print(f"{rows:,} videos en {args.output} ({os.path.getsize(args.output) / 1024 ** 2:.1f} MB)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
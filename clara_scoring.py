@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+
+from sketches import (
+    DEFAULT_RELATIVE_ACCURACY,
+    quantile_sketch,
+    merge_quantile_sketches,
+    subtract_quantile_sketches,
+    sketch_percentiles,
+    sketch_rank_error
+)
+
+# --- Índice CLARA™ --- #
+# Métricas que combina el índice y su peso por defecto
+CLARA_COMPONENTS = ('vph', 'indice_conexion', 'vistas')
+DEFAULT_CLARA_WEIGHTS = {'vph': 0.5, 'indice_conexion': 0.3, 'vistas': 0.2}
+# Normalización de las métricas antes de ponderarlas:
+#   'original'   -> fórmula de siempre: vph e índice de conexión en bruto, vistas min-max
+#   'percentile' -> percentil (0-100) de cada métrica en el dataset, según un sketch de cuantiles;
+#                   un video viral solo cambia su propio percentil, no la escala del resto
+CLARA_NORMALIZATIONS = ('original', 'percentile')
+DEFAULT_CLARA_NORMALIZATION = 'original'
+
+def _normalization_from_env(value):
+    # Un valor desconocido en el entorno no debe impedir que arranque el dashboard
+    if value in CLARA_NORMALIZATIONS:
+        return value
+    warnings.warn(f"DASHBOARD_CLARA_NORMALIZATION='{value}' no es válida (válidas: {', '.join(CLARA_NORMALIZATIONS)}); "
+                  f"se usa '{DEFAULT_CLARA_NORMALIZATION}'", stacklevel=2)
+    return DEFAULT_CLARA_NORMALIZATION
+
+CLARA_NORMALIZATION = _normalization_from_env(os.environ.get('DASHBOARD_CLARA_NORMALIZATION', DEFAULT_CLARA_NORMALIZATION))
+# Precisión relativa de los sketches de cuantiles de cada métrica
+CLARA_SKETCH_ACCURACY = float(os.environ.get('DASHBOARD_CLARA_SKETCH_ACCURACY', DEFAULT_RELATIVE_ACCURACY))
+
+def parse_clara_weights(text):
+    """
+    Convierte 'vph=0.5,indice_conexion=0.3,vistas=0.2' en un dict de pesos
+
+    Las métricas que no aparecen conservan su peso por defecto.
+    """
+    weights = dict(DEFAULT_CLARA_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in CLARA_COMPONENTS:
+            raise ValueError(f"Métrica desconocida en los pesos de CLARA: '{name}' (válidas: {', '.join(CLARA_COMPONENTS)})")
+        weights[name] = float(value)
+    return weights
+
+CLARA_WEIGHTS = parse_clara_weights(os.environ.get('DASHBOARD_CLARA_WEIGHTS'))
+
+def clara_config_key(weights=None, normalization=None):
+    """
+    Identificador corto de una configuración de CLARA (pesos y normalización) para claves de caché
+    """
+    weights = CLARA_WEIGHTS if weights is None else weights
+    config = json.dumps([normalization or CLARA_NORMALIZATION, sorted(weights.items())])
+    return hashlib.sha256(config.encode('utf-8')).hexdigest()[:12]
+
+def build_clara_state(df, relative_accuracy=CLARA_SKETCH_ACCURACY):
+    """
+    Estado de normalización de CLARA para las filas de df: mínimo, máximo y sketch de
+    cuantiles de cada métrica
+
+    Los estados de varios bloques se combinan con merge_clara_states, así se construye
+    mientras se leen los datos y se actualiza al añadir filas sin volver a recorrer las
+    anteriores.
+    """
+    state = {'rows': len(df)}
+    for col in CLARA_COMPONENTS:
+        values = df[col].to_numpy(dtype=np.float64)
+        state[col] = {
+            'min': np.nanmin(values) if len(values) else np.nan,
+            'max': np.nanmax(values) if len(values) else np.nan,
+            'sketch': quantile_sketch(values, relative_accuracy),
+        }
+    return state
+
+def merge_clara_states(a, b):
+    """
+    Estado de la unión de las filas de a y b (a puede ser None)
+    """
+    if a is None:
+        return b
+    merged = {'rows': a['rows'] + b['rows']}
+    for col in CLARA_COMPONENTS:
+        merged[col] = {
+            'min': np.fmin(a[col]['min'], b[col]['min']),
+            'max': np.fmax(a[col]['max'], b[col]['max']),
+            'sketch': merge_quantile_sketches(a[col]['sketch'], b[col]['sketch']),
+        }
+    return merged
+
+def subtract_clara_states(a, b):
+    """
+    Estado de las filas de a sin las de b (b, estado de un subconjunto de esas filas)
+
+    Los sketches quedan exactamente como si se construyeran sin esas filas; el mínimo y el
+    máximo no se pueden recalcular sin recorrer las demás y se conservan como cotas.
+    """
+    subtracted = {'rows': a['rows'] - b['rows']}
+    for col in CLARA_COMPONENTS:
+        subtracted[col] = {
+            'min': a[col]['min'],
+            'max': a[col]['max'],
+            'sketch': subtract_quantile_sketches(a[col]['sketch'], b[col]['sketch']),
+        }
+    return subtracted
+
+def normalize_clara_component(df, state, col, normalization=None):
+    """
+    Métrica col de df normalizada según el estado del dataset completo (no el de df)
+    """
+    normalization = normalization or CLARA_NORMALIZATION
+    if normalization == 'percentile':
+        return sketch_percentiles(state[col]['sketch'], df[col].to_numpy(dtype=np.float64))
+    if normalization != 'original':
+        raise ValueError(f"Normalización de CLARA desconocida: '{normalization}' (válidas: {', '.join(CLARA_NORMALIZATIONS)})")
+    if col == 'vistas':
+        return (df[col] - state[col]['min']) / (state[col]['max'] - state[col]['min'] + 0.001)
+    return df[col]
+
+def clara_scores(df, state, weights=None, normalization=None):
+    """
+    Índice CLARA de las filas de df y sus vistas normalizadas: (clara_index, vistas_normalizadas)
+
+    df puede ser cualquier subconjunto (un canal, un formato, las filas nuevas de un
+    snapshot): la normalización sale de state, así que el resultado es el mismo que al
+    puntuar el dataset completo y no hace falta recorrerlo.
+    """
+    weights = CLARA_WEIGHTS if weights is None else weights
+    normalized = {col: normalize_clara_component(df, state, col, normalization) for col in CLARA_COMPONENTS}
+    score = sum(normalized[col] * weights.get(col, 0) for col in CLARA_COMPONENTS)
+    vistas = normalized['vistas']
+    if (normalization or CLARA_NORMALIZATION) == 'percentile':
+        # Misma escala 0-1 que la normalización min-max
+        vistas = vistas / 100
+    return score, vistas
+
+def clara_rank_error(state):
+    """
+    Error máximo, en puntos de percentil, de cada métrica con la normalización 'percentile'
+    """
+    return {col: sketch_rank_error(state[col]['sketch']) for col in CLARA_COMPONENTS}
@@ -1,72 +1,932 @@
 import pandas as pd
 from datetime import datetime
 import numpy as np
+import hashlib
+import io
+import os
+import pickle
+import re
+import time
 
-def load_and_preprocess_data(file_path):
-    df = pd.read_csv(file_path)
+from clara_scoring import build_clara_state, merge_clara_states, subtract_clara_states, clara_scores, clara_config_key
+from instrumentation import instrument_module
 
+# Duración máxima (segundos) para clasificar un video como Short
+SHORT_MAX_SECONDS = 180
+
+# Rangos de duración (segundos) para la duración óptima
+DURATION_BINS = [0, 60, 180, 300, 600, 1200, float('inf')]
+DURATION_LABELS = ['<1min', '1-3min', '3-5min', '5-10min', '10-20min', '>20min']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Reglas de buckets temáticos: (palabra clave, bucket) en orden de prioridad.
+# Si un título contiene varias palabras clave, gana la primera regla de la tabla.
+BUCKET_RULES = [
+    ('productividad', 'Productividad'),
+    ('finanzas', 'Finanzas'),
+    ('negocios', 'Negocios'),
+    ('tutorial', 'Tutorial'),
+]
+DEFAULT_BUCKET = 'General'
+
+# --- Esquema de datos --- #
+# Columnas que se leen del CSV (las opcionales pueden faltar); el resto se descarta al leer
+CSV_COLUMNS = ['video_id', 'titulo', 'nombre_canal', 'fecha_publicacion', 'vistas', 'likes',
+               'comentarios', 'duracion_segundos', 'url_miniatura']
+OPTIONAL_CSV_COLUMNS = ['horas_desde_pub', 'vph', 'tags']
+# Texto de alta cardinalidad: cadenas compactas (Arrow) en lugar de objetos Python
+STRING_COLUMNS = ['video_id', 'titulo', 'url_miniatura', 'tags']
+# Texto de baja cardinalidad
+CATEGORY_COLUMNS = ['nombre_canal', 'formato', 'bucket_tematico']
+# Conteos: entero más pequeño que los contiene
+COUNT_COLUMNS = ['vistas', 'likes', 'comentarios', 'duracion_segundos']
+# Calendario y rango de duración, calculados una vez en la carga para los análisis
+DERIVED_COLUMNS = ['mes', 'dia_semana', 'hora', 'duracion_rango']
+# Índices derivados
+FLOAT32_COLUMNS = ['horas_desde_pub', 'vph', 'indice_conexion', 'vistas_normalizadas', 'clara_index']
+
+# --- Caché en disco del dataset preprocesado --- #
+# Archivos Arrow IPC (Feather v2) sin compresión, nombrados por el hash del CSV de origen
+DATASET_CACHE_DIR = os.environ.get('DASHBOARD_DATASET_CACHE_DIR', os.path.join('.cache', 'datasets'))
+# Subir la versión cuando cambie el preprocesado para invalidar los archivos anteriores
+DATASET_CACHE_VERSION = 3
+# horas_desde_pub y vph dependen del momento de la carga: pasado este tiempo se recalcula
+DATASET_CACHE_MAX_AGE_HOURS = float(os.environ.get('DASHBOARD_DATASET_CACHE_MAX_AGE_HOURS', 12))
+
+def compute_content_hash(data):
+    """
+    Calcula un hash estable del contenido de un archivo (bytes) para usarlo como clave de caché
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def dataset_cache_path(content_hash, cache_dir=None):
+    """
+    Ruta del archivo columnar en caché para un CSV con ese hash de contenido
+    """
+    cache_dir = DATASET_CACHE_DIR if cache_dir is None else cache_dir
+    # El índice CLARA guardado depende de sus pesos y normalización
+    return os.path.join(cache_dir, f"{content_hash}-v{DATASET_CACHE_VERSION}-clara{clara_config_key()}.arrow")
+
+def dataset_sketches_path(content_hash, cache_dir=None):
+    """
+    Ruta de los sketches por bloque guardados junto al dataset en caché (modo aproximado)
+    """
+    return f"{os.path.splitext(dataset_cache_path(content_hash, cache_dir))[0]}.sketches.pkl"
+
+def load_dataset_cached(file_bytes, content_hash=None, cache_dir=None, chunksize=None,
+                        max_age_hours=DATASET_CACHE_MAX_AGE_HOURS, sketches=False):
+    """
+    Carga el dataset preprocesado desde la caché en disco o, si no existe, procesa el CSV
+    y guarda el resultado
+
+    El archivo se abre con memory-map: las columnas numéricas y de texto no se copian
+    al leerlo. Sin pyarrow instalado se procesa el CSV en cada llamada. Con sketches, si
+    hay que procesar el CSV, los sketches del modo aproximado se construyen en la misma
+    pasada y se guardan junto al dataset (ver load_dataset_sketches).
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return load_and_preprocess_data(io.BytesIO(file_bytes), chunksize=chunksize)
+
+    if content_hash is None:
+        content_hash = compute_content_hash(file_bytes)
+    path = dataset_cache_path(content_hash, cache_dir)
+
+    if os.path.exists(path) and (time.time() - os.path.getmtime(path)) / 3600 < max_age_hours:
+        return _read_arrow(path)
+
+    if not sketches:
+        df = load_and_preprocess_data(io.BytesIO(file_bytes), chunksize=chunksize)
+        _write_arrow(df, path)
+        return df
+
+    df, chunk_sketches = load_and_preprocess_data(io.BytesIO(file_bytes), chunksize=chunksize, sketches=True)
+    _write_arrow(df, path)
+    _write_dataset_sketches(chunk_sketches, path, dataset_sketches_path(content_hash, cache_dir))
+    return df
+
+def _write_dataset_sketches(chunk_sketches, path, sketches_path):
+    # Los sketches corresponden a esta versión del archivo del dataset (se comprueba al leerlos)
+    _write_state({'dataset_mtime': os.path.getmtime(path), 'chunk_sketches': chunk_sketches}, sketches_path)
+
+def load_dataset_sketches(df, content_hash, cache_dir=None, chunk_rows=None):
+    """
+    Sketches por bloque (modo aproximado) del dataset df en caché con ese hash
+
+    Se leen de disco si se guardaron con esta versión del dataset; si no (se cargó sin
+    ellos, o el dataset no viene de la caché), se construyen a partir de df y, si el
+    dataset está en caché, se guardan junto a él.
+    """
+    # Import diferido: approximate depende de title_analysis, que importa este módulo
+    from approximate import APPROX_CHUNK_ROWS, build_chunk_sketches
+
+    path = dataset_cache_path(content_hash, cache_dir)
+    sketches_path = dataset_sketches_path(content_hash, cache_dir)
+    stored = _read_state(sketches_path)
+    if stored is not None and os.path.exists(path) and stored['dataset_mtime'] == os.path.getmtime(path):
+        return stored['chunk_sketches']
+
+    chunk_sketches = build_chunk_sketches(df, chunk_rows or APPROX_CHUNK_ROWS)
+    if os.path.exists(path):
+        _write_dataset_sketches(chunk_sketches, path, sketches_path)
+    return chunk_sketches
+
+def open_cached_dataset(content_hash, cache_dir=None, zero_copy=True):
+    """
+    Abre el dataset preprocesado de la caché en disco (sin reprocesar ni comprobar su
+    antigüedad); None si no existe
+
+    Con zero_copy cada columna numérica es una vista de solo lectura sobre el archivo
+    mapeado en memoria: varios procesos que abren el mismo archivo comparten las páginas
+    en lugar de tener cada uno su copia.
+    """
+    path = dataset_cache_path(content_hash, cache_dir)
+    return _read_arrow(path, zero_copy=zero_copy) if os.path.exists(path) else None
+
+def _read_arrow(path, zero_copy=False):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = feather.read_table(path, memory_map=True)
+    # Mantener el texto como cadenas Arrow (sin convertir a objetos Python)
+    string_dtype = _string_dtype()
+    arrow_strings = {pa.string(): string_dtype, pa.large_string(): string_dtype}
+    # split_blocks evita consolidar las columnas numéricas en bloques nuevos (copia)
+    return _consolidate_strings(table.to_pandas(types_mapper=arrow_strings.get, split_blocks=zero_copy))
+
+def _write_arrow(df, path):
+    import pyarrow.feather as feather
+
+    # Escritura atómica: otras sesiones nunca ven un archivo a medio escribir
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+
+def _read_state(path):
+    # Estado auxiliar (sketches, normalización de CLARA) guardado junto a un archivo Arrow;
+    # None si no existe o no se puede leer
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+def _write_state(state, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+# --- Ingesta incremental de snapshots diarios --- #
+# Almacén con el último dataset procesado (por video_id) y los deltas de cada snapshot
+SNAPSHOT_STORE_DIR = os.environ.get('DASHBOARD_SNAPSHOT_STORE_DIR', os.path.join('.cache', 'snapshots'))
+# Nombre de cada archivo de deltas: instante del snapshot
+SNAPSHOT_TIME_FORMAT = '%Y%m%dT%H%M%S'
+# Columnas del CSV cuyo cambio obliga a reprocesar el video
+SNAPSHOT_CHANGE_COLUMNS = ['vistas', 'likes', 'comentarios', 'duracion_segundos', 'titulo']
+# Conteos de los que se guarda la diferencia con el snapshot anterior
+SNAPSHOT_DELTA_COLUMNS = ['vistas', 'likes', 'comentarios']
+
+def snapshot_store_paths(store_dir=None):
+    """
+    Rutas del dataset actual y del directorio de deltas del almacén de snapshots
+    """
+    store_dir = SNAPSHOT_STORE_DIR if store_dir is None else store_dir
+    return os.path.join(store_dir, 'current.arrow'), os.path.join(store_dir, 'deltas')
+
+def load_snapshot_store(store_dir=None):
+    """
+    Dataset procesado del último snapshot ingerido, o None si el almacén está vacío
+    """
+    current_path, _ = snapshot_store_paths(store_dir)
+    return _read_arrow(current_path) if os.path.exists(current_path) else None
+
+def _snapshot_clara_state_path(store_dir=None):
+    store_dir = SNAPSHOT_STORE_DIR if store_dir is None else store_dir
+    return os.path.join(store_dir, 'clara_state.pkl')
+
+def load_snapshot_deltas(store_dir=None):
+    """
+    Deltas de todos los snapshots ingeridos, en orden cronológico
+    """
+    _, deltas_dir = snapshot_store_paths(store_dir)
+    names = sorted(name for name in os.listdir(deltas_dir) if name.endswith('.arrow')) if os.path.isdir(deltas_dir) else []
+    if not names:
+        return pd.DataFrame(columns=['snapshot_ts', 'video_id', 'estado'] + SNAPSHOT_DELTA_COLUMNS
+                            + [f'delta_{col}' for col in SNAPSHOT_DELTA_COLUMNS])
+    deltas = [_read_arrow(os.path.join(deltas_dir, name)) for name in names]
+    # Los snapshots sin cambios dejan un archivo vacío (ver load_snapshot_times)
+    return pd.concat([delta for delta in deltas if len(delta) > 0] or deltas[:1], ignore_index=True)
+
+def load_snapshot_times(store_dir=None):
+    """
+    Instantes de todos los snapshots ingeridos, en orden cronológico (también los que no
+    cambiaron ningún video y por eso no tienen filas en los deltas)
+    """
+    _, deltas_dir = snapshot_store_paths(store_dir)
+    names = sorted(name for name in os.listdir(deltas_dir) if name.endswith('.arrow')) if os.path.isdir(deltas_dir) else []
+    return pd.to_datetime([os.path.splitext(name)[0] for name in names], format=SNAPSHOT_TIME_FORMAT)
+
+def ingest_snapshot(file_path, store_dir=None, snapshot_time=None):
+    """
+    Incorpora un snapshot diario (CSV completo) al almacén y devuelve (dataset, deltas)
+
+    Los videos se cruzan por video_id con el snapshot anterior: solo los nuevos y los que
+    cambiaron (SNAPSHOT_CHANGE_COLUMNS) pasan por el preprocesado fila a fila (fechas,
+    formato, bucket, índice de conexión); el resto se reutiliza tal cual. Los videos que
+    ya no aparecen en el CSV se conservan (upsert). horas_desde_pub y vph son los del
+    snapshot en que el video cambió por última vez. El estado de normalización de CLARA se
+    guarda en el almacén y se actualiza con las filas procesadas (quitando los valores
+    anteriores de las actualizadas), sin recorrer el resto; con él se vuelven a puntuar
+    vistas_normalizadas y clara_index, que dependen de todo el dataset.
+
+    deltas tiene una fila por video nuevo o actualizado con los conteos actuales y su
+    diferencia con el snapshot anterior; también se guarda en el almacén.
+    """
+    now = datetime.now() if snapshot_time is None else snapshot_time
+    current_path, deltas_dir = snapshot_store_paths(store_dir)
+
+    raw = _read_snapshot_csv(file_path)
+    raw = raw.drop_duplicates('video_id', keep='last', ignore_index=True)
+    previous = load_snapshot_store(store_dir)
+    clara_state_path = _snapshot_clara_state_path(store_dir)
+    clara_state = None
+    if previous is not None:
+        add_derived_columns(previous)
+        stored = _read_state(clara_state_path)
+        if stored is not None and stored['current_mtime'] == os.path.getmtime(current_path):
+            clara_state = stored['clara_state']
+        else:
+            # Almacén anterior al estado guardado (o interrumpido entre las dos escrituras)
+            clara_state = build_clara_state(previous)
+
+    # Posición de cada video del CSV en el snapshot anterior (-1 si es nuevo)
+    if previous is None:
+        prev_pos = np.full(len(raw), -1, dtype=np.int64)
+    else:
+        prev_pos = pd.Index(previous['video_id']).get_indexer(raw['video_id'])
+    process = prev_pos < 0
+    if previous is not None:
+        matched = np.flatnonzero(~process)
+        for col in SNAPSHOT_CHANGE_COLUMNS:
+            process[matched] |= _changed_values(raw[col].iloc[matched], previous[col].take(prev_pos[matched]))
+
+    # Preprocesar solo las filas nuevas o cambiadas (descartando fechas inválidas de antemano
+    # para que cada fila procesada siga alineada con su posición en el CSV)
+    process_pos = np.flatnonzero(process)
+    subset = raw.iloc[process_pos].reset_index(drop=True)
+    valid = pd.to_datetime(subset['fecha_publicacion'], errors='coerce').notna().to_numpy()
+    process_pos = process_pos[valid]
+    processed = _preprocess_chunk(subset[valid].reset_index(drop=True), now, optimize=True)
+    old_pos = prev_pos[process_pos]
+
+    if previous is None:
+        df = processed
+    else:
+        # Las filas actualizadas ocupan la posición de la versión anterior; las nuevas van al final
+        n_previous = len(previous)
+        updated = old_pos >= 0
+        order = np.arange(n_previous)
+        order[old_pos[updated]] = n_previous + np.flatnonzero(updated)
+        order = np.concatenate([order, n_previous + np.flatnonzero(~updated)])
+        df = _concat_chunks([previous, processed]).take(order).reset_index(drop=True)
+        if updated.any():
+            clara_state = subtract_clara_states(clara_state, build_clara_state(previous.take(old_pos[updated])))
+
+    # Normalización de CLARA: solo se recorren las filas procesadas
+    if len(processed) > 0 or clara_state is None:
+        clara_state = merge_clara_states(clara_state, build_clara_state(processed))
+    # Mismos tipos que en la carga completa antes de las métricas globales
+    df = optimize_dtypes(df)
+    _add_global_metrics(df, clara_state)
+    df = _consolidate_strings(optimize_dtypes(df))
+
+    deltas = pd.DataFrame({
+        'snapshot_ts': pd.Series(pd.Timestamp(now), index=processed.index),
+        'video_id': processed['video_id'],
+        'estado': pd.Categorical(np.where(old_pos >= 0, 'actualizado', 'nuevo'), categories=['nuevo', 'actualizado']),
+    })
+    for col in SNAPSHOT_DELTA_COLUMNS:
+        current = processed[col].to_numpy(dtype=np.int64)
+        before = np.zeros(len(processed), dtype=np.int64)
+        if previous is not None:
+            before[old_pos >= 0] = previous[col].to_numpy(dtype=np.int64)[old_pos[old_pos >= 0]]
+        deltas[col] = current
+        deltas[f'delta_{col}'] = current - before
+
+    # Primero los deltas: si se interrumpe antes de actualizar el dataset, el snapshot se
+    # puede volver a ingerir. Se escriben aunque estén vacíos: el nombre registra el instante
+    # del snapshot, que hace falta para saber que los videos sin fila no cambiaron en él
+    _write_arrow(deltas, os.path.join(deltas_dir, f"{pd.Timestamp(now).strftime(SNAPSHOT_TIME_FORMAT)}.arrow"))
+    _write_arrow(df, current_path)
+    # El estado corresponde a esta versión del dataset (se comprueba al leerlo)
+    _write_state({'current_mtime': os.path.getmtime(current_path), 'clara_state': clara_state}, clara_state_path)
+
+    return df, deltas
+
+def _read_snapshot_csv(file_path):
+    # El lector CSV de pyarrow (multihilo) es varias veces más rápido que pd.read_csv y la
+    # lectura del snapshot completo es la parte que no depende del número de cambios
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    wanted = CSV_COLUMNS + OPTIONAL_CSV_COLUMNS
+    column_types = {col: pa.string() for col in STRING_COLUMNS + ['fecha_publicacion']}
+    column_types['nombre_canal'] = pa.dictionary(pa.int32(), pa.string())
+    # Conteos con texto no numérico: ArrowInvalid y se usa el lector de pandas
+    column_types.update({col: pa.int64() for col in COUNT_COLUMNS})
+    try:
+        table = pa_csv.read_csv(file_path, convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    except pa.ArrowInvalid:
+        # Valores que pyarrow no sabe convertir: el lector de pandas los deja como texto
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
+        return pd.read_csv(file_path, **csv_read_options())
+    table = table.select([col for col in table.column_names if col in wanted])
+    string_dtype = _string_dtype()
+    df = table.to_pandas(types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get)
+    # Categorías ordenadas, como las de pd.read_csv(dtype='category')
+    df['nombre_canal'] = df['nombre_canal'].cat.reorder_categories(sorted(df['nombre_canal'].cat.categories))
+    return df
+
+def _changed_values(new, old):
+    # Compara una columna del CSV con la del snapshot anterior (misma longitud y orden)
+    if pd.api.types.is_numeric_dtype(old.dtype) and not pd.api.types.is_bool_dtype(old.dtype):
+        new_values = pd.to_numeric(new, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        return new_values != old.to_numpy(dtype=np.float64)
+    new = new.astype(_string_dtype()).reset_index(drop=True)
+    old = old.astype(_string_dtype()).reset_index(drop=True)
+    return new.ne(old).to_numpy(dtype=bool, na_value=True) & ~(new.isna() & old.isna()).to_numpy()
+
+def load_and_preprocess_data(file_path, chunksize=None, optimize=True, sketches=False):
+    """
+    Carga el CSV de videos y calcula las métricas derivadas
+
+    Con chunksize el archivo se lee por bloques de ese número de filas: cada bloque
+    se preprocesa por separado y la normalización del índice CLARA (mínimos, máximos y
+    sketches de cuantiles) se acumula bloque a bloque, así el texto del CSV nunca está
+    completo en memoria.
+
+    Con optimize (por defecto) se aplica el esquema compacto: solo se leen las
+    columnas del esquema, el texto se guarda como cadenas Arrow o categóricas y
+    los números con el tipo más pequeño que los contiene (ver optimize_dtypes).
+
+    Con sketches devuelve (df, sketches por bloque del modo aproximado): se construyen
+    en la misma pasada, uno por bloque leído (ver approximate.sketch_chunk).
+    """
+    if sketches:
+        # Import diferido: approximate depende de title_analysis, que importa este módulo
+        from approximate import sketch_chunk
+    # Misma referencia temporal para todos los bloques
+    now = datetime.now()
+    read_options = csv_read_options() if optimize else {}
+    chunk_sketches = []
+
+    if chunksize is None:
+        df = _preprocess_chunk(pd.read_csv(file_path, **read_options), now, optimize)
+        clara_state = build_clara_state(df)
+        if sketches and len(df) > 0:
+            chunk_sketches.append(sketch_chunk(df, clara_state=clara_state))
+    else:
+        chunks = []
+        clara_state = None
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, **read_options):
+            chunk = _preprocess_chunk(chunk, now, optimize)
+            if len(chunk) > 0:
+                chunk_state = build_clara_state(chunk)
+                clara_state = merge_clara_states(clara_state, chunk_state)
+                if sketches:
+                    chunk_sketches.append(sketch_chunk(chunk, clara_state=chunk_state))
+            chunks.append(chunk)
+        df = _concat_chunks(chunks)
+        del chunks
+        if clara_state is None:
+            clara_state = build_clara_state(df)
+
+    _add_global_metrics(df, clara_state)
+
+    if optimize:
+        df = _consolidate_strings(optimize_dtypes(df))
+
+    return (df, chunk_sketches) if sketches else df
+
+def _add_global_metrics(df, clara_state):
+    # Métricas que dependen de todo el dataset: el índice CLARA™ (ver clara_scoring) y las
+    # vistas normalizadas que usa, según el estado de normalización de todas las filas
+    clara_index, vistas_normalizadas = clara_scores(df, clara_state)
+    df["vistas_normalizadas"] = vistas_normalizadas
+    df["clara_index"] = clara_index
+    return df
+
+def _preprocess_chunk(df, now, optimize=False):
+    # Derivaciones fila a fila: no dependen de otras filas, se pueden aplicar por bloques
     # Convertir fecha_publicacion a datetime y manejar posibles errores
-    df["fecha_publicacion"] = pd.to_datetime(df["fecha_publicacion"], errors=\'coerce\')
+    df["fecha_publicacion"] = pd.to_datetime(df["fecha_publicacion"], errors='coerce')
     df.dropna(subset=["fecha_publicacion"], inplace=True)
+    df.reset_index(drop=True, inplace=True)
 
-    # Calcular \'horas_desde_pub\' si no está presente o si se necesita recalcular
+    # Calcular 'horas_desde_pub' si no está presente o si se necesita recalcular
     # Asumiendo que la fecha actual es la de la ejecución del script
-    if \'horas_desde_pub\' not in df.columns:
-        df["horas_desde_pub"] = (datetime.now() - df["fecha_publicacion"]).dt.total_seconds() / 3600
+    if 'horas_desde_pub' not in df.columns:
+        df["horas_desde_pub"] = (now - df["fecha_publicacion"]).dt.total_seconds() / 3600
 
     # Asegurar que las columnas numéricas sean de tipo numérico
-    numeric_cols = [\'vistas\', \'likes\', \'comentarios\', \'duracion_segundos\', \'horas_desde_pub\']
+    numeric_cols = ['vistas', 'likes', 'comentarios', 'duracion_segundos', 'horas_desde_pub']
     for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors=\'coerce\').fillna(0)
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
 
     # Calcular VPH si no está presente o si se necesita recalcular
-    if \'vph\' not in df.columns:
+    if 'vph' not in df.columns:
         df["vph"] = df["vistas"] / (df["horas_desde_pub"] + 0.001) # Evitar división por cero
 
     # Clasificar Formato (Shorts vs. Largos) - CORREGIDO A 180 SEGUNDOS
-    df["formato"] = df["duracion_segundos"].apply(lambda x: \'Short\' if x < 180 else \'Largo\')
+    df["formato"] = classify_format(df["duracion_segundos"])
 
     # Calcular Índice de Conexión
     df["indice_conexion"] = ((df["likes"] + df["comentarios"] * 2) / (df["vistas"] + 0.001)) * 100
 
-    # Calcular Índice CLARA™ (ejemplo de fórmula ponderada)
-    # Necesitamos \'vistas_normalizadas\' para CLARA, que no está en el CSV de ejemplo.
-    # Por ahora, usaremos una simplificación o asumiremos que se calculará más adelante.
-    # Para este ejemplo, vamos a normalizar las vistas de forma simple para la demostración.
-    min_vistas = df[\'vistas\'].min()
-    max_vistas = df[\'vistas\'].max()
-    df["vistas_normalizadas"] = (df["vistas"] - min_vistas) / (max_vistas - min_vistas + 0.001)
-    df["clara_index"] = (df["vph"] * 0.5) + (df["indice_conexion"] * 0.3) + (df["vistas_normalizadas"] * 0.2)
-
     # Identificar Buckets Temáticos (Esto requeriría un modelo de NLP o reglas, por ahora es un placeholder)
-    # Para la demostración, asignaremos un bucket genérico o basado en palabras clave simples
-    def assign_bucket(title):
-        title_lower = str(title).lower()
-        if \'productividad\' in title_lower: return \'Productividad\'
-        if \'finanzas\' in title_lower: return \'Finanzas\'
-        if \'negocios\' in title_lower: return \'Negocios\'
-        if \'tutorial\' in title_lower: return \'Tutorial\'
-        return \'General\'
+    # Para la demostración, asignamos el bucket según la tabla de palabras clave BUCKET_RULES
+    df["bucket_tematico"] = classify_buckets(df["titulo"])
+
+    # Mes, día, hora y rango de duración para los análisis (sin volver a procesar fechas)
+    add_derived_columns(df)
+
+    # Compactar cada bloque antes de acumularlo
+    if optimize:
+        df = optimize_dtypes(df)
+
+    return df
+
+def derived_column(df, col):
+    """
+    Columna derivada de DERIVED_COLUMNS: la precalculada si df la tiene y, si no, se
+    calcula a partir de fecha_publicacion/duracion_segundos sin modificar df
+    """
+    if col in df:
+        return df[col]
+    if col == 'mes':
+        # Ordinal del mes (meses desde 1970-01, el de Period) en int16 en lugar de period[M],
+        # que ocupa 8 bytes por fila; month_periods lo convierte al mostrarlo
+        fecha = df['fecha_publicacion']
+        codes = (fecha.dt.year.to_numpy() - 1970) * 12 + fecha.dt.month.to_numpy() - 1
+        return pd.Series(codes.astype(np.int16), index=df.index, name='mes')
+    if col == 'dia_semana':
+        codes = df['fecha_publicacion'].dt.dayofweek.to_numpy(dtype=np.int8)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=WEEKDAYS), index=df.index, name='dia_semana')
+    if col == 'hora':
+        return df['fecha_publicacion'].dt.hour.astype(np.int8).rename('hora')
+    if col == 'duracion_rango':
+        return pd.cut(df['duracion_segundos'], bins=DURATION_BINS, labels=DURATION_LABELS).rename('duracion_rango')
+    raise KeyError(col)
 
-    df["bucket_tematico"] = df["titulo"].apply(assign_bucket)
+def month_periods(codes):
+    """
+    Períodos mensuales (PeriodIndex) de los códigos int16 de la columna mes
+    """
+    return pd.PeriodIndex.from_ordinals(np.asarray(codes, dtype=np.int64), freq='M')
 
+def add_derived_columns(df):
+    """
+    Añade a df las columnas de DERIVED_COLUMNS que le falten (mes como código int16, día de
+    la semana y rango de duración categóricos, hora int8)
+    """
+    if 'mes' in df and df['mes'].dtype != np.int16:
+        # Almacén de snapshots guardado con el mes como period[M]
+        del df['mes']
+    for col in DERIVED_COLUMNS:
+        if col not in df:
+            df[col] = derived_column(df, col)
     return df
 
-def get_top_videos(df, num_videos=20, sort_by=\'vph\', ascending=False):
-    return df.sort_values(by=sort_by, ascending=ascending).head(num_videos)
+def _concat_chunks(chunks):
+    # Unificar las categorías de cada bloque para que la concatenación siga siendo categórica
+    for col in CATEGORY_COLUMNS:
+        if chunks and all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks if col in chunk):
+            categories = pd.api.types.union_categoricals([chunk[col] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+def _consolidate_strings(df):
+    # Las cadenas Arrow quedan repartidas en un trozo por bloque leído; unirlas una vez
+    # evita que cada take/filtro posterior las vuelva a combinar
+    for col in df.columns:
+        array = df[col].array
+        if isinstance(array, pd.arrays.ArrowStringArray) and array._pa_array.num_chunks > 1:
+            import pyarrow as pa
+            combined = pa.chunked_array([array._pa_array.combine_chunks()])
+            df[col] = pd.Series(pd.arrays.ArrowStringArray(combined), index=df.index, name=col)
+    return df
+
+def csv_read_options():
+    """
+    Opciones de pd.read_csv para el esquema compacto (usecols + dtype)
+    """
+    string_dtype = _string_dtype()
+    wanted = set(CSV_COLUMNS + OPTIONAL_CSV_COLUMNS)
+    dtype = {col: string_dtype for col in STRING_COLUMNS}
+    dtype['nombre_canal'] = 'category'
+    return {'usecols': lambda col: col in wanted, 'dtype': dtype}
+
+def optimize_dtypes(df):
+    """
+    Convierte las columnas al esquema compacto: categóricas para texto de baja
+    cardinalidad, enteros mínimos para conteos y float32 para índices derivados
+    """
+    string_dtype = _string_dtype()
+    for col in STRING_COLUMNS:
+        if col in df and df[col].dtype == object:
+            df[col] = df[col].astype(string_dtype)
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in COUNT_COLUMNS:
+        if col in df and len(df) > 0:
+            downcast = 'unsigned' if df[col].min() >= 0 else 'integer'
+            df[col] = pd.to_numeric(df[col], downcast=downcast)
+    for col in FLOAT32_COLUMNS:
+        if col in df and df[col].dtype == np.float64:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+def memory_usage_report(df_before, df_after):
+    """
+    Compara la memoria por columna (MB) de dos versiones del mismo dataset
+    """
+    before = df_before.memory_usage(index=False, deep=True) / 1024 ** 2
+    after = df_after.memory_usage(index=False, deep=True) / 1024 ** 2
+    report = pd.DataFrame({
+        'dtype_antes': df_before.dtypes.astype(str),
+        'dtype_despues': df_after.dtypes.astype(str),
+        'mb_antes': before,
+        'mb_despues': after
+    })
+    report.loc['TOTAL', ['mb_antes', 'mb_despues']] = [before.sum(), after.sum()]
+    report['reduccion'] = report['mb_antes'] / report['mb_despues']
+    return report
+
+def classify_format(duracion_segundos, threshold=SHORT_MAX_SECONDS):
+    """
+    Clasifica cada video como Short o Largo de forma vectorizada (categórico)
+    """
+    codes = np.where(duracion_segundos.to_numpy() < threshold, 0, 1).astype(np.int8)
+    formato = pd.Categorical.from_codes(codes, categories=['Short', 'Largo'])
+    return pd.Series(formato, index=duracion_segundos.index)
+
+def _string_dtype():
+    # Con pyarrow disponible las cadenas se guardan compactas y .str usa kernels nativos
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype('pyarrow')
+    except ImportError:
+        return pd.StringDtype('python')
+
+def classify_buckets(titulos, rules=None, default=DEFAULT_BUCKET):
+    """
+    Asigna un bucket temático a cada título según una tabla (palabra clave, bucket)
+
+    Una sola expresión regular con todas las palabras clave recorre los
+    títulos una vez; la prioridad entre reglas solo se resuelve sobre las filas que
+    contienen alguna palabra clave.
+    """
+    rules = BUCKET_RULES if rules is None else list(rules)
+    buckets = list(dict.fromkeys([bucket for _, bucket in rules] + [default]))
+    bucket_codes = {bucket: code for code, bucket in enumerate(buckets)}
+
+    codes = np.full(len(titulos), bucket_codes[default], dtype=np.int16)
+    if rules and len(titulos) > 0:
+        titles = titulos.astype(_string_dtype())
+        matcher = '|'.join(re.escape(keyword) for keyword, _ in rules)
+        matched = titles.str.contains(matcher, case=False, regex=True).to_numpy(dtype=bool, na_value=False)
+
+        # Resolver prioridad: recorrer las reglas en orden solo sobre las filas con coincidencia
+        pending_pos = np.flatnonzero(matched)
+        pending = titles.iloc[pending_pos]
+        for keyword, bucket in rules:
+            if len(pending_pos) == 0:
+                break
+            hit = pending.str.contains(keyword, case=False, regex=False).to_numpy(dtype=bool, na_value=False)
+            codes[pending_pos[hit]] = bucket_codes[bucket]
+            pending_pos = pending_pos[~hit]
+            pending = pending[~hit]
+
+    return pd.Series(pd.Categorical.from_codes(codes, categories=buckets), index=titulos.index)
+
+def get_top_videos(df, num_videos=20, sort_by='vph', ascending=False, rank_index=None, formato=None):
+    """
+    Devuelve los num_videos mejores videos según sort_by (opcionalmente de un formato)
+
+    Con rank_index (build_rank_index sobre este mismo df) el resultado es un corte de
+    num_videos posiciones ya ordenadas. Sin él se usa selección parcial (argpartition)
+    en lugar de ordenar todo el DataFrame. Los videos con sort_by NaN no entran, igual que
+    en get_leaderboard_page: el top son solo videos con puesto.
+    """
+    if rank_index is not None and not ascending and sort_by in rank_index:
+        entry = rank_index[sort_by].get(formato or RANK_ALL)
+        return df.take(entry['positions'][:entry['ranked']][:num_videos] if entry is not None else np.empty(0, dtype=np.int64))
+    if formato is not None:
+        df = df[df["formato"] == formato]
+    values = df[sort_by].to_numpy(dtype=np.float64, na_value=np.nan)
+    positions = top_k_positions(values, num_videos, ascending)
+    # top_k_positions deja los NaN al final: solo hay que recortarlos
+    return df.take(positions[~np.isnan(values[positions])])
+
+# --- Índice de rankings --- #
+# Clave del ranking de todo el nicho (sin filtrar por formato)
+RANK_ALL = 'Todos'
+# Métricas con ranking y percentiles precalculados
+RANK_COLUMNS = ('vph', 'indice_conexion', 'clara_index')
+
+def top_k_positions(values, k, ascending=False):
+    """
+    Posiciones de los k mayores valores (menores con ascending), ordenadas
+
+    Selección parcial O(n) con argpartition y orden solo de los k elegidos. Los empates
+    se resuelven por posición y los NaN quedan al final.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    k = max(0, min(int(k), len(values)))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    keys = values if ascending else -values
+    keys = np.where(np.isnan(keys), np.inf, keys)
+    if k == len(keys):
+        return np.argsort(keys, kind='stable')
+    candidates = np.argpartition(keys, k - 1)[:k]
+    # Incluir todos los empatados con el k-ésimo para que el desempate por posición sea estable
+    threshold = keys[candidates].max()
+    candidates = np.union1d(candidates, np.flatnonzero(keys == threshold))
+    return candidates[np.lexsort((candidates, keys[candidates]))][:k]
+
+def build_rank_index(df, columns=RANK_COLUMNS):
+    """
+    Precalcula, al cargar los datos, el orden descendente de cada métrica de ranking
+    para todo el nicho y para cada formato
+
+    rank_index[col][formato] tiene las posiciones de df de mayor a menor col
+    ('positions'), los valores en ese mismo orden ('values') y cuántos no son NaN
+    ('ranked'). El top N o cualquier página del ranking es un corte de 'positions'; el
+    puesto de un valor es una búsqueda binaria en 'values' (ver rank_values).
+    """
+    formato = df['formato'].astype('category')
+    format_codes = formato.cat.codes.to_numpy()
+    rank_index = {}
+    for col in columns:
+        if col not in df:
+            continue
+        values = df[col].to_numpy()
+        order = top_k_positions(values, len(df))
+        ordered_codes = format_codes[order]
+        ranks = {RANK_ALL: _rank_entry(order, values)}
+        for code, name in enumerate(formato.cat.categories):
+            ranks[name] = _rank_entry(order[ordered_codes == code], values)
+        rank_index[col] = ranks
+    return rank_index
+
+def _rank_entry(order, values):
+    sorted_values = values[order]
+    return {
+        'positions': order,
+        'values': sorted_values,
+        # Los NaN quedan al final del orden y no tienen puesto
+        'ranked': int(len(order) - np.isnan(sorted_values.astype(np.float64, copy=False)).sum()),
+    }
+
+def rank_values(rank_index, col, values, formato=None):
+    """
+    Puesto (1 = mejor) y percentil de values en el ranking de col, en O(log n) por valor
+
+    Devuelve (puestos, percentiles, total). Los empates comparten el mejor puesto; el
+    percentil es el porcentaje de videos con un valor estrictamente menor. Los valores
+    NaN o los rankings vacíos dan NaN.
+    """
+    entry = rank_index[col].get(formato or RANK_ALL)
+    values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    total = 0 if entry is None else entry['ranked']
+    if total == 0:
+        return np.full(len(values), np.nan), np.full(len(values), np.nan), 0
+    # Vista ascendente de los valores ya ordenados (sin copiar ni reordenar)
+    ascending = entry['values'][:total][::-1]
+    greater = total - np.searchsorted(ascending, values, side='right')
+    lower = np.searchsorted(ascending, values, side='left')
+    ranks = np.where(np.isnan(values), np.nan, greater + 1)
+    percentiles = np.where(np.isnan(values), np.nan, lower * 100 / total)
+    return ranks, percentiles, total
+
+def rank_videos(df, rank_index, positions, columns=None):
+    """
+    Puesto y percentil de los videos en las posiciones dadas, en todo el nicho y dentro
+    de su formato, para cada métrica del índice
+
+    Devuelve un DataFrame con el índice de esos videos y columnas puesto_<col>,
+    percentil_<col>, puesto_formato_<col> y percentil_formato_<col>.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    columns = [col for col in (columns or rank_index) if col in rank_index]
+    formatos = df['formato'].to_numpy()[positions]
+    result = pd.DataFrame(index=df.index[positions])
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)[positions]
+        ranks, percentiles, _ = rank_values(rank_index, col, values)
+        result[f'puesto_{col}'] = ranks
+        result[f'percentil_{col}'] = percentiles
+        format_ranks = np.full(len(positions), np.nan)
+        format_percentiles = np.full(len(positions), np.nan)
+        for formato in pd.unique(formatos):
+            mask = formatos == formato
+            format_ranks[mask], format_percentiles[mask], _ = rank_values(rank_index, col, values[mask], formato)
+        result[f'puesto_formato_{col}'] = format_ranks
+        result[f'percentil_formato_{col}'] = format_percentiles
+    return result
+
+def get_leaderboard_page(df, rank_index, sort_by, page=1, page_size=100, formato=None, limit=None, columns=None):
+    """
+    Página page (desde 1) del ranking completo de sort_by, sin reordenar
+
+    limit acota el ranking a sus primeros puestos (p. ej. el top 1000) y columns a las
+    columnas que se van a mostrar, así solo se copian las filas y columnas de la página.
+    Devuelve (videos de la página con su puesto en la columna 'puesto', número de páginas).
+    El puesto es el de rank_values: los empates comparten el mejor puesto y los videos
+    con sort_by NaN no tienen puesto, así que no aparecen en el ranking.
+    """
+    entry = rank_index[sort_by].get(formato or RANK_ALL)
+    ranked = np.empty(0, dtype=np.int64) if entry is None else entry['positions'][:entry['ranked']][:limit]
+    pages = max(1, -(-len(ranked) // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    positions = ranked[start:start + page_size]
+    videos = df.take(positions) if columns is None else df.iloc[positions, df.columns.get_indexer(list(columns))]
+    ranks = np.empty(0) if entry is None else rank_values(rank_index, sort_by, entry['values'][start:start + len(positions)], formato)[0]
+    videos.insert(0, 'puesto', ranks.astype(np.int64))
+    return videos, pages
+
+def filter_by_channel(df, channel_name, channel_index=None, formato=None):
+    # Con el índice de canales la selección es un take de las posiciones del canal (sin comparar cadenas)
+    if channel_index is not None:
+        return df.take(_channel_positions(channel_index, channel_name, formato))
+    df_channel = df[df["nombre_canal"] == channel_name]
+    if formato is not None:
+        df_channel = df_channel[df_channel["formato"] == formato]
+    return df_channel
+
+def filter_competition(df, channel_name, channel_index=None):
+    # Todo el dataset excepto el canal: con el índice basta una máscara por posiciones
+    if channel_index is not None:
+        mask = np.ones(len(df), dtype=bool)
+        mask[_channel_positions(channel_index, channel_name)] = False
+        return df[mask]
+    return df[df["nombre_canal"] != channel_name]
 
-def filter_by_channel(df, channel_name):
-    return df[df["nombre_canal"] == channel_name]
+def filter_by_format(df, formato, channel_index=None):
+    if channel_index is not None:
+        f = channel_index['format_codes'].get(formato)
+        if f is None:
+            return df.iloc[:0]
+        lo, hi = channel_index['format_offsets'][f], channel_index['format_offsets'][f + 1]
+        return df.take(channel_index['format_order'][lo:hi])
+    return df[df["formato"] == formato]
+
+def build_channel_index(df):
+    """
+    Construye, una vez al cargar los datos, un índice de posiciones por canal y formato
+
+    Las posiciones de las filas se ordenan por (canal, formato) y se guardan los
+    desplazamientos de cada grupo, igual que un CSR: las filas de un canal, o de un
+    canal y formato, son un rango contiguo de 'order'. Lo mismo para el formato en
+    todo el nicho con 'format_order'.
+    """
+    canal = df['nombre_canal'].astype('category')
+    formato = df['formato'].astype('category')
+    channels = list(canal.cat.categories)
+    formats = list(formato.cat.categories)
+    n_formats = max(len(formats), 1)
+    pos_dtype = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+
+    canal_codes = canal.cat.codes.to_numpy().astype(np.int64)
+    format_codes = formato.cat.codes.to_numpy().astype(np.int64)
+
+    # Filas sin canal o sin formato no pertenecen a ningún grupo
+    valid = np.flatnonzero((canal_codes >= 0) & (format_codes >= 0)).astype(pos_dtype)
+    keys = canal_codes[valid] * n_formats + format_codes[valid]
+    order = valid[np.argsort(keys, kind='stable')]
+    counts = np.bincount(keys, minlength=len(channels) * n_formats)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    valid_format = np.flatnonzero(format_codes >= 0).astype(pos_dtype)
+    format_order = valid_format[np.argsort(format_codes[valid_format], kind='stable')]
+    format_offsets = np.concatenate([[0], np.cumsum(np.bincount(format_codes[valid_format], minlength=len(formats)))])
+
+    # Solo canales con al menos un video
+    channel_counts = counts.reshape(len(channels), n_formats).sum(axis=1) if channels else counts
+    observed = [name for name, count in zip(channels, channel_counts) if count > 0]
+
+    return {
+        'channels': sorted(observed),
+        'channel_codes': {name: code for code, name in enumerate(channels)},
+        'format_codes': {name: code for code, name in enumerate(formats)},
+        'order': order,
+        'offsets': offsets,
+        'format_order': format_order,
+        'format_offsets': format_offsets
+    }
+
+def _channel_positions(channel_index, channel_name, formato=None):
+    # Posiciones (en el orden original del dataset) de las filas del canal
+    c = channel_index['channel_codes'].get(channel_name)
+    n_formats = max(len(channel_index['format_codes']), 1)
+    if c is None:
+        return np.empty(0, dtype=channel_index['order'].dtype)
+    if formato is None:
+        lo, hi = c * n_formats, (c + 1) * n_formats
+    else:
+        f = channel_index['format_codes'].get(formato)
+        if f is None:
+            return np.empty(0, dtype=channel_index['order'].dtype)
+        lo, hi = c * n_formats + f, c * n_formats + f + 1
+    offsets = channel_index['offsets']
+    return np.sort(channel_index['order'][offsets[lo]:offsets[hi]])
 
 def get_channel_metrics(df_channel):
-    # Aquí se calcularían métricas agregadas para un canal específico
-    total_videos = len(df_channel)
-    total_vistas = df_channel[\'vistas\'].sum()
-    avg_vph = df_channel[\'vph\'].mean()
-    avg_duration = df_channel[\'duracion_segundos\'].mean()
+    # Métricas agregadas para un canal específico
+    return metrics_from_totals(frame_totals(df_channel))
+
+# --- Motor de agregación por canal --- #
+# Columnas de las que se acumulan suma y número de valores no nulos
+AGGREGATE_COLUMNS = ['vistas', 'vph', 'duracion_segundos', 'likes', 'comentarios', 'indice_conexion']
+
+def build_channel_aggregates(df):
+    """
+    Calcula en una sola pasada las sumas y conteos de cada canal
+
+    Las métricas del cliente, de la competencia (total - cliente) y de todo el nicho
+    se obtienen después con aritmética sobre estas sumas, sin volver a recorrer los datos.
+    """
+    canal = df['nombre_canal'].astype('category')
+    n_channels = len(canal.cat.categories)
+    codes = canal.cat.codes.to_numpy()
+    # Las filas sin canal van a un grupo extra: cuentan en el total del nicho, no en ningún canal
+    codes = np.where(codes >= 0, codes, n_channels)
+
+    sums = {'videos': np.bincount(codes, minlength=n_channels + 1)}
+    for col in AGGREGATE_COLUMNS:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        sums[f'{col}_sum'] = np.bincount(codes[present], weights=values[present], minlength=n_channels + 1)
+        sums[f'{col}_count'] = np.bincount(codes[present], minlength=n_channels + 1)
+
+    table = pd.DataFrame(sums)
+    per_channel = table.iloc[:n_channels].set_axis(canal.cat.categories)
+    return {'per_channel': per_channel, 'total': table.sum()}
+
+def frame_totals(df):
+    """
+    Sumas y conteos de un DataFrame con el mismo formato que build_channel_aggregates
+    """
+    totals = {'videos': len(df)}
+    for col in AGGREGATE_COLUMNS:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        totals[f'{col}_sum'] = values[present].sum()
+        totals[f'{col}_count'] = present.sum()
+    return pd.Series(totals)
+
+def channel_totals(channel_aggregates, channel_name=None):
+    """
+    Sumas del canal y de su competencia a partir de los agregados precalculados
+
+    Sin canal (todo el nicho) el cliente y la competencia son el dataset completo.
+    """
+    total = channel_aggregates['total']
+    if channel_name is None:
+        return total, total
+    per_channel = channel_aggregates['per_channel']
+    if channel_name in per_channel.index:
+        client = per_channel.loc[channel_name]
+    else:
+        client = total * 0
+    return client, total - client
+
+def metrics_from_totals(totals):
+    """
+    Convierte sumas y conteos en el diccionario de métricas del canal
+    """
+    def mean(col):
+        count = totals[f'{col}_count']
+        return totals[f'{col}_sum'] / count if count > 0 else np.nan
+
     return {
-        \'total_videos\': total_videos,
-        \'total_vistas\': total_vistas,
-        \'avg_vph\': avg_vph,
-        \'avg_duration\': avg_duration
+        "total_videos": int(totals['videos']),
+        "total_vistas": int(round(totals['vistas_sum'])),
+        "avg_vph": mean('vph'),
+        "avg_duration": mean('duracion_segundos'),
+        "avg_likes": mean('likes'),
+        "avg_comments": mean('comentarios'),
+        "avg_connection_index": mean('indice_conexion')
     }
+
+# Registro de tiempos de todas las funciones públicas del módulo (ver instrumentation.py)
+instrument_module(globals())
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- Caché de figuras --- #
+# Figuras ya construidas (compartidas entre sesiones), desalojo LRU
+FIGURE_CACHE_SIZE = int(os.environ.get('DASHBOARD_FIGURE_CACHE_SIZE', 128))
+_figure_cache = OrderedDict()
+_figure_lock = threading.Lock()
+
+# --- Plantilla de disposición común a los gráficos del dashboard --- #
+DASHBOARD_TEMPLATE = 'dashboard'
+# Ajustes de disposición que comparten todos los gráficos (cada uno puede sobrescribirlos)
+DASHBOARD_LAYOUT = dict(
+    height=500,
+    hoverlabel=dict(namelength=-1),
+)
+
+def use_dashboard_template():
+    """
+    Registra la plantilla de plotly del dashboard y la deja como plantilla por defecto
+
+    Parte de la plantilla por defecto de plotly y añade DASHBOARD_LAYOUT. Se construye una
+    sola vez por proceso; como plantilla por defecto cada figura nueva la toma ya validada
+    (pasarla con template= la copiaría y validaría en cada figura).
+    """
+    import plotly.io as pio
+    if DASHBOARD_TEMPLATE not in pio.templates:
+        import plotly.graph_objects as go
+        template = go.layout.Template(pio.templates['plotly'])
+        template.layout.update(DASHBOARD_LAYOUT)
+        pio.templates[DASHBOARD_TEMPLATE] = template
+    pio.templates.default = DASHBOARD_TEMPLATE
+
+def _update_hash(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        h.update(repr((type(value).__name__, labels, [str(dtype) for dtype in np.atleast_1d(value.dtypes)])).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b'{')
+        for key in sorted(value, key=repr):
+            h.update(repr(key).encode('utf-8'))
+            _update_hash(h, value[key])
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            _update_hash(h, item)
+        h.update(b']')
+    else:
+        h.update(repr(value).encode('utf-8'))
+    h.update(b'|')
+
+def figure_cache_key(name, *inputs):
+    """
+    Hash del gráfico (name) y de sus datos de entrada (DataFrames, dicts, arrays, escalares)
+    """
+    h = hashlib.sha256(name.encode('utf-8'))
+    for value in inputs:
+        _update_hash(h, value)
+    return h.hexdigest()
+
+def cached_figure(name, build, *inputs, key=None):
+    """
+    Devuelve build(*inputs) reutilizando la figura si ya se generó con los mismos datos
+
+    La clave es el hash de inputs; con inputs muy grandes (p. ej. el dataset completo) se puede
+    pasar key con lo que los identifica (hash del archivo, canal...) para no recorrerlos.
+    build puede devolver una figura o una tupla de figuras. Se guarda el objeto Figure, sin
+    serializarlo: st.plotly_chart ya lo serializa (una vez) al dibujarlo. Las figuras
+    devueltas son compartidas, así que el llamador no debe modificarlas.
+    """
+    cache_key = figure_cache_key(name, *inputs) if key is None else figure_cache_key(name, key)
+    with _figure_lock:
+        result = _figure_cache.get(cache_key)
+        if result is not None:
+            _figure_cache.move_to_end(cache_key)
+            return result
+
+    result = build(*inputs)
+    with _figure_lock:
+        _figure_cache[cache_key] = result
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return result
+
+def clear_figure_cache():
+    """
+    Vacía la caché de figuras
+    """
+    with _figure_lock:
+        _figure_cache.clear()
@@ -0,0 +1,227 @@
+import functools
+import inspect
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- Registro de tiempos --- #
+# Cuánto tarda cada función, cuántas filas procesa y cuánto cambia la memoria del proceso.
+# Las funciones públicas de data_processing, analytics_functions y title_analysis se miden
+# con instrument_module(globals()) al final de cada módulo; las secciones de app.py con timed.
+# Con DASHBOARD_INSTRUMENTATION=0 los decoradores no miden nada (solo una comprobación por llamada)
+INSTRUMENTATION_ENABLED = os.environ.get('DASHBOARD_INSTRUMENTATION', '1') != '0'
+# Llamadas individuales que se conservan (las más recientes)
+INSTRUMENTATION_HISTORY = int(os.environ.get('DASHBOARD_INSTRUMENTATION_HISTORY', 2000))
+
+_stats = {}
+_calls = deque(maxlen=INSTRUMENTATION_HISTORY)
+_lock = threading.Lock()
+_sequence = 0
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+def _rss_bytes():
+    # Memoria residente actual del proceso (Linux); None si no se puede leer
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _count_rows(value):
+    # Filas de un DataFrame, Series o array; None para el resto
+    if hasattr(value, 'shape') and hasattr(value, '__len__'):
+        try:
+            return len(value)
+        except TypeError:
+            return None
+    return None
+
+def record(name, seconds, rows=None, memory_delta=None):
+    """
+    Registra una llamada a name (duración en segundos, filas procesadas, cambio de memoria en bytes)
+    """
+    global _sequence
+    with _lock:
+        _sequence += 1
+        stats = _stats.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'rows': 0, 'memory_delta_bytes': 0})
+        stats['calls'] += 1
+        stats['total_s'] += seconds
+        stats['max_s'] = max(stats['max_s'], seconds)
+        stats['last_s'] = seconds
+        stats['rows'] += rows or 0
+        stats['memory_delta_bytes'] += memory_delta or 0
+        _calls.append({
+            'seq': _sequence,
+            'name': name,
+            'seconds': seconds,
+            'rows': rows,
+            'memory_delta_bytes': memory_delta,
+            'thread': threading.get_ident(),
+            'time': time.time(),
+        })
+
+@contextmanager
+def timer(name, rows=None):
+    """
+    Context manager que registra el tiempo y el cambio de memoria del bloque
+    """
+    if not INSTRUMENTATION_ENABLED:
+        yield
+        return
+    rss = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        after = _rss_bytes()
+        record(name, seconds, rows, None if rss is None or after is None else after - rss)
+
+def timed(fn=None, *, name=None):
+    """
+    Decorador que registra cada llamada a la función
+
+    Las filas procesadas son las del primer argumento con forma (DataFrame, Series, array)
+    o, si no hay ninguno, las del resultado.
+    """
+    if fn is None:
+        return functools.partial(timed, name=name)
+    # streamlit run ejecuta app.py como __main__
+    label = name or f"{'app' if fn.__module__ == '__main__' else fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not INSTRUMENTATION_ENABLED:
+            return fn(*args, **kwargs)
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            record(label, time.perf_counter() - start)
+            raise
+        seconds = time.perf_counter() - start
+        after = _rss_bytes()
+        rows = next((n for n in map(_count_rows, args) if n is not None), None)
+        if rows is None:
+            rows = _count_rows(result)
+        record(label, seconds, rows, None if rss is None or after is None else after - rss)
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def instrument_module(namespace):
+    """
+    Aplica timed a todas las funciones públicas definidas en el módulo (sus globals())
+
+    Se llama al final del módulo, antes de que otros lo importen, para que también las
+    referencias importadas con 'from modulo import funcion' apunten a la versión medida.
+    """
+    module = namespace['__name__']
+    for attr, value in list(namespace.items()):
+        if (inspect.isfunction(value) and not attr.startswith('_') and value.__module__ == module
+                and not getattr(value, '__instrumented__', False)):
+            namespace[attr] = timed(value)
+
+def call_sequence():
+    """
+    Número de la última llamada registrada (para ver solo las llamadas posteriores)
+    """
+    with _lock:
+        return _sequence
+
+def recent_calls(since=0, thread=None):
+    """
+    Llamadas registradas después de since, opcionalmente solo las de un hilo
+    (en Streamlit, cada sesión ejecuta el script en su propio hilo)
+    """
+    with _lock:
+        return [dict(call) for call in _calls if call['seq'] > since and (thread is None or call['thread'] == thread)]
+
+def timing_summary():
+    """
+    Estadísticas acumuladas por función, de mayor a menor tiempo total
+    """
+    with _lock:
+        rows = [{'name': name, **stats, 'mean_s': stats['total_s'] / stats['calls']} for name, stats in _stats.items()]
+    return sorted(rows, key=lambda row: -row['total_s'])
+
+def reset_timings():
+    """
+    Borra las estadísticas y el historial de llamadas
+    """
+    with _lock:
+        _stats.clear()
+        _calls.clear()
+
+def export_json(since=0, thread=None):
+    """
+    Estadísticas y llamadas recientes como JSON
+    """
+    return json.dumps({
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'functions': timing_summary(),
+        'calls': recent_calls(since, thread),
+    }, indent=2)
+
+def export_prometheus(prefix='dashboard'):
+    """
+    Estadísticas acumuladas en el formato de texto de Prometheus
+    """
+    metrics = [
+        ('calls_total', 'counter', 'Llamadas por función', 'calls'),
+        ('seconds_total', 'counter', 'Tiempo total por función (segundos)', 'total_s'),
+        ('seconds_max', 'gauge', 'Llamada más lenta por función (segundos)', 'max_s'),
+        ('rows_total', 'counter', 'Filas procesadas por función', 'rows'),
+        ('memory_delta_bytes_total', 'counter', 'Cambio acumulado de memoria residente por función (bytes)', 'memory_delta_bytes'),
+    ]
+    summary = timing_summary()
+    out = io.StringIO()
+    for suffix, kind, help_text, key in metrics:
+        metric = f"{prefix}_function_{suffix}"
+        out.write(f"# HELP {metric} {help_text}\n# TYPE {metric} {kind}\n")
+        for row in summary:
+            label = row['name'].replace('\\', '\\\\').replace('"', '\\"')
+            out.write(f'{metric}{{function="{label}"}} {row[key]}\n')
+    return out.getvalue()
+
+def profile_call(fn, *args, engine='cprofile', **kwargs):
+    """
+    Ejecuta fn bajo un perfilador y devuelve (resultado, informe en texto)
+
+    engine='pyinstrument' usa pyinstrument si está instalado; si no, cProfile (ordenado
+    por tiempo acumulado).
+    """
+    if engine == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            engine = 'cprofile'
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                profiler.stop()
+            return result, profiler.output_text(unicode=True, color=False)
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).strip_dirs().sort_stats('cumulative').print_stats(40)
+    return result, report.getvalue()
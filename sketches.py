@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+
+# --- Sketches de cuantiles --- #
+# Histograma de cubos logarítmicos (como DDSketch): el cubo i cubre (gamma^(i-1), gamma^i],
+# así cualquier cuantil se estima con error relativo <= relative_accuracy en su valor.
+# Se construye y consulta con operaciones vectorizadas y dos sketches se combinan sumando
+# sus conteos, por lo que se puede construir por bloques y unir después.
+# Pensado para métricas no negativas (vistas, vph, índices): los valores <= 0 van a un
+# cubo aparte que queda por debajo de todos los demás.
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+def _gamma(relative_accuracy):
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+def quantile_sketch(values=(), relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    """
+    Sketch de cuantiles de values (los NaN se ignoran)
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    values = values[~np.isnan(values)]
+    positive = values[values > 0]
+    sketch = {
+        'relative_accuracy': relative_accuracy,
+        'count': len(values),
+        'zero': len(values) - len(positive),
+        'offset': 0,
+        'counts': np.zeros(0, dtype=np.int64),
+    }
+    if len(positive) > 0:
+        indices = np.ceil(np.log(positive) / np.log(_gamma(relative_accuracy))).astype(np.int64)
+        sketch['offset'] = int(indices.min())
+        sketch['counts'] = np.bincount(indices - sketch['offset'])
+    return sketch
+
+def merge_quantile_sketches(a, b):
+    """
+    Sketch de la unión de los datos de a y b (misma precisión)
+    """
+    if a['relative_accuracy'] != b['relative_accuracy']:
+        raise ValueError("Solo se pueden combinar sketches con la misma precisión")
+    if len(a['counts']) == 0 or len(b['counts']) == 0:
+        counts, offset = (a['counts'], a['offset']) if len(b['counts']) == 0 else (b['counts'], b['offset'])
+    else:
+        offset = min(a['offset'], b['offset'])
+        end = max(a['offset'] + len(a['counts']), b['offset'] + len(b['counts']))
+        counts = np.zeros(end - offset, dtype=np.int64)
+        counts[a['offset'] - offset:a['offset'] - offset + len(a['counts'])] += a['counts']
+        counts[b['offset'] - offset:b['offset'] - offset + len(b['counts'])] += b['counts']
+    return {
+        'relative_accuracy': a['relative_accuracy'],
+        'count': a['count'] + b['count'],
+        'zero': a['zero'] + b['zero'],
+        'offset': offset,
+        'counts': counts.copy(),
+    }
+
+def subtract_quantile_sketches(a, b):
+    """
+    Sketch de los datos de a sin los de b (b debe ser un subconjunto de los datos de a)
+
+    Sirve para quitar los valores antiguos de filas que se actualizan; como los conteos son
+    enteros, el resultado es el mismo que construir el sketch sin esas filas.
+    """
+    if a['relative_accuracy'] != b['relative_accuracy']:
+        raise ValueError("Solo se pueden restar sketches con la misma precisión")
+    counts = a['counts'].copy()
+    if len(b['counts']) > 0:
+        start = b['offset'] - a['offset']
+        if start < 0 or start + len(b['counts']) > len(counts):
+            raise ValueError("Los datos del sketch que se resta no están en el otro")
+        counts[start:start + len(b['counts'])] -= b['counts']
+        if np.any(counts < 0):
+            raise ValueError("Los datos del sketch que se resta no están en el otro")
+    # Sin cubos vacíos en los extremos, igual que quantile_sketch
+    nonzero = np.flatnonzero(counts)
+    offset = a['offset'] + (int(nonzero[0]) if len(nonzero) else 0)
+    counts = counts[nonzero[0]:nonzero[-1] + 1] if len(nonzero) else np.zeros(0, dtype=np.int64)
+    return {
+        'relative_accuracy': a['relative_accuracy'],
+        'count': a['count'] - b['count'],
+        'zero': a['zero'] - b['zero'],
+        'offset': offset if len(nonzero) else 0,
+        'counts': counts,
+    }
+
+def sketch_percentiles(sketch, values):
+    """
+    Percentil aproximado (0-100) de cada valor respecto a los datos del sketch
+
+    Es el porcentaje de datos por debajo del cubo del valor más la mitad de los de su
+    cubo: el error es como mucho la mitad de la masa de un cubo (ver sketch_rank_error).
+    NaN para valores NaN o si el sketch está vacío.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if sketch['count'] == 0:
+        return np.full(values.shape, np.nan)
+    counts = sketch['counts']
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indices = np.ceil(np.log(values) / np.log(_gamma(sketch['relative_accuracy'])))
+    # Cubo de cada valor positivo respecto a los del sketch (fuera de rango: antes o después de todos)
+    pos = np.clip(np.nan_to_num(indices, nan=0, posinf=0, neginf=0) - sketch['offset'], -1, len(counts)).astype(np.int64)
+    lower = np.where(pos < 0, 0, cumulative[np.clip(pos, 0, len(counts))])
+    upper = np.where(pos < 0, 0, cumulative[np.clip(pos + 1, 0, len(counts))])
+    # Los positivos quedan por encima del cubo de valores <= 0; estos, entre 0 y su cubo
+    positive = values > 0
+    lower = np.where(positive, sketch['zero'] + lower, 0)
+    upper = np.where(positive, sketch['zero'] + upper, sketch['zero'])
+    percentiles = (lower + upper) / 2 * 100 / sketch['count']
+    return np.where(np.isnan(values), np.nan, percentiles)
+
+def sketch_quantiles(sketch, quantiles):
+    """
+    Valores aproximados de los cuantiles (0-1) pedidos; error relativo <= relative_accuracy
+    """
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    if sketch['count'] == 0:
+        return np.full(quantiles.shape, np.nan)
+    # Posición (1..count) del cuantil y cubo que la contiene
+    rank = np.clip(np.ceil(quantiles * sketch['count']), 1, sketch['count'])
+    cumulative = sketch['zero'] + np.cumsum(sketch['counts'])
+    bucket = np.searchsorted(cumulative, rank, side='left')
+    gamma = _gamma(sketch['relative_accuracy'])
+    # Punto del cubo (gamma^(i-1), gamma^i] con el mismo error relativo hacia los dos extremos
+    estimate = 2 * gamma ** (bucket + sketch['offset']) / (gamma + 1)
+    return np.where(rank <= sketch['zero'], 0.0, estimate)
+
+def sketch_rank_error(sketch):
+    """
+    Error máximo (en puntos de percentil) de sketch_percentiles: la mitad del cubo más lleno
+    """
+    if sketch['count'] == 0:
+        return np.nan
+    largest = max(sketch['zero'], int(sketch['counts'].max()) if len(sketch['counts']) else 0)
+    return largest / 2 * 100 / sketch['count']
+
+# Hash de cadenas sobre los buffers Arrow, sin pasar por objetos Python: cada cadena se
+# rellena con ceros hasta un múltiplo de 8 bytes y sus palabras de 64 bits se encadenan con
+# la mezcla de splitmix64, junto con su longitud
+_HASH_SEED = 0x5EED5EED5EED5EED
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+def _splitmix64(x):
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _arrow_binary(values):
+    # Bytes UTF-8 de los valores de la Series como array Arrow binario (sin copiar las cadenas Arrow)
+    import pyarrow as pa
+    if isinstance(values.array, pd.arrays.ArrowStringArray):
+        array = values.array._pa_array.combine_chunks()
+    else:
+        array = pa.array(values.astype(str).to_numpy(dtype=object), type=pa.string())
+    return array.cast(pa.large_binary() if pa.types.is_large_string(array.type) else pa.binary())
+
+def _hash_arrow_binary(array):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    lengths = pc.binary_length(array).to_numpy(zero_copy_only=False).astype(np.int64)
+    words = (lengths + 7) // 8
+    hashes = np.empty(len(array), dtype=np.uint64)
+    # Un grupo por número de palabras (los ids suelen tener todos la misma longitud)
+    for n_words in np.unique(words):
+        rows = np.flatnonzero(words == n_words)
+        group = array if len(rows) == len(array) else array.take(pa.array(rows))
+        padding = pc.binary_repeat(pa.scalar(b'\0', type=array.type), pa.array(8 * n_words - lengths[rows]))
+        padded = pc.binary_join_element_wise(group, padding, pa.scalar(b'', type=array.type))
+        _, offsets, data = padded.buffers()
+        offset_type = np.int64 if pa.types.is_large_binary(padded.type) else np.int32
+        start = int(np.frombuffer(offsets, dtype=offset_type)[padded.offset])
+        block = (np.frombuffer(data, dtype=np.uint8)[start:start + 8 * n_words * len(rows)].view('<u8')
+                 .reshape(len(rows), n_words) if n_words > 0 else np.zeros((len(rows), 0), dtype=np.uint64))
+        h = lengths[rows].astype(np.uint64) * np.uint64(_HASH_MULTIPLIER) ^ np.uint64(_HASH_SEED)
+        for word in range(n_words):
+            h = _splitmix64(h ^ block[:, word])
+        hashes[rows] = _splitmix64(h)
+    return hashes
+
+def hash_values(values):
+    """
+    Hash de 64 bits de cada valor no nulo (texto, categorías o números)
+
+    Un mismo valor da el mismo hash en cualquier bloque, tenga el tipo que tenga la
+    columna (object, cadenas Arrow, categórica), así los sketches de bloques distintos
+    se pueden combinar. Las cadenas Arrow se hashean directamente sobre sus buffers (sin
+    convertirlas a objetos Python); de las categóricas solo se hashean las categorías.
+    """
+    values = pd.Series(values).dropna()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = hash_values(values.cat.categories.to_series(index=None))
+        return categories[values.cat.codes.to_numpy()]
+    return _hash_arrow_binary(_arrow_binary(values))
+
+# --- HyperLogLog (conteo aproximado de valores distintos) --- #
+# 2^precision registros de un byte; error relativo típico 1.04 / sqrt(2^precision)
+DEFAULT_HLL_PRECISION = 14
+
+def _leading_zeros(x):
+    # Ceros a la izquierda de cada uint64 (64 para el 0), por búsqueda binaria vectorizada
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty_top = x < np.uint64(1 << (64 - shift))
+        zeros += np.where(empty_top, shift, 0)
+        x = np.where(empty_top, x << np.uint64(shift), x)
+    return zeros + (x == 0)
+
+def hll_sketch(hashes=(), precision=DEFAULT_HLL_PRECISION):
+    """
+    HyperLogLog de los hashes de 64 bits dados (ver hash_values)
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    if len(hashes) > 0:
+        index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+        rest = hashes << np.uint64(precision)
+        rho = np.minimum(_leading_zeros(rest), 64 - precision) + 1
+        np.maximum.at(registers, index, rho.astype(np.uint8))
+    return {'precision': precision, 'registers': registers}
+
+def merge_hll(a, b):
+    """
+    HyperLogLog de la unión de a y b (misma precisión)
+    """
+    if a['precision'] != b['precision']:
+        raise ValueError("Solo se pueden combinar HyperLogLog con la misma precisión")
+    return {'precision': a['precision'], 'registers': np.maximum(a['registers'], b['registers'])}
+
+def hll_count(sketch):
+    """
+    Número estimado de valores distintos
+    """
+    registers = sketch['registers']
+    m = len(registers)
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    empty = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and empty > 0:
+        # Pocos valores: el conteo lineal de registros vacíos es más preciso
+        estimate = m * np.log(m / empty)
+    return float(estimate)
+
+def hll_relative_error(sketch):
+    """
+    Error relativo típico (una desviación estándar) de hll_count
+    """
+    return 1.04 / np.sqrt(len(sketch['registers']))
+
+# --- Count-min (frecuencias aproximadas) --- #
+# depth filas de width contadores: la frecuencia estimada nunca es menor que la real y la
+# supera en como mucho e/width * total con probabilidad 1 - e^-depth
+DEFAULT_COUNT_MIN_WIDTH = 1 << 14
+DEFAULT_COUNT_MIN_DEPTH = 4
+
+def _count_min_columns(hashes, width, depth):
+    # Columna de cada hash en cada fila: h1 + i * h2 (doble hashing de Kirsch-Mitzenmacher)
+    low = hashes & np.uint64(0xFFFFFFFF)
+    high = hashes >> np.uint64(32)
+    return [((low + np.uint64(row) * high) % np.uint64(width)).astype(np.int64) for row in range(depth)]
+
+def count_min_sketch(hashes=(), counts=None, width=DEFAULT_COUNT_MIN_WIDTH, depth=DEFAULT_COUNT_MIN_DEPTH):
+    """
+    Count-min de los elementos con esos hashes; counts son sus apariciones (1 por defecto)
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    counts = np.ones(len(hashes), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+    table = np.zeros((depth, width), dtype=np.int64)
+    for row, columns in enumerate(_count_min_columns(hashes, width, depth)):
+        table[row] = np.bincount(columns, weights=counts, minlength=width)
+    return {'table': table, 'total': int(counts.sum())}
+
+def merge_count_min(a, b):
+    """
+    Count-min de la unión de a y b (mismas dimensiones)
+    """
+    if a['table'].shape != b['table'].shape:
+        raise ValueError("Solo se pueden combinar sketches count-min con las mismas dimensiones")
+    return {'table': a['table'] + b['table'], 'total': a['total'] + b['total']}
+
+def count_min_query(sketch, hashes):
+    """
+    Frecuencia estimada de cada hash (cota superior de la real)
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    depth, width = sketch['table'].shape
+    return np.min([sketch['table'][row, columns] for row, columns in enumerate(_count_min_columns(hashes, width, depth))], axis=0)
+
+def count_min_error(sketch):
+    """
+    Cota del exceso de count_min_query (en apariciones) y probabilidad de que se cumpla
+    """
+    depth, width = sketch['table'].shape
+    return np.e / width * sketch['total'], 1 - np.exp(-depth)
@@ -0,0 +1,12 @@
+import os
+
+from batch_reports import write_report
+
+def test_channels_with_the_same_slug_get_different_files(tmp_path):
+    paths = [write_report({'canal': canal, 'generado': '2026-03-01'}, str(tmp_path), formats=('json',))[0]
+             for canal in ('Canal 1', 'Canal_1', 'canal 1', 'Canal 1')]
+    assert len(set(paths[:3])) == 3
+    # El mismo canal siempre va al mismo archivo
+    assert paths[3] == paths[0]
+    assert os.path.basename(paths[0]).startswith('Canal_1-')
+    assert len(os.listdir(tmp_path)) == 3
@@ -0,0 +1,23 @@
+import importlib
+
+import pytest
+
+import clara_scoring
+
+def test_invalid_normalization_in_environment_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv('DASHBOARD_CLARA_NORMALIZATION', 'percentil')
+    try:
+        with pytest.warns(UserWarning, match='DASHBOARD_CLARA_NORMALIZATION'):
+            module = importlib.reload(clara_scoring)
+        assert module.CLARA_NORMALIZATION == module.DEFAULT_CLARA_NORMALIZATION
+    finally:
+        monkeypatch.delenv('DASHBOARD_CLARA_NORMALIZATION')
+        importlib.reload(clara_scoring)
+
+def test_valid_normalization_in_environment_is_kept(monkeypatch):
+    monkeypatch.setenv('DASHBOARD_CLARA_NORMALIZATION', 'percentile')
+    try:
+        assert importlib.reload(clara_scoring).CLARA_NORMALIZATION == 'percentile'
+    finally:
+        monkeypatch.delenv('DASHBOARD_CLARA_NORMALIZATION')
+        importlib.reload(clara_scoring)
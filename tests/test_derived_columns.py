@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from analytics_functions import analyze_temporal_trends
+from data_processing import add_derived_columns, derived_column, month_periods
+
+def _videos():
+    fechas = pd.to_datetime(['1970-01-15 00:00', '2024-12-31 23:59', '2025-01-01 00:00', '2025-01-20 12:00', '2026-03-01 08:30'])
+    return pd.DataFrame({
+        'video_id': [f'v{i}' for i in range(len(fechas))],
+        'fecha_publicacion': fechas,
+        'vistas': [10, 20, 30, 40, 50],
+        'vph': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'duracion_segundos': [30, 300, 900, 60, 4000],
+    })
+
+def test_month_is_stored_as_int16_period_ordinal():
+    df = _videos()
+    mes = derived_column(df, 'mes')
+    assert mes.dtype == np.int16
+    expected = df['fecha_publicacion'].dt.to_period('M')
+    assert list(month_periods(mes)) == list(expected)
+
+def test_add_derived_columns_replaces_a_stored_period_month():
+    df = _videos()
+    df['mes'] = df['fecha_publicacion'].dt.to_period('M')
+    assert add_derived_columns(df)['mes'].dtype == np.int16
+
+def test_temporal_trends_are_indexed_by_month_period():
+    df = add_derived_columns(_videos())
+    monthly = analyze_temporal_trends(df)
+    assert isinstance(monthly.index, pd.PeriodIndex)
+    assert [str(mes) for mes in monthly.index] == ['1970-01', '2024-12', '2025-01', '2026-03']
+    assert monthly.loc[pd.Period('2025-01', 'M'), 'vistas'] == 70
+    assert monthly['videos_publicados'].sum() == len(df)
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import (
+    RANK_ALL,
+    build_rank_index,
+    get_leaderboard_page,
+    get_top_videos,
+    rank_values,
+    top_k_positions,
+)
+
+def _frame(n=2000, seed=7):
+    rng = np.random.default_rng(seed)
+    # Valores redondeados para que haya empates, y algunos NaN
+    vph = np.round(rng.lognormal(2, 1.5, n), 1)
+    vph[rng.choice(n, n // 20, replace=False)] = np.nan
+    return pd.DataFrame({
+        'video_id': [f'v{i}' for i in range(n)],
+        'formato': rng.choice(['Short', 'Largo'], n),
+        'vph': vph,
+        'indice_conexion': rng.integers(0, 50, n).astype(np.float64),
+    }, index=rng.permutation(n) + 10_000)
+
+def _stable_descending(values):
+    # Orden de referencia: mayor a menor, empates por posición, NaN al final
+    return pd.Series(values).sort_values(ascending=False, kind='stable', na_position='last').index.to_numpy()
+
+@pytest.mark.parametrize('k', [0, 1, 10, 99, 100, 1999, 2000, 5000])
+def test_top_k_positions_matches_stable_sort(k):
+    values = _frame()['vph'].to_numpy()
+    np.testing.assert_array_equal(top_k_positions(values, k), _stable_descending(values)[:k])
+
+def test_top_k_positions_ascending():
+    values = _frame()['indice_conexion'].to_numpy()
+    expected = pd.Series(values).sort_values(kind='stable').index.to_numpy()[:50]
+    np.testing.assert_array_equal(top_k_positions(values, 50, ascending=True), expected)
+
+@pytest.mark.parametrize('formato', [None, 'Short', 'Largo'])
+def test_rank_values_matches_min_rank(formato):
+    df = _frame()
+    rank_index = build_rank_index(df, ['vph', 'indice_conexion'])
+    subset = df if formato is None else df[df['formato'] == formato]
+    for col in ('vph', 'indice_conexion'):
+        ranks, percentiles, total = rank_values(rank_index, col, subset[col].to_numpy(), formato)
+        expected = subset[col].rank(method='min', ascending=False)
+        np.testing.assert_array_equal(ranks, expected.to_numpy())
+        assert total == subset[col].notna().sum()
+        lower = subset[col].rank(method='min').to_numpy() - 1
+        np.testing.assert_allclose(percentiles, lower * 100 / total)
+
+def test_rank_values_out_of_range_and_nan():
+    rank_index = build_rank_index(_frame(), ['vph'])
+    ranks, percentiles, total = rank_values(rank_index, 'vph', [1e12, -1.0, np.nan])
+    assert ranks[0] == 1 and percentiles[0] == 100
+    assert ranks[1] == total + 1 and percentiles[1] == 0
+    assert np.isnan(ranks[2]) and np.isnan(percentiles[2])
+
+@pytest.mark.parametrize('formato', [None, 'Short'])
+def test_leaderboard_pages_follow_stable_sort_without_nan(formato):
+    df = _frame()
+    rank_index = build_rank_index(df, ['vph'])
+    subset = df if formato is None else df[df['formato'] == formato]
+    expected = subset.iloc[_stable_descending(subset['vph'].to_numpy())]
+    expected = expected[expected['vph'].notna()]
+
+    pages = get_leaderboard_page(df, rank_index, 'vph', 1, 100, formato)[1]
+    assert pages == -(-len(expected) // 100)
+    leaderboard = pd.concat([get_leaderboard_page(df, rank_index, 'vph', page, 100, formato)[0]
+                             for page in range(1, pages + 1)])
+    pd.testing.assert_index_equal(leaderboard.index, expected.index)
+    # Mismos puestos que rank_values (empates con el mejor puesto)
+    ranks = rank_values(rank_index, 'vph', leaderboard['vph'].to_numpy(), formato)[0]
+    np.testing.assert_array_equal(leaderboard['puesto'].to_numpy(), ranks)
+    assert leaderboard['puesto'].iloc[0] == 1
+
+def test_leaderboard_limit_and_columns():
+    df = _frame()
+    rank_index = build_rank_index(df, ['vph'])
+    videos, pages = get_leaderboard_page(df, rank_index, 'vph', 3, 40, limit=100, columns=['video_id', 'vph'])
+    assert pages == 3
+    assert list(videos.columns) == ['puesto', 'video_id', 'vph']
+    expected = rank_index['vph'][RANK_ALL]['positions'][80:100]
+    np.testing.assert_array_equal(videos['video_id'].to_numpy(), df['video_id'].to_numpy()[expected])
+
+def test_leaderboard_unknown_format_is_empty():
+    df = _frame()
+    videos, pages = get_leaderboard_page(df, build_rank_index(df, ['vph']), 'vph', formato='Vertical')
+    assert len(videos) == 0 and pages == 1
+
+@pytest.mark.parametrize('formato', [None, 'Short'])
+@pytest.mark.parametrize('num_videos', [10, 1_000, 5_000])
+def test_get_top_videos_leaves_out_nan_and_matches_leaderboard(formato, num_videos):
+    df = _frame()
+    rank_index = build_rank_index(df, ['vph'])
+    subset = df if formato is None else df[df['formato'] == formato]
+    expected = subset['vph'].dropna().sort_values(ascending=False, kind='stable').index[:num_videos]
+    indexed = get_top_videos(df, num_videos, 'vph', rank_index=rank_index, formato=formato)
+    plain = get_top_videos(df, num_videos, 'vph', formato=formato)
+    for top in (indexed, plain):
+        assert top['vph'].notna().all()
+        assert top.index.equals(expected)
+
+    # Las páginas del leaderboard con el mismo límite cubren exactamente el top
+    page_size = 100
+    _, pages = get_leaderboard_page(df, rank_index, 'vph', 1, page_size, formato, limit=num_videos)
+    assert pages == max(1, -(-len(indexed) // page_size))
+    shown = pd.concat([get_leaderboard_page(df, rank_index, 'vph', page, page_size, formato, limit=num_videos)[0]
+                       for page in range(1, pages + 1)])
+    assert shown.index.equals(indexed.index)
@@ -0,0 +1,179 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from approximate import (
+    build_chunk_sketches,
+    merge_chunk_sketches,
+    approximate_keyword_frequencies,
+    approximate_niche_summary,
+)
+from data_processing import (
+    dataset_cache_path,
+    frame_totals,
+    load_dataset_cached,
+    load_dataset_sketches,
+)
+from sketches import (
+    quantile_sketch,
+    merge_quantile_sketches,
+    subtract_quantile_sketches,
+    sketch_percentiles,
+    sketch_quantiles,
+    sketch_rank_error,
+    hash_values,
+    hll_sketch,
+    merge_hll,
+    hll_count,
+    hll_relative_error,
+    count_min_sketch,
+    merge_count_min,
+    count_min_query,
+    count_min_error,
+)
+
+def _assert_same_quantile_sketch(a, b):
+    for key in ('relative_accuracy', 'count', 'zero', 'offset'):
+        assert a[key] == b[key]
+    np.testing.assert_array_equal(a['counts'], b['counts'])
+
+def _parts(values, n_parts=3):
+    return np.array_split(values, n_parts)
+
+def test_quantile_sketch_merge_is_associative_and_matches_whole():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(2, 1.5, 30_000), np.zeros(500), [np.nan] * 10])
+    a, b, c = (quantile_sketch(part) for part in _parts(values))
+    left = merge_quantile_sketches(merge_quantile_sketches(a, b), c)
+    right = merge_quantile_sketches(a, merge_quantile_sketches(b, c))
+    _assert_same_quantile_sketch(left, right)
+    _assert_same_quantile_sketch(left, quantile_sketch(values))
+
+def test_subtract_quantile_sketches_undoes_merge():
+    rng = np.random.default_rng(1)
+    kept, removed = rng.lognormal(1, 2, 5_000), rng.lognormal(3, 0.5, 800)
+    merged = merge_quantile_sketches(quantile_sketch(kept), quantile_sketch(removed))
+    _assert_same_quantile_sketch(subtract_quantile_sketches(merged, quantile_sketch(removed)), quantile_sketch(kept))
+    with pytest.raises(ValueError):
+        subtract_quantile_sketches(quantile_sketch(kept[:10]), quantile_sketch(removed))
+
+def test_quantile_sketch_errors_stay_within_bounds():
+    rng = np.random.default_rng(2)
+    values = np.concatenate([rng.lognormal(0, 2, 50_000), np.zeros(2_000)])
+    sketch = merge_quantile_sketches(*(quantile_sketch(part) for part in _parts(values, 2)))
+
+    # Cuantiles: error relativo <= relative_accuracy respecto al estadístico de orden
+    quantiles = np.array([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+    ordered = np.sort(values)
+    exact = ordered[np.ceil(quantiles * len(values)).astype(np.int64) - 1]
+    estimates = sketch_quantiles(sketch, quantiles)
+    positive = exact > 0
+    assert np.all(np.abs(estimates[positive] - exact[positive]) <= sketch['relative_accuracy'] * exact[positive] + 1e-12)
+    assert np.all(estimates[~positive] == 0)
+
+    # Percentiles: error <= sketch_rank_error puntos respecto al rango medio exacto
+    probes = rng.choice(values, 500)
+    below = np.searchsorted(ordered, probes, side='left')
+    below_or_equal = np.searchsorted(ordered, probes, side='right')
+    exact_percentiles = (below + below_or_equal) / 2 * 100 / len(values)
+    assert np.all(np.abs(sketch_percentiles(sketch, probes) - exact_percentiles) <= sketch_rank_error(sketch) + 1e-9)
+
+def test_hash_values_is_the_same_for_every_string_dtype():
+    words = pd.Series(['canal', 'Canal', '', 'ñandú', 'x' * 8, 'x' * 9, 'finanzas personales 2025', None] * 50)
+    expected = hash_values(words.astype(object))
+    assert len(expected) == words.notna().sum()
+    for dtype in ('string[pyarrow]', 'category'):
+        np.testing.assert_array_equal(hash_values(words.astype(dtype)), expected)
+    # El mismo valor en otro bloque (un corte de la columna) tiene el mismo hash
+    np.testing.assert_array_equal(hash_values(words.astype('string[pyarrow]').iloc[7:10]), hash_values(words.iloc[7:10]))
+    # Valores distintos, hashes distintos (también con el mismo número de palabras de 8 bytes)
+    distinct = pd.Series(['x' * 8, 'x' * 9, 'x' * 7 + 'y', 'y' * 8, '', 'a', 'a\x00'])
+    assert len(np.unique(hash_values(distinct))) == len(distinct)
+
+def test_hll_merge_is_associative_and_within_error():
+    ids = pd.Series([f'video-{i}' for i in range(120_000)], dtype='string[pyarrow]')
+    # Bloques solapados: cada id aparece en uno o dos de ellos
+    a, b, c = (hll_sketch(hash_values(ids.iloc[start:start + 50_000])) for start in (0, 35_000, 70_000))
+    left = merge_hll(merge_hll(a, b), c)
+    right = merge_hll(a, merge_hll(b, c))
+    np.testing.assert_array_equal(left['registers'], right['registers'])
+    np.testing.assert_array_equal(left['registers'], hll_sketch(hash_values(ids))['registers'])
+    # 3 desviaciones estándar
+    assert abs(hll_count(left) - len(ids)) / len(ids) <= 3 * hll_relative_error(left)
+
+def test_count_min_merge_is_associative_and_within_error():
+    rng = np.random.default_rng(3)
+    words = pd.Series([f'palabra{i}' for i in rng.zipf(1.3, 40_000) % 5_000])
+    a, b, c = (count_min_sketch(hash_values(words.iloc[rows])) for rows in _parts(np.arange(len(words))))
+    left = merge_count_min(merge_count_min(a, b), c)
+    right = merge_count_min(a, merge_count_min(b, c))
+    np.testing.assert_array_equal(left['table'], right['table'])
+    assert left['total'] == right['total'] == len(words)
+
+    frequencies = words.value_counts()
+    estimates = count_min_query(left, hash_values(pd.Series(frequencies.index)))
+    error, _ = count_min_error(left)
+    assert np.all(estimates >= frequencies.to_numpy())
+    assert np.all(estimates - frequencies.to_numpy() <= error)
+
+DAY0 = datetime(2026, 3, 1, 12, 0)
+
+def _csv(tmp_path, n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({
+        'video_id': [f'v{i}' for i in range(n)],
+        'titulo': [f'tutorial finanzas {i % 40}' if i % 3 else f'negocios rapido {i % 25}' for i in range(n)],
+        'nombre_canal': [f'Canal {i % 11}' for i in range(n)],
+        'fecha_publicacion': [(DAY0 - timedelta(days=int(d))).strftime('%Y-%m-%d %H:%M:%S')
+                              for d in rng.integers(1, 400, n)],
+        'vistas': rng.integers(0, 100_000, n),
+        'likes': rng.integers(0, 5_000, n),
+        'comentarios': rng.integers(0, 500, n),
+        'duracion_segundos': rng.integers(10, 3_000, n),
+        'url_miniatura': [f'https://i.ytimg.com/vi/v{i}/hqdefault.jpg' for i in range(n)],
+    })
+    path = tmp_path / 'videos.csv'
+    raw.to_csv(path, index=False)
+    return path.read_bytes()
+
+def test_chunk_sketches_merge_in_any_grouping(tmp_path):
+    df = load_dataset_cached(_csv(tmp_path), content_hash='h', cache_dir=str(tmp_path / 'cache'))
+    chunks = build_chunk_sketches(df, chunk_rows=700)
+    assert len(chunks) == 5
+    whole = merge_chunk_sketches(chunks)
+    regrouped = merge_chunk_sketches([merge_chunk_sketches(chunks[:2]), merge_chunk_sketches(chunks[2:])])
+    assert whole['rows'] == regrouped['rows'] == len(df)
+    np.testing.assert_array_equal(whole['videos']['registers'], regrouped['videos']['registers'])
+    np.testing.assert_array_equal(whole['keywords']['table'], regrouped['keywords']['table'])
+    _assert_same_quantile_sketch(whole['vph'], regrouped['vph'])
+    _assert_same_quantile_sketch(whole['vph'], quantile_sketch(df['vph'].to_numpy(dtype=np.float64)))
+    # Las sumas del nicho son exactas
+    pd.testing.assert_series_equal(whole['totals'], frame_totals(df), check_dtype=False)
+    # Solo se combinan las partes pedidas
+    assert set(merge_chunk_sketches(chunks, ('keywords',))) == {'keywords'}
+
+    summary = approximate_niche_summary(chunks)
+    assert abs(summary['videos'] - len(df)) / len(df) <= 3 * summary['distinct_error']
+    frequencies = approximate_keyword_frequencies(chunks, ['tutorial', 'negocios'])
+    # Nunca por debajo de las apariciones reales
+    assert np.all(frequencies['frecuencia'].to_numpy() >= [2_000, 1_000])
+
+def test_sketches_built_while_loading_are_stored_with_the_dataset(tmp_path):
+    file_bytes = _csv(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    df = load_dataset_cached(file_bytes, content_hash='h', cache_dir=cache_dir, chunksize=1_000, sketches=True)
+    stored = load_dataset_sketches(df, 'h', cache_dir=cache_dir)
+    # Un sketch por bloque leído del CSV, no reconstruidos a partir del DataFrame
+    assert [chunk['rows'] for chunk in stored] == [1_000, 1_000, 1_000]
+    _assert_same_quantile_sketch(merge_chunk_sketches(stored, ('vph',))['vph'],
+                                 quantile_sketch(df['vph'].to_numpy(dtype=np.float64)))
+
+    # Si el dataset en caché cambia, los sketches guardados ya no valen y se reconstruyen
+    path = dataset_cache_path('h', cache_dir)
+    os.utime(path, (os.path.getatime(path), os.path.getmtime(path) + 10))
+    rebuilt = load_dataset_sketches(df, 'h', cache_dir=cache_dir, chunk_rows=1_500)
+    assert [chunk['rows'] for chunk in rebuilt] == [1_500, 1_500]
+    assert [chunk['rows'] for chunk in load_dataset_sketches(df, 'h', cache_dir=cache_dir)] == [1_500, 1_500]
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clara_scoring import CLARA_COMPONENTS, build_clara_state, clara_scores
+from data_processing import (
+    _snapshot_clara_state_path,
+    ingest_snapshot,
+    load_snapshot_deltas,
+    load_snapshot_store,
+    load_snapshot_times,
+)
+from time_series import add_velocity_columns, build_snapshot_history
+
+DAY0 = datetime(2026, 3, 1, 12, 0)
+
+def _snapshot(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'video_id': [f'v{i}' for i in range(n)],
+        'titulo': [f'tutorial finanzas {i}' if i % 3 else f'negocios rapido {i}' for i in range(n)],
+        'nombre_canal': [f'Canal {i % 7}' for i in range(n)],
+        'fecha_publicacion': [(DAY0 - timedelta(days=int(d))).strftime('%Y-%m-%d %H:%M:%S')
+                              for d in rng.integers(1, 400, n)],
+        'vistas': rng.integers(0, 100_000, n),
+        'likes': rng.integers(0, 5_000, n),
+        'comentarios': rng.integers(0, 500, n),
+        'duracion_segundos': rng.integers(10, 3_000, n),
+        'url_miniatura': [f'https://i.ytimg.com/vi/v{i}/hqdefault.jpg' for i in range(n)],
+    })
+
+def _ingest(tmp_path, raw, day):
+    path = tmp_path / f'snapshot_{day}.csv'
+    raw.to_csv(path, index=False)
+    return ingest_snapshot(str(path), store_dir=str(tmp_path / 'store'), snapshot_time=DAY0 + timedelta(days=day))
+
+def _assert_state_matches(state, df):
+    expected = build_clara_state(df)
+    assert state['rows'] == expected['rows'] == len(df)
+    for col in CLARA_COMPONENTS:
+        for key in ('count', 'zero', 'offset'):
+            assert state[col]['sketch'][key] == expected[col]['sketch'][key]
+        np.testing.assert_array_equal(state[col]['sketch']['counts'], expected[col]['sketch']['counts'])
+        # Mínimo y máximo se conservan como cotas
+        assert state[col]['min'] <= expected[col]['min'] and state[col]['max'] >= expected[col]['max']
+
+def test_first_snapshot_marks_every_video_as_new(tmp_path):
+    raw = _snapshot()
+    df, deltas = _ingest(tmp_path, raw, 0)
+    assert len(df) == len(raw) and (deltas['estado'] == 'nuevo').all()
+    np.testing.assert_array_equal(deltas['delta_vistas'], raw['vistas'])
+    pd.testing.assert_frame_equal(load_snapshot_store(str(tmp_path / 'store')), df, check_dtype=False)
+
+def test_upsert_only_reprocesses_changed_rows(tmp_path):
+    raw = _snapshot()
+    first, _ = _ingest(tmp_path, raw, 0)
+
+    changed = raw.copy()
+    changed.loc[:49, 'vistas'] += 1_000
+    changed = changed.drop(index=range(290, 300))
+    extra = _snapshot(5, seed=1).assign(video_id=[f'nuevo{i}' for i in range(5)])
+    df, deltas = _ingest(tmp_path, pd.concat([changed, extra], ignore_index=True), 1)
+
+    # Los videos que faltan en el CSV se conservan; los nuevos van al final
+    assert len(df) == 305
+    assert df['video_id'].iloc[-5:].tolist() == extra['video_id'].tolist()
+    assert deltas.set_index('video_id')['estado'].value_counts().to_dict() == {'actualizado': 50, 'nuevo': 5}
+    assert (deltas.loc[deltas['estado'] == 'actualizado', 'delta_vistas'] == 1_000).all()
+    # Las filas sin cambios conservan horas_desde_pub y vph de su snapshot
+    unchanged = slice(50, 300)
+    np.testing.assert_array_equal(df['vph'].iloc[unchanged], first['vph'].iloc[unchanged])
+    np.testing.assert_array_equal(df['horas_desde_pub'].iloc[unchanged], first['horas_desde_pub'].iloc[unchanged])
+    assert (df['horas_desde_pub'].iloc[:50] > first['horas_desde_pub'].iloc[:50] + 23).all()
+    assert len(load_snapshot_deltas(str(tmp_path / 'store'))) == 300 + 55
+
+def test_stored_clara_state_is_updated_with_the_delta(tmp_path):
+    raw = _snapshot()
+    _ingest(tmp_path, raw, 0)
+    for day in (1, 2):
+        raw = raw.copy()
+        raw.loc[raw.index % (day + 2) == 0, 'vistas'] *= 2
+        df, _ = _ingest(tmp_path, raw, day)
+        state = pd.read_pickle(_snapshot_clara_state_path(str(tmp_path / 'store')))['clara_state']
+        _assert_state_matches(state, df)
+        score, _ = clara_scores(df, state)
+        np.testing.assert_allclose(df['clara_index'], np.asarray(score, dtype=np.float32))
+
+def test_missing_or_stale_state_is_rebuilt(tmp_path):
+    raw = _snapshot()
+    _ingest(tmp_path, raw, 0)
+    state_path = _snapshot_clara_state_path(str(tmp_path / 'store'))
+    pd.to_pickle({'current_mtime': 0.0, 'clara_state': None}, state_path)
+    raw.loc[:9, 'vistas'] += 5
+    df, _ = _ingest(tmp_path, raw, 1)
+    _assert_state_matches(pd.read_pickle(state_path)['clara_state'], df)
+
+def test_identical_snapshot_has_no_deltas(tmp_path):
+    raw = _snapshot()
+    first, _ = _ingest(tmp_path, raw, 0)
+    df, deltas = _ingest(tmp_path, raw, 1)
+    assert len(deltas) == 0
+    pd.testing.assert_frame_equal(df, first)
+
+def test_velocity_of_video_flat_across_snapshots_then_jumping(tmp_path):
+    # Un video sin cambios no tiene fila en los deltas de esos snapshots: su valor se arrastra
+    # y el salto del último día no se reparte entre los días sin cambios
+    raw = _snapshot(20)
+    raw.loc[0, 'vistas'] = 100
+    for day in range(6):
+        _ingest(tmp_path, raw, day)
+    raw = raw.copy()
+    raw.loc[0, 'vistas'] = 200
+    df, deltas = _ingest(tmp_path, raw, 6)
+    assert deltas['video_id'].tolist() == ['v0']
+
+    store_dir = str(tmp_path / 'store')
+    assert len(load_snapshot_times(store_dir)) == 7
+    history = build_snapshot_history(load_snapshot_deltas(store_dir), load_snapshot_times(store_dir))
+    df = add_velocity_columns(df, history, at=DAY0 + timedelta(days=6))
+    assert df['vistas_24h'].iloc[0] == 100
+    assert df['vph_24h'].iloc[0] == pytest.approx(100 / 24)
+    # Sin observación hace 7 días (el primer snapshot es de hace 6) no hay base
+    assert np.isnan(df['vistas_7d'].iloc[0])
+    assert (df['vistas_24h'].iloc[1:] == 0).all()
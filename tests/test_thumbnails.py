@@ -0,0 +1,47 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+from thumbnails import _cache_files, _index_path, cached_thumbnail_path, evict_thumbnails, fetch_thumbnails
+
+def _image(color):
+    out = io.BytesIO()
+    Image.new('RGB', (640, 360), color).save(out, format='PNG')
+    return out.getvalue()
+
+def _age(path, seconds_ago):
+    when = time.time() - seconds_ago
+    os.utime(path, (when, when))
+
+def test_eviction_removes_index_entries_with_their_image(tmp_path):
+    images = {f'https://img/{i}.jpg': _image((i * 20, 10, 10)) for i in range(5)}
+    images['https://img/copia.jpg'] = images['https://img/0.jpg']
+    paths = fetch_thumbnails(list(images), fetcher=images.__getitem__, cache_dir=tmp_path, max_bytes=10 ** 9)
+    for i in range(5):
+        _age(paths[f'https://img/{i}.jpg'], 1000 - i)
+    for url in images:
+        _age(_index_path(tmp_path, url, 320, 'JPEG'), 2000)
+
+    total = sum(size for _, size, _ in _cache_files(tmp_path))
+    # La imagen más antigua y las dos URLs que apuntan a ella
+    assert evict_thumbnails(tmp_path, total - 1) == 3
+    assert cached_thumbnail_path('https://img/0.jpg', tmp_path) is None
+    assert cached_thumbnail_path('https://img/copia.jpg', tmp_path) is None
+    assert not os.path.exists(_index_path(tmp_path, 'https://img/copia.jpg', 320, 'JPEG'))
+    assert all(cached_thumbnail_path(f'https://img/{i}.jpg', tmp_path) for i in range(1, 5))
+
+def test_failure_markers_count_and_expire(tmp_path):
+    def fetch(url):
+        raise OSError(url)
+    assert fetch_thumbnails(['https://img/rota.jpg', 'https://img/otra.jpg'], fetcher=fetch, cache_dir=tmp_path) == {
+        'https://img/rota.jpg': None, 'https://img/otra.jpg': None}
+    marker = _index_path(tmp_path, 'https://img/rota.jpg', 320, 'JPEG')
+    _age(marker, 7 * 3600)
+
+    # La marca caducada se borra aunque la caché quepa; la reciente solo si no cabe
+    assert evict_thumbnails(tmp_path, 10 ** 9, retry_hours=6) == 1
+    assert not os.path.exists(marker)
+    assert evict_thumbnails(tmp_path, 0, retry_hours=6) == 1
+    assert _cache_files(tmp_path) == []
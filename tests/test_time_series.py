@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_series import build_snapshot_history, values_at, windowed_velocity, add_velocity_columns
+
+T0 = pd.Timestamp('2026-01-01 00:00:00')
+
+def _history(observations):
+    records = pd.DataFrame(observations, columns=['video_id', 'snapshot_ts', 'vistas'])
+    records['likes'] = 0
+    records['comentarios'] = 0
+    return build_snapshot_history(records)
+
+def test_values_at_uses_last_observation_before_instant():
+    history = _history([
+        ('a', T0, 100),
+        ('a', T0 + pd.Timedelta(hours=24), 200),
+        ('b', T0 + pd.Timedelta(hours=24), 50),
+    ])
+    np.testing.assert_array_equal(values_at(history, T0 + pd.Timedelta(hours=12)), [100, np.nan])
+    np.testing.assert_array_equal(values_at(history, T0 + pd.Timedelta(hours=30)), [200, 50])
+
+def test_windowed_velocity_with_jittered_snapshots():
+    # El snapshot "de ayer" llegó 5 minutos tarde: la base de la ventana de 24h es anterior
+    # a su inicio y no debe contar las vistas de las 24h previas
+    history = _history([
+        ('a', T0, 0),
+        ('a', T0 + pd.Timedelta(hours=24, minutes=5), 1000),
+        ('a', T0 + pd.Timedelta(hours=48), 1500),
+    ])
+    gained = windowed_velocity(history, 24)
+    at_start = 1000 * 24 / (24 + 5 / 60)
+    assert gained[0] == pytest.approx(1500 - at_start)
+    assert gained[0] == pytest.approx(500, rel=0.01)
+
+def test_windowed_velocity_regular_snapshots_is_exact():
+    history = _history([
+        ('a', T0, 100),
+        ('a', T0 + pd.Timedelta(hours=24), 400),
+        ('a', T0 + pd.Timedelta(hours=48), 1000),
+    ])
+    assert windowed_velocity(history, 24)[0] == pytest.approx(600)
+    assert windowed_velocity(history, 48)[0] == pytest.approx(900)
+
+def test_windowed_velocity_ignores_observations_after_reference_instant():
+    history = _history([
+        ('a', T0, 0),
+        ('a', T0 + pd.Timedelta(hours=30), 3000),
+        ('a', T0 + pd.Timedelta(hours=48), 4800),
+    ])
+    # Con at = T0 + 24h no hay observación entre el inicio de la ventana y at
+    assert windowed_velocity(history, 12, at=T0 + pd.Timedelta(hours=24))[0] == pytest.approx(0)
+
+def test_windowed_velocity_new_and_unknown_videos():
+    history = _history([
+        ('viejo', T0 + pd.Timedelta(hours=48), 900),
+        ('nuevo', T0 + pd.Timedelta(hours=48), 300),
+    ])
+    published = pd.to_datetime([T0 - pd.Timedelta(days=10), T0 + pd.Timedelta(hours=40)])
+    order = history['video_ids'].get_indexer(['viejo', 'nuevo'])
+    aligned = np.empty(2, dtype='datetime64[ns]')
+    aligned[order] = published.to_numpy()
+    gained = windowed_velocity(history, 24, published=aligned)
+    assert np.isnan(gained[order[0]])
+    assert gained[order[1]] == pytest.approx(300)
+
+def test_add_velocity_columns_on_irregular_times():
+    history = _history([
+        ('a', T0, 0),
+        ('a', T0 + pd.Timedelta(hours=23, minutes=50), 2000),
+        ('a', T0 + pd.Timedelta(hours=47, minutes=55), 3000),
+        ('b', T0 + pd.Timedelta(hours=1), 10),
+        ('b', T0 + pd.Timedelta(hours=47, minutes=55), 10),
+    ])
+    df = pd.DataFrame({
+        'video_id': ['b', 'a', 'desconocido'],
+        'fecha_publicacion': pd.to_datetime([T0 - pd.Timedelta(days=3)] * 3),
+    })
+    df = add_velocity_columns(df, history, windows={'24h': 24})
+    at = T0 + pd.Timedelta(hours=47, minutes=55)
+    start_hours = (at - pd.Timedelta(hours=24) - T0) / pd.Timedelta(hours=1)
+    expected = 3000 - (2000 + 1000 * (start_hours - (23 + 50 / 60)) / 24.0833333)
+    assert df['vistas_24h'].iloc[1] == pytest.approx(expected, rel=1e-3)
+    assert df['vph_24h'].iloc[1] == pytest.approx(expected / 24, rel=1e-3)
+    assert df['vistas_24h'].iloc[0] == 0
+    assert np.isnan(df['vph_24h'].iloc[2])
@@ -0,0 +1,247 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# --- Caché de miniaturas en disco --- #
+# Directorio de la caché (compartido entre sesiones y reinicios de la app)
+THUMBNAIL_CACHE_DIR = os.environ.get('DASHBOARD_THUMBNAIL_CACHE_DIR', os.path.join('.cache', 'thumbnails'))
+# Tamaño máximo de la caché; al superarlo se borran las miniaturas usadas hace más tiempo
+THUMBNAIL_CACHE_MAX_MB = float(os.environ.get('DASHBOARD_THUMBNAIL_CACHE_MAX_MB', 200))
+# Descargas simultáneas como máximo
+THUMBNAIL_WORKERS = int(os.environ.get('DASHBOARD_THUMBNAIL_WORKERS', 8))
+THUMBNAIL_TIMEOUT_SECONDS = float(os.environ.get('DASHBOARD_THUMBNAIL_TIMEOUT', 10))
+# Si se define, las miniaturas se leen de este directorio en lugar de descargarse
+THUMBNAIL_SOURCE_DIR = os.environ.get('DASHBOARD_THUMBNAIL_SOURCE_DIR')
+# Ancho al que se reducen las miniaturas (la galería las muestra a 200 px como mucho)
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+# Las URLs que fallaron no se reintentan hasta pasado este tiempo
+THUMBNAIL_RETRY_HOURS = float(os.environ.get('DASHBOARD_THUMBNAIL_RETRY_HOURS', 6))
+# Contenido del índice para una URL que no se pudo descargar
+_FAILED = 'failed'
+
+def http_fetcher(timeout=THUMBNAIL_TIMEOUT_SECONDS):
+    """
+    Devuelve un fetcher que descarga la URL por HTTP(S)
+    """
+    def fetch(url):
+        request = urllib.request.Request(url, headers={'User-Agent': 'youtube-analytics-dashboard'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read()
+    return fetch
+
+def directory_fetcher(root):
+    """
+    Devuelve un fetcher que lee las imágenes de un directorio local
+
+    La ruta de la URL se resuelve dentro de root (https://i.ytimg.com/vi/ID/hqdefault.jpg
+    -> root/vi/ID/hqdefault.jpg); sirve para trabajar sin conexión.
+    """
+    root = os.path.abspath(root)
+    def fetch(url):
+        path = os.path.abspath(os.path.join(root, urllib.parse.urlparse(url).path.lstrip('/')))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Ruta fuera del directorio de miniaturas: {url}")
+        with open(path, 'rb') as f:
+            return f.read()
+    return fetch
+
+def default_fetcher():
+    """
+    Fetcher configurado por entorno: directorio local si hay THUMBNAIL_SOURCE_DIR, HTTP si no
+    """
+    return directory_fetcher(THUMBNAIL_SOURCE_DIR) if THUMBNAIL_SOURCE_DIR else http_fetcher()
+
+def resize_thumbnail(data, width=THUMBNAIL_WIDTH, image_format='JPEG', quality=85):
+    """
+    Reduce la imagen al ancho indicado (sin ampliarla) y la recodifica
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGB')
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format=image_format, quality=quality)
+    return out.getvalue()
+
+def _url_key(url, width, image_format):
+    return hashlib.sha256(f"{url}|{width}|{image_format}".encode('utf-8')).hexdigest()
+
+def _blob_path(cache_dir, digest, image_format):
+    return os.path.join(cache_dir, 'objects', digest[:2], f"{digest}.{THUMBNAIL_FORMATS[image_format]}")
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _index_path(cache_dir, url, width, image_format):
+    return os.path.join(cache_dir, 'index', _url_key(url, width, image_format))
+
+def _recent_failure(cache_dir, url, width, image_format, retry_hours=THUMBNAIL_RETRY_HOURS):
+    index_path = _index_path(cache_dir, url, width, image_format)
+    try:
+        with open(index_path, encoding='ascii') as f:
+            failed = f.read().strip() == _FAILED
+        return failed and time.time() - os.path.getmtime(index_path) < retry_hours * 3600
+    except OSError:
+        return False
+
+def cached_thumbnail_path(url, cache_dir=None, width=THUMBNAIL_WIDTH, image_format='JPEG'):
+    """
+    Ruta local de la miniatura de url si ya está en la caché; None si no
+
+    Cada acierto actualiza la fecha de acceso del archivo, que es lo que usa el desalojo LRU.
+    """
+    cache_dir = THUMBNAIL_CACHE_DIR if cache_dir is None else cache_dir
+    try:
+        with open(_index_path(cache_dir, url, width, image_format), encoding='ascii') as f:
+            digest = f.read().strip()
+        if digest == _FAILED:
+            return None
+        path = _blob_path(cache_dir, digest, image_format)
+        os.utime(path)
+        return path
+    except OSError:
+        return None
+
+def store_thumbnail(url, data, cache_dir=None, width=THUMBNAIL_WIDTH, image_format='JPEG'):
+    """
+    Redimensiona la imagen descargada y la guarda en la caché
+
+    Los archivos se nombran por el hash de su contenido, así que URLs distintas con la misma
+    imagen (p. ej. la miniatura por defecto de YouTube) comparten un único archivo; un índice
+    aparte relaciona cada URL con su contenido.
+    """
+    cache_dir = THUMBNAIL_CACHE_DIR if cache_dir is None else cache_dir
+    thumbnail = resize_thumbnail(data, width=width, image_format=image_format)
+    digest = hashlib.sha256(thumbnail).hexdigest()
+    path = _blob_path(cache_dir, digest, image_format)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        _write_atomic(path, thumbnail)
+    _write_atomic(_index_path(cache_dir, url, width, image_format), digest.encode('ascii'))
+    return path
+
+def _cache_files(directory):
+    # (mtime, tamaño, ruta) de cada archivo bajo directory
+    files = []
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+def evict_thumbnails(cache_dir=None, max_bytes=None, retry_hours=THUMBNAIL_RETRY_HOURS):
+    """
+    Borra las miniaturas menos usadas recientemente hasta que la caché quepa en max_bytes
+
+    El tamaño incluye el índice: cada imagen se desaloja junto con las entradas que apuntan
+    a ella, y las marcas de fallo cuentan como entradas sueltas. Las marcas de fallo
+    caducadas y las entradas cuya imagen ya no existe se borran siempre.
+    Devuelve el número de archivos borrados.
+    """
+    cache_dir = THUMBNAIL_CACHE_DIR if cache_dir is None else cache_dir
+    max_bytes = int(THUMBNAIL_CACHE_MAX_MB * 1024 ** 2) if max_bytes is None else max_bytes
+
+    # Unidades de desalojo: [fecha del último uso, tamaño, archivos]
+    blobs = {}
+    for mtime, size, path in _cache_files(os.path.join(cache_dir, 'objects')):
+        blobs[os.path.splitext(os.path.basename(path))[0]] = [mtime, size, [path]]
+    units = list(blobs.values())
+    expired = []
+    for mtime, size, path in _cache_files(os.path.join(cache_dir, 'index')):
+        try:
+            with open(path, encoding='ascii') as f:
+                digest = f.read().strip()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if digest == _FAILED:
+            if time.time() - mtime >= retry_hours * 3600:
+                expired.append(path)
+            else:
+                units.append([mtime, size, [path]])
+        elif digest in blobs:
+            unit = blobs[digest]
+            unit[0], unit[1] = max(unit[0], mtime), unit[1] + size
+            unit[2].append(path)
+        elif not any(os.path.exists(_blob_path(cache_dir, digest, image_format)) for image_format in THUMBNAIL_FORMATS):
+            # (la imagen puede haberse guardado después de recorrer 'objects')
+            expired.append(path)
+
+    def remove(paths):
+        count = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                count += 1
+            except OSError:
+                continue
+        return count
+
+    removed = remove(expired)
+    total = sum(size for _, size, _ in units)
+    for _, size, paths in sorted(units, key=lambda unit: unit[0]):
+        if total <= max_bytes:
+            break
+        # La imagen va primero: si falla el borrado, sus entradas del índice se conservan
+        if remove(paths[:1]) == 0:
+            continue
+        removed += 1 + remove(paths[1:])
+        total -= size
+    return removed
+
+def fetch_thumbnails(urls, fetcher=None, cache_dir=None, width=THUMBNAIL_WIDTH, image_format='JPEG',
+                     max_workers=THUMBNAIL_WORKERS, max_bytes=None):
+    """
+    Devuelve {url: ruta local} con las miniaturas de urls, descargando solo las que faltan
+
+    Las descargas se hacen en paralelo con un pool de como mucho max_workers hilos. Las URLs
+    que no se pueden descargar o decodificar quedan con valor None y no se vuelven a pedir
+    hasta pasadas THUMBNAIL_RETRY_HOURS horas. fetcher recibe una URL
+    y devuelve los bytes de la imagen (por defecto default_fetcher()).
+    """
+    cache_dir = THUMBNAIL_CACHE_DIR if cache_dir is None else cache_dir
+    fetcher = default_fetcher() if fetcher is None else fetcher
+
+    paths = {}
+    missing = []
+    for url in dict.fromkeys(urls):
+        if not isinstance(url, str) or not url:
+            paths[url] = None
+            continue
+        paths[url] = cached_thumbnail_path(url, cache_dir, width, image_format)
+        if paths[url] is None and not _recent_failure(cache_dir, url, width, image_format):
+            missing.append(url)
+
+    def download(url):
+        try:
+            return store_thumbnail(url, fetcher(url), cache_dir, width, image_format)
+        except Exception:
+            _write_atomic(_index_path(cache_dir, url, width, image_format), _FAILED.encode('ascii'))
+            return None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+            paths.update(zip(missing, pool.map(download, missing)))
+        evict_thumbnails(cache_dir, max_bytes)
+        # Lo recién descargado es lo más reciente y solo se desaloja si la caché es diminuta
+        for url, path in paths.items():
+            if path is not None and not os.path.exists(path):
+                paths[url] = None
+
+    return paths
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# Conteos que se guardan por (video_id, snapshot_ts)
+HISTORY_COLUMNS = ['vistas', 'likes', 'comentarios']
+# Ventanas de velocidad por defecto: sufijo de columna -> horas
+VELOCITY_WINDOWS = {'24h': 24, '7d': 24 * 7}
+
+def _to_seconds(values):
+    return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+def build_snapshot_history(records, snapshot_times=None):
+    """
+    Construye la serie temporal de conteos por video a partir de observaciones
+    (video_id, snapshot_ts, vistas, likes, comentarios), p. ej. load_snapshot_deltas()
+
+    Se guarda en arrays ordenados por (video, instante), igual que un CSR: las
+    observaciones del video i son el rango offsets[i]:offsets[i + 1]. Un video sin fila
+    en un snapshot conserva los conteos de su última observación. snapshot_times son los
+    instantes de todos los snapshots (load_snapshot_times), también los de aquellos en que
+    un video no cambió y por eso no tiene fila; los instantes de records se añaden siempre.
+    """
+    codes, video_ids = pd.factorize(records['video_id'], sort=True)
+    ts = pd.to_datetime(records['snapshot_ts']).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    snapshots = np.unique(np.concatenate([ts, _to_seconds([] if snapshot_times is None else snapshot_times)]))
+    valid = codes >= 0
+    codes, ts = codes[valid], ts[valid]
+
+    order = np.lexsort((ts, codes))
+    history = {
+        'video_ids': pd.Index(video_ids),
+        'codes': codes[order].astype(np.int32),
+        'ts': ts[order],
+        'offsets': np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(video_ids))))),
+        'snapshot_ts': snapshots,
+    }
+    for col in HISTORY_COLUMNS:
+        values = records[col].to_numpy(dtype=np.float64, na_value=0)[valid][order]
+        history[col] = pd.to_numeric(pd.Series(values), downcast='unsigned').to_numpy()
+    return history
+
+def _seconds(when):
+    return int(pd.Timestamp(when).to_datetime64().astype('datetime64[s]').astype(np.int64))
+
+def _positions_at(history, when):
+    # Posición de la última observación de cada video con instante <= when y si existe.
+    # Una sola búsqueda binaria vectorizada sobre la clave compuesta (video, instante).
+    n_videos = len(history['video_ids'])
+    ts = history['ts']
+    when = _seconds(when)
+    base = min(int(ts.min()), when)
+    span = max(int(ts.max()), when) - base + 1
+    keys = history['codes'].astype(np.int64) * span + (ts - base)
+    targets = np.arange(n_videos, dtype=np.int64) * span + (when - base)
+
+    # Última posición con clave <= objetivo; vale si cae dentro del rango del video
+    pos = np.searchsorted(keys, targets, side='right') - 1
+    return pos, pos >= history['offsets'][:-1]
+
+def values_at(history, when, col='vistas'):
+    """
+    Valor de col de cada video en el instante when (última observación anterior o igual)
+
+    Devuelve un array float con NaN para los videos sin observaciones hasta ese instante.
+    """
+    n_videos = len(history['video_ids'])
+    if len(history['ts']) == 0:
+        return np.full(n_videos, np.nan)
+    pos, found = _positions_at(history, when)
+    values = np.full(n_videos, np.nan)
+    values[found] = history[col][pos[found]]
+    return values
+
+def interpolated_values_at(history, when, until=None, col='vistas'):
+    """
+    Valor estimado de col de cada video en el instante when
+
+    Los snapshots no caen siempre a la misma hora: si when queda entre dos snapshots
+    consecutivos (y el segundo no es posterior a until) se interpola linealmente entre los
+    valores de cada video en esos dos snapshots; si no, se toma la última observación
+    anterior, como values_at. Solo se interpola dentro de un intervalo entre snapshots: un
+    video sin fila en un snapshot no cambió, así que su valor se arrastra hasta él en lugar
+    de repartir el siguiente cambio entre los snapshots en que no se registró nada. NaN
+    sin observaciones hasta when.
+    """
+    values = values_at(history, when, col)
+    snapshots = history['snapshot_ts']
+    when = _seconds(when)
+    limit = np.iinfo(np.int64).max if until is None else _seconds(until)
+    # Snapshots consecutivos alrededor de when
+    k = int(np.searchsorted(snapshots, when, side='right')) - 1
+    if k < 0 or k + 1 >= len(snapshots) or snapshots[k] == when or snapshots[k + 1] > limit:
+        return values
+    # Sin observaciones entre snapshots[k] y when, values es el valor de cada video en snapshots[k]
+    after = values_at(history, pd.Timestamp(int(snapshots[k + 1]), unit='s'), col)
+    interpolate = ~np.isnan(values) & ~np.isnan(after)
+    fraction = (when - snapshots[k]) / (snapshots[k + 1] - snapshots[k])
+    values[interpolate] += (after[interpolate] - values[interpolate]) * fraction
+    return values
+
+def windowed_velocity(history, window_hours, at=None, col='vistas', published=None):
+    """
+    Incremento de col en las últimas window_hours horas para todos los videos a la vez
+
+    at es el instante de referencia (por defecto, el último snapshot). La base es el valor
+    interpolado al inicio de la ventana (interpolated_values_at), no la última observación
+    anterior: si el snapshot base es de unos minutos antes, el incremento no incluye las
+    vistas de ese tramo extra. Si un video no tiene observación al inicio de la ventana, su
+    base es 0 cuando se publicó dentro de la ventana (published: fechas de publicación
+    alineadas con history['video_ids']) y NaN si no.
+    """
+    at = pd.Timestamp(history['ts'].max(), unit='s') if at is None else pd.Timestamp(at)
+    start = at - pd.Timedelta(hours=window_hours)
+    current = values_at(history, at, col)
+    baseline = interpolated_values_at(history, start, until=at, col=col)
+    if published is not None:
+        new_in_window = np.isnan(baseline) & (pd.to_datetime(published).to_numpy() >= start.to_datetime64())
+        baseline[new_in_window] = 0
+    return current - baseline
+
+def add_velocity_columns(df, history, windows=None, at=None):
+    """
+    Añade a df, por cada ventana, las vistas ganadas (vistas_<ventana>) y la velocidad
+    en vistas por hora (vph_<ventana>), cruzando por video_id
+    """
+    windows = VELOCITY_WINDOWS if windows is None else windows
+    positions = history['video_ids'].get_indexer(df['video_id'])
+    matched = positions >= 0
+    published = pd.Series(pd.NaT, index=history['video_ids'], dtype='datetime64[ns]')
+    published.iloc[positions[matched]] = df['fecha_publicacion'].to_numpy()[matched]
+
+    for suffix, hours in windows.items():
+        gained = windowed_velocity(history, hours, at=at, published=published.to_numpy())
+        column = np.full(len(df), np.nan)
+        column[matched] = gained[positions[matched]]
+        df[f'vistas_{suffix}'] = column.astype(np.float32)
+        df[f'vph_{suffix}'] = (column / hours).astype(np.float32)
+    return df
@@ -1,115 +1,209 @@
 import pandas as pd
+import numpy as np
 import re
-from collections import Counter
-import plotly.express as px
-import plotly.graph_objects as go
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from collections import Counter, OrderedDict
+import hashlib
 import io
-import base64
+import json
+import threading
+from data_processing import get_top_videos, derived_column, WEEKDAYS
+from figure_cache import use_dashboard_template
+from instrumentation import instrument_module
 
-def extract_keywords_from_titles(df, min_length=3):
+# plotly y wordcloud se importan al dibujar, no al importar el módulo (arranque de la app)
+
+# Palabras vacías (español e inglés) que no cuentan como palabras clave
+STOP_WORDS = frozenset({'de', 'la', 'el', 'en', 'y', 'a', 'que', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'una', 'su', 'para', 'es', 'al', 'lo', 'como', 'mas', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'si', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre', 'tambien', 'me', 'hasta', 'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mi', 'antes', 'algunos', 'que', 'unos', 'yo', 'del', 'las', 'un', 'por', 'que', 'para', 'son', 'se', 'lo', 'todo', 'any', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use', 'a', 'an', 'the', 'and', 'or', 'in', 'on', 'at', 'for', 'with', 'as', 'by', 'from', 'about', 'into', 'through', 'after', 'before', 'during', 'over', 'under', 'above', 'below', 'to', 'from', 'up', 'down', 'out', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now'})
+
+# Tras limpiar la puntuación, cada palabra es una secuencia de caracteres \w
+_TOKEN_PATTERN = re.compile(r'\w+')
+_DOC_SEPARATOR = 'DOCSEP'
+
+def build_title_index(titulos):
+    """
+    Tokeniza los títulos una sola vez y devuelve un índice token/documento
+
+    Claves:
+        vocabulary: array de palabras (sin palabras vacías), en orden de primera aparición
+        token_lengths: longitud de cada palabra del vocabulario
+        token_ids: ids de vocabulario de todos los títulos, concatenados
+        offsets: los tokens del título en la posición i son token_ids[offsets[i]:offsets[i + 1]]
+    """
+    lowered = titulos.astype(str).str.lower().astype(object)
+
+    # Una sola pasada de la expresión regular sobre todos los títulos; los límites entre
+    # títulos se marcan con una palabra en mayúsculas, que no puede aparecer tras lower()
+    flat = np.array(_TOKEN_PATTERN.findall(f' {_DOC_SEPARATOR} '.join(lowered)), dtype=object)
+    codes, uniques = pd.factorize(flat)
+    uniques = pd.Series(uniques, dtype=object)
+    is_separator = (uniques == _DOC_SEPARATOR).to_numpy()[codes]
+    doc_of_token = np.cumsum(is_separator)
+
+    # Quitar separadores y palabras vacías y renumerar el vocabulario que queda
+    dropped = (uniques.isin(STOP_WORDS) | (uniques == _DOC_SEPARATOR)).to_numpy()
+    new_ids = np.cumsum(~dropped) - 1
+    keep = ~dropped[codes]
+    vocabulary = uniques[~dropped]
+    token_ids = new_ids[codes[keep]]
+    counts = np.bincount(doc_of_token[keep], minlength=len(lowered))
+
+    return {
+        'vocabulary': vocabulary.to_numpy(),
+        'token_lengths': vocabulary.str.len().to_numpy(dtype=np.int64),
+        'token_ids': token_ids.astype(np.int32),
+        'offsets': np.concatenate(([0], np.cumsum(counts))),
+    }
+
+def keyword_counts(title_index, positions, min_length=3):
+    """
+    Cuenta las palabras clave de los títulos en las posiciones indicadas sin volver a tokenizar
+
+    Sirve para cualquier subconjunto (top por VPH, un canal, la competencia). Los empates
+    mantienen el orden de primera aparición en el subconjunto, igual que el Counter original.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    offsets = title_index['offsets']
+    starts = offsets[positions]
+    lengths = offsets[positions + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return Counter()
+
+    # Índices de todos los tokens del subconjunto, en el orden de positions
+    gather = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths) + np.arange(total)
+    ids = title_index['token_ids'][gather]
+    ids = ids[title_index['token_lengths'][ids] >= min_length]
+    if len(ids) == 0:
+        return Counter()
+
+    unique_ids, first_seen, counts = np.unique(ids, return_index=True, return_counts=True)
+    order = np.argsort(first_seen, kind='stable')
+    vocabulary = title_index['vocabulary']
+    return Counter({vocabulary[i]: int(c) for i, c in zip(unique_ids[order], counts[order])})
+
+def extract_keywords_from_titles(df, min_length=3, title_index=None):
     """
     Extrae palabras clave de los títulos de videos
+
+    Con title_index (build_title_index sobre el dataset completo) se reutiliza la
+    tokenización: el índice de df debe ser el de posiciones del dataset.
     """
-    all_titles = \' \'.join(df[\\'titulo\\'].astype(str))
-    
-    # Limpiar texto
-    all_titles = re.sub(r\\'[^\\w\\s]\\', \' \', all_titles.lower())
-    words = all_titles.split()
-    
-    # Filtrar palabras cortas y comunes
-    stop_words = {\'de\', \'la\', \'el\', \'en\', \'y\', \'a\', \'que\', \'es\', \'se\', \'no\', \'te\', \'lo\', \'le\', \'da\', \'su\', \'por\', \'son\', \'con\', \'una\', \'su\', \'para\', \'es\', \'al\', \'lo\', \'como\', \'mas\', \'pero\', \'sus\', \'le\', \'ya\', \'o\', \'este\', \'si\', \'porque\', \'esta\', \'entre\', \'cuando\', \'muy\', \'sin\', \'sobre\', \'tambien\', \'me\', \'hasta\', \'hay\', \'donde\', \'quien\', \'desde\', \'todo\', \'nos\', \'durante\', \'todos\', \'uno\', \'les\', \'ni\', \'contra\', \'otros\', \'ese\', \'eso\', \'ante\', \'ellos\', \'e\', \'esto\', \'mi\', \'antes\', \'algunos\', \'que\', \'unos\', \'yo\', \'del\', \'las\', \'un\', \'por\', \'que\', \'para\', \'son\', \'se\', \'lo\', \'todo\', \'any\', \'can\', \'had\', \'her\', \'was\', \'one\', \'our\', \'out\', \'day\', \'get\', \'has\', \'him\', \'his\', \'how\', \'man\', \'new\', \'now\', \'old\', \'see\', \'two\', \'way\', \'who\', \'boy\', \'did\', \'its\', \'let\', \'put\', \'say\', \'she\', \'too\', \'use\', \'a\', \'an\', \'the\', \'and\', \'or\', \'in\', \'on\', \'at\', \'for\', \'with\', \'as\', \'by\', \'from\', \'about\', \'into\', \'through\', \'after\', \'before\', \'during\', \'over\', \'under\', \'above\', \'below\', \'to\', \'from\', \'up\', \'down\', \'out\', \'off\', \'over\', \'under\', \'again\', \'further\', \'then\', \''once\', \'here\', \'there\', \'when\', \'where\', \'why\', \'how\', \'all\', \'any\', \'both\', \'each\', \'few\', \'more\', \'most\', \'other\', \'some\', \'such\', \'no\', \'nor\', \'not\', \'only\', \'own\', \'same\', \'so\', \'than\', \'too\', \'very\', \'s\', \'t\', \'can\', \'will\', \'just\', \'don\', \'should\', \'now\']}
-    
-    filtered_words = [word for word in words if len(word) >= min_length and word not in stop_words]
-    
-    return Counter(filtered_words)
+    if title_index is None:
+        title_index = build_title_index(df['titulo'])
+        positions = np.arange(len(df))
+    else:
+        positions = df.index.to_numpy()
+
+    return keyword_counts(title_index, positions, min_length)
 
 def analyze_title_patterns(df):
     """
     Analiza patrones en los títulos más exitosos
     """
-    # Ordenar por VPH
-    df_sorted = df.sort_values(\'vph\', ascending=False)
-    top_videos = df_sorted.head(20)
+    # Top 20 por VPH (selección parcial, sin ordenar todo el DataFrame)
+    top_videos = get_top_videos(df, 20, 'vph')
     
     # Extraer patrones
     patterns = {
-        \'preguntas\': len([t for t in top_videos[\\'titulo\\'] if \'?\' in str(t)]),
-        \'numeros\': len([t for t in top_videos[\\'titulo\\'] if re.search(r\\'\\d+\\', str(t))]),
-        \'palabras_poder\': 0,
-        \'longitud_promedio\': top_videos[\\'titulo\\'].str.len().mean()
+        'preguntas': len([t for t in top_videos['titulo'] if '?' in str(t)]),
+        'numeros': len([t for t in top_videos['titulo'] if re.search(r'\d+', str(t))]),
+        'palabras_poder': 0,
+        'longitud_promedio': top_videos['titulo'].str.len().mean()
     }
     
     # Palabras de poder comunes
-    power_words = [\'secreto\', \'mejor\', \'increible\', \'facil\', \'rapido\', \'gratis\', \'nuevo\', \'ultimate\', \'perfect\', \'amazing\', \'best\', \'free\', \'easy\', \'quick\', \'secret\', \'ultimate\']
+    power_words = ['secreto', 'mejor', 'increible', 'facil', 'rapido', 'gratis', 'nuevo', 'ultimate', 'perfect', 'amazing', 'best', 'free', 'easy', 'quick', 'secret', 'ultimate']
     
-    for titulo in top_videos[\\'titulo\\']:
+    for titulo in top_videos['titulo']:
         titulo_lower = str(titulo).lower()
         for word in power_words:
             if word in titulo_lower:
-                patterns[\'palabras_poder\'] += 1
+                patterns['palabras_poder'] += 1
                 break
     
     return patterns, top_videos
 
-def create_wordcloud_from_titles(df, max_words=50):
+def create_wordcloud_from_titles(df, max_words=50, title_index=None):
     """
-    Crea una nube de palabras de los títulos más exitosos
+    Crea una nube de palabras de los títulos más exitosos (bytes PNG, None si no hay palabras)
     """
     # Obtener top videos por VPH
-    top_videos = df.nlargest(50, \'vph\')
-    keywords = extract_keywords_from_titles(top_videos)
+    top_videos = df.nlargest(50, 'vph')
+    keywords = extract_keywords_from_titles(top_videos, title_index=title_index)
     
     if len(keywords) == 0:
         return None
     
-    # Crear wordcloud
+    return render_wordcloud(keywords, max_words=max_words)
+
+# Nubes de palabras ya renderizadas (LRU por hash de las frecuencias y max_words)
+WORDCLOUD_CACHE_SIZE = 32
+_wordcloud_cache = OrderedDict()
+_wordcloud_lock = threading.Lock()
+
+def wordcloud_cache_key(frequencies, max_words, image_format='PNG'):
+    """
+    Hash estable de las frecuencias de palabras y los parámetros de la nube
+    """
+    payload = json.dumps([sorted(frequencies.items()), max_words, image_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def render_wordcloud(frequencies, max_words=50, image_format='PNG'):
+    """
+    Renderiza la nube de palabras directamente a bytes PNG/WebP con PIL (sin figura de
+    matplotlib); matplotlib sí se importa en la primera nube, porque WordCloud toma de él
+    el colormap, pero no al importar este módulo
+
+    El resultado se memoiza: las mismas frecuencias y max_words devuelven los bytes ya
+    generados sin volver a colocar las palabras.
+    """
+    key = wordcloud_cache_key(frequencies, max_words, image_format)
+    with _wordcloud_lock:
+        if key in _wordcloud_cache:
+            _wordcloud_cache.move_to_end(key)
+            return _wordcloud_cache[key]
+
+    # wordcloud (y con él matplotlib) se importa al generar la primera nube, no al importar este módulo
+    from wordcloud import WordCloud
+
     wordcloud = WordCloud(
         width=800, 
         height=400, 
-        background_color=\'white\',
+        background_color='white',
         max_words=max_words,
-        colormap=\'viridis\'
-    ).generate_from_frequencies(keywords)
-    
-    # Convertir a imagen base64 para Streamlit
+        colormap='viridis'
+    ).generate_from_frequencies(frequencies)
+
     img = io.BytesIO()
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation=\'bilinear\')
-    plt.axis(\'off\')
-    plt.tight_layout(pad=0)
-    plt.savefig(img, format=\'png\', bbox_inches=\'tight\', dpi=150)
-    plt.close()
-    
-    img.seek(0)
-    return img
+    wordcloud.to_image().save(img, format=image_format)
+    data = img.getvalue()
+
+    with _wordcloud_lock:
+        _wordcloud_cache[key] = data
+        while len(_wordcloud_cache) > WORDCLOUD_CACHE_SIZE:
+            _wordcloud_cache.popitem(last=False)
+    return data
 
 def analyze_publishing_schedule(df):
     """
     Analiza los mejores días y horas para publicar
     """
-    df[\\'fecha_publicacion\\'] = pd.to_datetime(df[\\'fecha_publicacion\\'])
-    df[\\'dia_semana\\'] = df[\\'fecha_publicacion\\'].dt.day_name()
-    df[\\'hora\\'] = df[\\'fecha_publicacion\\'].dt.hour
-    
-    # Análisis por día de la semana
-    day_performance = df.groupby(\'dia_semana\').agg({
-        \\'vph\\': \'mean\',
-        \\'vistas\\': \'mean\',
-        \\'video_id\\': \'count\'
-    }).rename(columns={\'video_id\': \'num_videos\'})[['vph', 'vistas', 'num_videos']]
+    # Análisis por día de la semana (columnas precalculadas en la carga; df no se modifica)
+    day_performance = df.groupby(derived_column(df, 'dia_semana'), observed=True).agg({
+        'vph': 'mean',
+        'vistas': 'mean',
+        'video_id': 'count'
+    }).rename(columns={'video_id': 'num_videos'})[['vph', 'vistas', 'num_videos']]
     
     # Reordenar días de la semana
-    ordered_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_performance = day_performance.reindex(ordered_days)
+    day_performance = day_performance.reindex(WEEKDAYS)
 
     # Análisis por hora
-    hour_performance = df.groupby(\'hora\').agg({
-        \\'vph\\': \'mean\',
-        \\'vistas\\': \'mean\',
-        \\'video_id\\': \'count\'
-    }).rename(columns={\'video_id\': \'num_videos\'})[['vph', 'vistas', 'num_videos']]
+    hour_performance = df.groupby(derived_column(df, 'hora')).agg({
+        'vph': 'mean',
+        'vistas': 'mean',
+        'video_id': 'count'
+    }).rename(columns={'video_id': 'num_videos'})[['vph', 'vistas', 'num_videos']]
     
     return day_performance, hour_performance
 
@@ -117,21 +211,23 @@ def create_publishing_heatmap(day_performance, hour_performance):
     """
     Crea un heatmap de los mejores momentos para publicar
     """
+    import plotly.graph_objects as go
+    use_dashboard_template()
     # Gráfico de días de la semana
     fig_days = go.Figure()
     fig_days.add_trace(go.Bar(
         x=day_performance.index,
-        y=day_performance[\\'vph\\'],
-        marker_color=\'#FF6B6B\',
-        text=day_performance[\\'num_videos\\'],
-        texttemplate=\'%{text} videos\',
-        textposition=\'outside\'
+        y=day_performance['vph'],
+        marker_color='#FF6B6B',
+        text=day_performance['num_videos'],
+        texttemplate='%{text} videos',
+        textposition='outside'
     ))
     
     fig_days.update_layout(
-        title=\'📅 Mejor Día de la Semana para Publicar (por VPH)\\',
-        xaxis_title=\'Día de la Semana\',
-        yaxis_title=\'VPH Promedio\',
+        title='📅 Mejor Día de la Semana para Publicar (por VPH)',
+        xaxis_title='Día de la Semana',
+        yaxis_title='VPH Promedio',
         height=400
     )
     
@@ -139,43 +235,47 @@ def create_publishing_heatmap(day_performance, hour_performance):
     fig_hours = go.Figure()
     fig_hours.add_trace(go.Scatter(
         x=hour_performance.index,
-        y=hour_performance[\\'vph\\'],
-        mode=\'lines+markers\',
-        line=dict(color=\'#4ECDC4\', width=3),
+        y=hour_performance['vph'],
+        mode='lines+markers',
+        line=dict(color='#4ECDC4', width=3),
         marker=dict(size=8)
     ))
     
     fig_hours.update_layout(
-        title=\'🕐 Mejor Hora del Día para Publicar (por VPH)\\',
-        xaxis_title=\'Hora del Día\',
-        yaxis_title=\'VPH Promedio\',
+        title='🕐 Mejor Hora del Día para Publicar (por VPH)',
+        xaxis_title='Hora del Día',
+        yaxis_title='VPH Promedio',
         height=400
     )
     
     return fig_days, fig_hours
 
-def generate_seo_recommendations(df):
+def generate_seo_recommendations(df, title_index=None, patterns=None):
     """
     Genera recomendaciones SEO basadas en los videos más exitosos
+
+    patterns permite reutilizar el resultado de analyze_title_patterns sobre el mismo df
+    en lugar de recalcularlo.
     """
-    top_videos = df.nlargest(20, \'vph\')
-    keywords = extract_keywords_from_titles(top_videos)
+    top_videos = df.nlargest(20, 'vph')
+    keywords = extract_keywords_from_titles(top_videos, title_index=title_index)
     
     # Top keywords
     top_keywords = dict(keywords.most_common(10))
     
     # Análisis de longitud de título
-    title_lengths = top_videos[\\'titulo\\'].str.len()
+    title_lengths = top_videos['titulo'].str.len()
     optimal_length = title_lengths.mean()
     
     # Patrones de éxito
-    patterns, _ = analyze_title_patterns(top_videos)
+    if patterns is None:
+        patterns, _ = analyze_title_patterns(top_videos)
     
     recommendations = {
-        \'top_keywords\': top_keywords,
-        \'optimal_title_length\': optimal_length,
-        \'patterns\': patterns,
-        \'title_template\': generate_title_template(top_keywords, patterns)
+        'top_keywords': top_keywords,
+        'optimal_title_length': optimal_length,
+        'patterns': patterns,
+        'title_template': generate_title_template(top_keywords, patterns)
     }
     
     return recommendations
@@ -187,18 +287,21 @@ def generate_title_template(top_keywords, patterns):
     templates = []
     
     # Plantillas basadas en patrones
-    if patterns[\'preguntas\'] > 5:
-        templates.append(\"¿Cómo [ACCIÓN] [TEMA] en [TIEMPO]?\")
-        templates.append(\"¿Por qué [TEMA] es [ADJETIVO]?\")
+    if patterns['preguntas'] > 5:
+        templates.append("¿Cómo [ACCIÓN] [TEMA] en [TIEMPO]?")
+        templates.append("¿Por qué [TEMA] es [ADJETIVO]?")
     
-    if patterns[\'numeros\'] > 5:
-        templates.append(\"[NÚMERO] [TEMA] que [BENEFICIO]\")
-        templates.append(\"[NÚMERO] Secretos de [TEMA]\")
+    if patterns['numeros'] > 5:
+        templates.append("[NÚMERO] [TEMA] que [BENEFICIO]")
+        templates.append("[NÚMERO] Secretos de [TEMA]")
     
     # Plantillas con keywords populares
     top_words = list(top_keywords.keys())[:5]
     if top_words:
-        templates.append(f\"Cómo {top_words[0]} [TEMA] como un Profesional\")
-        templates.append(f\"La Guía Definitiva de {top_words[0]}\")
+        templates.append(f"Cómo {top_words[0]} [TEMA] como un Profesional")
+        templates.append(f"La Guía Definitiva de {top_words[0]}")
     
     return templates[:3]  # Devolver máximo 3 plantillas
+
+# Registro de tiempos de todas las funciones públicas del módulo (ver instrumentation.py)
+instrument_module(globals())